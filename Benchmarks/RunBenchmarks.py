@@ -0,0 +1,307 @@
+# This is the benchmark suite, run from the root of the repository:
+#     python -m Benchmarks.RunBenchmarks --sizes 1k,100k --output benchmarks.json
+
+"""Every benchmark is timed `repeat` times on a fresh setup and reported with its fastest and median time.
+The report is one JSON document, so that two runs (e.g. two releases) can be compared by a script:
+
+    {
+        "environment": {"python": ..., "numpy": ..., "platform": ..., "timestamp": ...},
+        "parameters": {"sizes": [...], "repeat": ..., "seed": ..., ...},
+        "results": [
+            {"benchmark": "construct_vmvb", "size": "100k", "num_node": 100000, "repeat": 5,
+             "seconds_min": ..., "seconds_median": ..., "operations": 100000, "operations_per_second": ...},
+            ...
+        ]
+    }
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+from Benchmarks.SyntheticChart import CHART_SIZES, SyntheticChart, generate_chart
+from DataStructure.TimeCode import TimeCodeInMeasures
+from Game.chartAnalytics import analyze_score
+from Game.gameMusicScore import pianoGameMusicScore, VBPMPianoGameMusicScore, VMVBPianoGameMusicScore
+from Game.node import ANode
+from Game.replay import Replay, simulate_replay
+from Game.Util.UtilityFunctions import sort_node_list_by_start_time
+import numpy as np
+
+
+NUM_QUERY = 10_000
+"""The number of scalar conversions and window queries timed by one run"""
+
+NUM_EDIT = 100
+"""The number of node edits timed by one run"""
+
+BENCHMARKS: Dict[str, Callable[[SyntheticChart, int], Callable[[], int]]] = {}
+"""Every benchmark by name. A benchmark prepares its (untimed) setup from a chart and a seed,
+and returns the timed function, which returns the number of operations it made."""
+
+
+def benchmark(name: str):
+    """Decorate a setup function with this annotation to register it as a benchmark"""
+    def register(setup: Callable[[SyntheticChart, int], Callable[[], int]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('construct_fixed')
+def setup_construct_fixed(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    def run() -> int:
+        pianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.get_fix_meter(), chart.get_fix_bpm()) \
+            .retrieve_all_nodes()
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('construct_vbpm')
+def setup_construct_vbpm(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    def run() -> int:
+        VBPMPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.get_fix_meter(), chart.var_bpm) \
+            .retrieve_all_nodes()
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('construct_vmvb')
+def setup_construct_vmvb(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    def run() -> int:
+        score = VMVBPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.var_meter, chart.var_bpm)
+        score.retrieve_all_nodes()
+        score.fufill_var_meter()
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('construct_metadata')
+def setup_construct_metadata(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    # What a song list needs: the score is validated and its duration found, nothing else is compiled
+    def run() -> int:
+        VMVBPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.var_meter, chart.var_bpm).get_duration()
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('sort_node_list')
+def setup_sort_node_list(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    node_list = chart.get_node_list()
+
+    def run() -> int:
+        sort_node_list_by_start_time(node_list)
+        return len(node_list)
+    return run
+
+
+@benchmark('time_conversion_scalar')
+def setup_time_conversion_scalar(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+    timing_map = score.retrieve_timing_map()
+    picks = np.random.default_rng(seed).integers(0, len(chart.all_nodes), NUM_QUERY)
+    measures = chart.all_nodes.start_measures[picks].tolist()
+    beats = chart.all_nodes.start_beats[picks].tolist()
+
+    def run() -> int:
+        get_second_at = timing_map.get_second_at
+        for num_measure, num_beat in zip(measures, beats):
+            get_second_at(num_measure, num_beat)
+        return NUM_QUERY
+    return run
+
+
+@benchmark('time_conversion_batch')
+def setup_time_conversion_batch(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+
+    def run() -> int:
+        score.get_time_in_second_array(chart.all_nodes.start_measures, chart.all_nodes.start_beats)
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('interval_index_build')
+def setup_interval_index_build(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+
+    def run() -> int:
+        score.compile_node_seconds()
+        score.retrieve_interval_index()
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('window_query')
+def setup_window_query(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+    score.retrieve_interval_index()
+    rng = np.random.default_rng(seed)
+    t0s = rng.uniform(0, float(score.node_end_seconds.max()), NUM_QUERY).tolist()
+    trails = rng.integers(1, chart.num_trail + 1, NUM_QUERY).tolist()
+
+    def run() -> int:
+        for trail, t0 in zip(trails, t0s):
+            score.get_nodes_in_window(trail, t0, t0 + 1.0)
+        return NUM_QUERY
+    return run
+
+
+@benchmark('chart_analytics')
+def setup_chart_analytics(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+
+    def run() -> int:
+        analyze_score(score)
+        return len(chart.all_nodes)
+    return run
+
+
+@benchmark('hold_ticks')
+def setup_hold_ticks(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+
+    def run() -> int:
+        score._discard('hold_ticks')
+        return sum(len(window.rows) for window in score.retrieve_hold_ticks().iter_ticks(window=60.0))
+    return run
+
+
+@benchmark('node_edits')
+def setup_node_edits(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+    score.compile_all()
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(chart.all_nodes), NUM_EDIT).tolist()
+
+    def run() -> int:
+        # Every node is moved to the next trail, the indexes are patched after every edit
+        for row in rows:
+            node = score.retrieve_all_nodes()[row]
+            num_measure, num_beat = node.get_start_time().get_time_in_measure()
+            end_measure, end_beat = node.get_end_time().get_time_in_measure()
+            trail = node.get_init_trail() % chart.num_trail + 1
+            score.move_node(row, ANode(TimeCodeInMeasures(num_measure, num_beat), \
+                TimeCodeInMeasures(end_measure, end_beat), trail))
+        return NUM_EDIT
+    return run
+
+
+@benchmark('judgement_throughput')
+def setup_judgement_throughput(chart: SyntheticChart, seed: int) -> Callable[[], int]:
+    score = _build_vmvb(chart)
+    replay = generate_replay(score, seed)
+
+    def run() -> int:
+        simulate_replay(score, replay)
+        return len(replay)
+    return run
+
+
+def generate_replay(score: pianoGameMusicScore, seed: int = 0, jitter: float = 0.03) -> Replay:
+    """To generate the replay of a player pressing every node near its start and releasing it at its end"""
+    rng = np.random.default_rng(seed)
+    starts = score.node_start_seconds
+    ends = score.node_end_seconds
+    trails = score.retrieve_all_nodes().trails
+    num_node = len(starts)
+    return Replay(np.concatenate((trails, trails)), \
+        np.concatenate((starts + rng.normal(0, jitter, num_node), np.maximum(ends, starts) + 0.01)), \
+        np.concatenate((np.ones(num_node, dtype=bool), np.zeros(num_node, dtype=bool))))
+
+
+def _build_vmvb(chart: SyntheticChart) -> VMVBPianoGameMusicScore:
+    score = VMVBPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.var_meter, chart.var_bpm)
+    score.retrieve_all_nodes()
+    return score
+
+
+def time_benchmark(name: str, chart: SyntheticChart, repeat: int, seed: int) -> Dict[str, Any]:
+    """To time one benchmark on one chart, every repetition has its own setup"""
+    durations = []
+    operations = 0
+    for _ in range(repeat):
+        run = BENCHMARKS[name](chart, seed)
+        started = time.perf_counter()
+        operations = run()
+        durations.append(time.perf_counter() - started)
+
+    fastest = min(durations)
+    return {
+        'benchmark': name,
+        'num_node': len(chart.all_nodes),
+        'repeat': repeat,
+        'seconds_min': fastest,
+        'seconds_median': statistics.median(durations),
+        'operations': operations,
+        'operations_per_second': operations / fastest if fastest > 0 else None,
+    }
+
+
+def run_benchmarks(sizes: List[str], names: Optional[List[str]] = None, repeat: int = 3, seed: int = 0, \
+    num_trail: int = 4, hold_ratio: float = 0.2, bpm_changes_per_measure: float = 0.05, \
+    meter_changes_per_measure: float = 0.02, log: Callable[[str], Any] = lambda line: None) -> Dict[str, Any]:
+    """To run the benchmarks on the charts of the given sizes (keys of CHART_SIZES), returns the JSON report"""
+    names = list(BENCHMARKS) if names is None else names
+    unknown = [name for name in names if name not in BENCHMARKS] + [size for size in sizes if size not in CHART_SIZES]
+    if unknown:
+        raise ValueError(f'unknown benchmarks or sizes: {", ".join(unknown)}')
+
+    results = []
+    for size in sizes:
+        chart = generate_chart(CHART_SIZES[size], num_trail, hold_ratio, \
+            bpm_changes_per_measure=bpm_changes_per_measure, meter_changes_per_measure=meter_changes_per_measure, \
+            seed=seed)
+        for name in names:
+            result = time_benchmark(name, chart, repeat, seed)
+            result['size'] = size
+            results.append(result)
+            log(f'{size:>5} {name:<24} {result["seconds_min"] * 1000:12.3f} ms')
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        'parameters': {
+            'sizes': sizes, 'repeat': repeat, 'seed': seed, 'num_trail': num_trail, 'hold_ratio': hold_ratio,
+            'bpm_changes_per_measure': bpm_changes_per_measure, 'meter_changes_per_measure': meter_changes_per_measure,
+        },
+        'results': results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Time the score construction, conversions, queries and judgements.')
+    parser.add_argument('--sizes', default='1k,100k', help=f'comma separated chart sizes among {", ".join(CHART_SIZES)}')
+    parser.add_argument('--benchmarks', default=None, help=f'comma separated benchmarks among {", ".join(BENCHMARKS)}')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trails', type=int, default=4)
+    parser.add_argument('--hold-ratio', type=float, default=0.2)
+    parser.add_argument('--bpm-changes', type=float, default=0.05, help='bpm changes per measure')
+    parser.add_argument('--meter-changes', type=float, default=0.02, help='meter changes per measure')
+    parser.add_argument('--output', default=None, help='file of the JSON report (standard output by default)')
+    arguments = parser.parse_args(argv)
+
+    report = run_benchmarks(arguments.sizes.split(','), \
+        None if arguments.benchmarks is None else arguments.benchmarks.split(','), arguments.repeat, arguments.seed, \
+        arguments.trails, arguments.hold_ratio, arguments.bpm_changes, arguments.meter_changes, \
+        log=lambda line: print(line, file=sys.stderr))
+
+    if arguments.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
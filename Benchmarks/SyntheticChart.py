@@ -0,0 +1,91 @@
+# This is the seeded generator of synthetic charts, used by the benchmarks and the tests
+
+from typing import Dict, List, NamedTuple
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.node import ANode
+from Game.nodeTable import NODE_KIND_HOLD, NODE_KIND_TAP, NodeTable
+import numpy as np
+
+
+CHART_SIZES: Dict[str, int] = {'1k': 1_000, '100k': 100_000, '1M': 1_000_000}
+"""The standard chart sizes of the benchmarks, by name"""
+
+METER_CHOICES = ((4, 4), (3, 4), (2, 4), (6, 8), (7, 8), (5, 4))
+"""The meters a synthetic chart changes between"""
+
+
+class SyntheticChart(NamedTuple):
+    """A generated chart, ready to build any of the three score classes"""
+    all_nodes: NodeTable
+    """The nodes, in generation order (not sorted)"""
+    num_trail: int
+    var_meter: Dict[TimeCodeInMeasures, meter]
+    var_bpm: Dict[TimeCodeInMeasures, float]
+
+    def get_fix_meter(self) -> meter:
+        """To get the first meter, for the score classes with a fixed meter"""
+        return self.var_meter[TimeCodeInMeasures(0, 0.0)]
+
+    def get_fix_bpm(self) -> float:
+        """To get the first bpm, for the score classes with a fixed bpm"""
+        return self.var_bpm[TimeCodeInMeasures(0, 0.0)]
+
+    def get_node_list(self) -> List[ANode]:
+        """To get the nodes as a list of ANode, in generation order"""
+        all_nodes = self.all_nodes
+        return [ANode(TimeCodeInMeasures(start_measure, start_beat), TimeCodeInMeasures(end_measure, end_beat), trail) \
+            for start_measure, start_beat, end_measure, end_beat, trail in zip(all_nodes.start_measures.tolist(), \
+                all_nodes.start_beats.tolist(), all_nodes.end_measures.tolist(), all_nodes.end_beats.tolist(), \
+                all_nodes.trails.tolist())]
+
+
+
+def generate_chart(num_node: int, num_trail: int = 4, hold_ratio: float = 0.2, nodes_per_measure: float = 8.0, \
+    bpm_changes_per_measure: float = 0.05, meter_changes_per_measure: float = 0.02, seed: int = 0) -> SyntheticChart:
+    """To generate a chart, the same arguments always give the same chart.
+
+    - Nodes start on a sixteenth of a beat grid, on uniformly random trails.
+    - hold_ratio of the nodes are holds, ending up to two measures after their start.
+    - Bpm changes (between 60 and 240) and meter changes (see METER_CHOICES) happen at random measures,
+      about bpm_changes_per_measure and meter_changes_per_measure times per measure.
+    """
+    if num_node < 0 or num_trail < 1 or not 0 <= hold_ratio <= 1 or nodes_per_measure <= 0:
+        raise ValueError('illegal parameters of a synthetic chart')
+    rng = np.random.default_rng(seed)
+    num_measure = max(1, int(np.ceil(num_node / nodes_per_measure)))
+
+    # Meter changes at the start of random measures, the first one at measure 0
+    num_meter_change = int(rng.binomial(num_measure, min(meter_changes_per_measure, 1.0)))
+    meter_measures = np.unique(np.concatenate(([0], rng.integers(1, num_measure + 3, num_meter_change))))
+    meter_picks = rng.integers(0, len(METER_CHOICES), len(meter_measures))
+    meter_num_beats = np.array([METER_CHOICES[pick][0] for pick in meter_picks], dtype=np.int64)
+    var_meter = {TimeCodeInMeasures(int(measure), 0.0): meter(*METER_CHOICES[pick]) \
+        for measure, pick in zip(meter_measures.tolist(), meter_picks.tolist())}
+
+    # Bpm changes anywhere on the beat grid, the first one at measure 0
+    num_bpm_change = int(rng.binomial(num_measure, min(bpm_changes_per_measure, 1.0)))
+    bpm_measures = np.concatenate(([0], rng.integers(1, num_measure + 3, num_bpm_change)))
+    bpm_beats = np.concatenate(([0.0], _random_beats(rng, bpm_measures[1:], meter_measures, meter_num_beats)))
+    bpm_values = np.round(rng.uniform(60, 240, len(bpm_measures)), 1)
+    var_bpm = {TimeCodeInMeasures(measure, beat): bpm \
+        for measure, beat, bpm in zip(bpm_measures.tolist(), bpm_beats.tolist(), bpm_values.tolist())}
+
+    start_measures = rng.integers(0, num_measure, num_node)
+    start_beats = _random_beats(rng, start_measures, meter_measures, meter_num_beats)
+    trails = rng.integers(1, num_trail + 1, num_node)
+    is_hold = rng.random(num_node) < hold_ratio
+
+    end_measures = start_measures + is_hold * rng.integers(1, 3, num_node)
+    end_beats = np.where(is_hold, _random_beats(rng, end_measures, meter_measures, meter_num_beats), start_beats)
+
+    all_nodes = NodeTable(start_measures, start_beats, end_measures, end_beats, trails, \
+        np.where(is_hold, NODE_KIND_HOLD, NODE_KIND_TAP))
+    return SyntheticChart(all_nodes, num_trail, var_meter, var_bpm)
+
+
+def _random_beats(rng: np.random.Generator, measures: np.ndarray, meter_measures: np.ndarray, \
+    meter_num_beats: np.ndarray) -> np.ndarray:
+    """To pick a random beat on the sixteenth grid inside every given measure"""
+    num_beats = meter_num_beats[np.searchsorted(meter_measures, measures, side='right') - 1]
+    return np.floor(rng.random(len(measures)) * num_beats * 16) / 16
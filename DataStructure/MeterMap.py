@@ -0,0 +1,147 @@
+# This is the run-length meter map of a score, which stores the meter changes of a score and nothing else
+
+from bisect import bisect_right
+from typing import Any, Dict, List, Tuple
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+import numpy as np
+
+
+class MeterMap():
+    """The meters of a score as runs of measures, one run per change of meter.
+
+    Every run stores the measure where it starts, its meter, and the beats and whole notes elapsed before it.
+    The meter of a measure and the absolute beat of a measure are then answered by a binary search over the runs,
+    so a map costs as much as its number of changes, whatever the length of the score.
+
+    Example:
+        (0, 0): 4/4
+        (4, 0): 2/4
+        (6, 0): 3/4
+        (9, 0): 4/4
+            ↓
+        measures:    0    4    6    9
+        meters:      4/4  2/4  3/4  4/4
+        beats:       0    16   20   29
+        whole notes: 0.0  4.0  5.0  7.25
+
+        - Measure 7 is in the run starting at measure 6: 3/4, starting at beat 20 + (7 - 6) * 3 = 23.
+        - Consecutive changes to the same meter are merged into one run.
+    """
+
+    # ------------- Fields ---------------
+    _measures: List[int]
+    """The measure where every run starts, in ascending order"""
+
+    _meters: List[meter]
+    """The meter of every run"""
+
+    _beats: List[int]
+    """The number of beats elapsed before every run"""
+
+    _whole_notes: List[float]
+    """The number of whole notes elapsed before every run"""
+
+    _arrays: Tuple[np.ndarray, ...]
+    """The measures, the beats, the number of beats per measure, the whole notes and the beat unit of every run,
+    used by the batch lookups"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, var_meter: Dict[TimeCodeInMeasures, meter]) -> None:
+        if TimeCodeInMeasures(0, 0.0) not in var_meter:
+            raise ValueError('a meter map needs a meter at the start of the score')
+
+        self._measures = []
+        self._meters = []
+        self._beats = []
+        self._whole_notes = []
+
+        elapsed_beats = 0
+        elapsed_whole_notes = 0.0
+        for timecode in sorted(var_meter.keys()):
+            if timecode.get_num_beat() != 0.0:
+                raise ValueError('a change of meter can only happen at the start of a measure')
+            current_meter = var_meter[timecode]
+            if self._meters and current_meter == self._meters[-1]:
+                continue
+            if self._measures:
+                previous_meter = self._meters[-1]
+                num_measure_elapsed = timecode.get_num_measure() - self._measures[-1]
+                elapsed_beats += num_measure_elapsed * previous_meter.get_num_beats()
+                elapsed_whole_notes += num_measure_elapsed * previous_meter.get_num_beats() \
+                    / previous_meter.get_beat_unit()
+            self._measures.append(timecode.get_num_measure())
+            self._meters.append(current_meter)
+            self._beats.append(elapsed_beats)
+            self._whole_notes.append(elapsed_whole_notes)
+
+        self._arrays = (
+            np.array(self._measures, dtype=np.int64),
+            np.array(self._beats, dtype=np.int64),
+            np.array([mt.get_num_beats() for mt in self._meters], dtype=np.int64),
+            np.array(self._whole_notes, dtype=np.float64),
+            np.array([mt.get_beat_unit() for mt in self._meters], dtype=np.float64))
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        """The number of runs of this map"""
+        return len(self._measures)
+
+    def __eq__(self, obj: Any) -> bool:
+        if not isinstance(obj, MeterMap):
+            return False
+        return self._measures == obj._measures and self._meters == obj._meters
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'MeterMap({' + ', '.join(f'{num_measure}: {mt.get_num_beats()}/{mt.get_beat_unit()}' \
+            for num_measure, mt in self.get_changes()) + '})'
+
+    def get_changes(self) -> List[Tuple[int, meter]]:
+        """To get the start of every run, as (measure, meter), in ascending order"""
+        return list(zip(self._measures, self._meters))
+
+    def get_segments(self) -> Tuple[List[int], List[meter], List[float]]:
+        """To get the starting measure, the meter and the whole notes elapsed before every run"""
+        return self._measures, self._meters, self._whole_notes
+
+    def get_meter_at(self, num_measure: int) -> meter:
+        """To get the meter of a measure"""
+        return self._meters[self._find_run(num_measure)]
+
+    def get_beat_at(self, num_measure: int) -> int:
+        """To get the absolute beat where a measure starts, i.e. the number of beats before it"""
+        i = self._find_run(num_measure)
+        return self._beats[i] + (num_measure - self._measures[i]) * self._meters[i].get_num_beats()
+
+    def get_beats_of(self, num_measures: np.ndarray) -> np.ndarray:
+        """The batch version of get_beat_at, returns an int64 array"""
+        measures, beats, num_beats = self._arrays[:3]
+        num_measures = np.asarray(num_measures, dtype=np.int64)
+        i = np.maximum(np.searchsorted(measures, num_measures, side='right') - 1, 0)
+        return beats[i] + (num_measures - measures[i]) * num_beats[i]
+
+    def get_measure_at_beat(self, num_beat: float) -> Tuple[int, float]:
+        """To get the measure of an absolute beat and the beat inside that measure"""
+        i = max(bisect_right(self._beats, num_beat) - 1, 0)
+        num_measure_elapsed, beat_in_measure = divmod(num_beat - self._beats[i], self._meters[i].get_num_beats())
+        return (self._measures[i] + int(num_measure_elapsed), beat_in_measure)
+
+    def get_whole_notes_of_beats(self, num_beats: np.ndarray) -> np.ndarray:
+        """To get the position (in whole notes) of absolute beats, returns a float64 array"""
+        beats, whole_notes, beat_units = self._arrays[1], self._arrays[3], self._arrays[4]
+        num_beats = np.asarray(num_beats, dtype=np.float64)
+        i = np.maximum(np.searchsorted(beats, num_beats, side='right') - 1, 0)
+        return whole_notes[i] + (num_beats - beats[i]) / beat_units[i]
+
+    def get_beat_at_whole_notes(self, position: float) -> float:
+        """To get the absolute beat of a position in whole notes, the reverse of get_whole_notes_of_beats"""
+        i = max(bisect_right(self._whole_notes, position) - 1, 0)
+        return self._beats[i] + (position - self._whole_notes[i]) * self._meters[i].get_beat_unit()
+
+    def _find_run(self, num_measure: int) -> int:
+        """To get the index of the run which contains the given measure"""
+        return max(bisect_right(self._measures, num_measure) - 1, 0)
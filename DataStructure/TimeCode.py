@@ -2,8 +2,32 @@
 
 from abc import ABCMeta, abstractmethod
 from typing import Any, Tuple
-from UtilityClass import meter
+from DataStructure.util.UtilityClass import meter
 import math
+from numbers import Integral, Real
+
+DEFAULT_PPQ = 480
+"""Default number of ticks in a quarter note of a time code in ticks"""
+
+TICKS_PER_BEAT = 1920
+"""Number of ticks in one beat of a time code in measures, whatever the beat unit of the meter is.
+1920 = 2^7 * 3 * 5, so it holds every division of a beat down to 1/128 and the triplets and quintuplets of them,
+but not septuplets (a seventh of a beat is not a whole number of ticks)"""
+
+_TICK_TOLERANCE = 1e-9
+"""Relative error (in ticks) under which a beat is on a tick, e.g. 0.1 * 1920 is 192.00000000000003"""
+
+_MEASURE_SPAN = 1 << 40
+"""The packed key of a time code in measures is num_measure * _MEASURE_SPAN + beat tick"""
+
+
+def is_on_tick(num_beat: float) -> bool:
+    """To check whether a number of beats is a whole number of ticks (1/TICKS_PER_BEAT beat) of a time code in measures"""
+    ticks = num_beat * TICKS_PER_BEAT
+    if not math.isfinite(ticks):
+        return False
+    return abs(ticks - round(ticks)) <= _TICK_TOLERANCE * max(1.0, abs(ticks))
+
 
 
 class ITimeCode(metaclass = ABCMeta):
@@ -47,9 +71,13 @@ class TimeCodeInSeconds(ITimeCode):
     def get_time_in_seconds(self) -> float:
         return self._num_second
     
-    def get_time_in_measure(self, num_second: float, bpm: float, mt: meter) -> tuple:
+    def get_time_in_measure(self, num_second: float, bpm: float = None, mt: meter = None, timing_map: Any = None) -> tuple:
         """Method which convert time in seconds into measure. Parameter should be provided by score."""
-        """!Note!: this assumes that the BPM and METER in previous part of score is fixed"""
+        """!Note!: without a timing map, this assumes that the BPM and METER in previous part of score is fixed"""
+        # A timing map (see DataStructure.TimingMap) handles the changes of bpm and meter by binary search
+        if timing_map is not None:
+            return timing_map.get_time_in_measure(num_second)
+
         #The duration of one single measure
         time4oneMeasure = (240/bpm) * (mt.get_num_beats() / mt.get_beat_unit())
 
@@ -71,32 +99,61 @@ class TimeCodeInSeconds(ITimeCode):
         
 
 class TimeCodeInMeasures(ITimeCode):
-    """Concrete implementation of a TimeCode, in MIDI format of measure-beat"""
+    """Concrete implementation of a TimeCode, in MIDI format of measure-beat.
+
+    The beat is kept in integer ticks (TICKS_PER_BEAT per beat), and the measure and the beat tick are packed
+    into one integer key, so that time codes compare and hash as plain integers and (1, 2.0) never meets (2, 1.0).
+    A beat which does not fall on a tick can not be represented, it raises a ValueError (see is_on_tick).
+
+    Example: (2, 1.5) -> measure 2, beat tick 2880 -> key 2 * 2^40 + 2880
+    """
 
     # ------------- Fields ---------------
     _num_measure: int
     """Number of measure"""
 
-    _num_beat: float
-    """Number of beats"""
+    _beat_tick: int
+    """Number of ticks since the start of the measure"""
+
+    _key: int
+    """The measure and the beat tick packed into one integer, ordered as (measure, beat)"""
 
 
     # ----------- Constructor ------------
     def __init__(self, num_measure: int, num_beat: float) -> None:
-        if not isinstance(num_measure, int) or not isinstance(num_beat, float):
-            raise TypeError('_num_beat must be an integer / _num_beat must be an float')
+        if not isinstance(num_measure, Integral) or isinstance(num_measure, bool) \
+            or not isinstance(num_beat, Real) or isinstance(num_beat, bool):
+            raise TypeError('_num_measure must be an integer / _num_beat must be a number')
+        if not is_on_tick(num_beat):
+            raise ValueError(f'_num_beat {num_beat} does not fall on a tick, beats are in steps of 1/{TICKS_PER_BEAT}')
+        self._set(int(num_measure), round(num_beat * TICKS_PER_BEAT))
+
+    @classmethod
+    def from_beat_tick(cls, num_measure: int, beat_tick: int) -> "TimeCodeInMeasures":
+        """To build a time code from a measure and a number of ticks since the start of that measure"""
+        timecode = cls.__new__(cls)
+        timecode._set(int(num_measure), int(beat_tick))
+        return timecode
+
+    def _set(self, num_measure: int, beat_tick: int) -> None:
+        if not 0 <= beat_tick < _MEASURE_SPAN:
+            raise ValueError('_num_beat must be non-negative and below 2^40 ticks')
         self._num_measure = num_measure
-        self._num_beat = num_beat
-    
-    
+        self._beat_tick = beat_tick
+        self._key = num_measure * _MEASURE_SPAN + beat_tick
+
+
     # ------------- Methods --------------
     def __hash__(self):
-        return hash(self._num_beat + self._num_measure)
+        return hash(self._key)
 
     def __eq__(self, obj: Any) -> bool:
         if not isinstance(obj, TimeCodeInMeasures):
             return False
-        return self._num_beat == obj._num_beat and self._num_measure == obj._num_measure
+        return self._key == obj._key
+
+    def __repr__(self) -> str:
+        return f'TimeCodeInMeasures({self._num_measure}, {self.get_num_beat()})'
 
     def get_num_measure(self) -> int:
         """To get the number of measure of this time code in measure"""
@@ -104,24 +161,24 @@ class TimeCodeInMeasures(ITimeCode):
 
     def get_num_beat(self) -> float:
         """To get the number of beats of this time code in measure"""
-        return self._num_beat
-
-    def __lt__(self, other: Any):
-        if self._num_measure < other._num_measure:
-            return True
-        elif self._num_measure == other._num_measure:
-            return self._num_beat < other._num_beat
-        else:
-            return False
+        return self._beat_tick / TICKS_PER_BEAT
+
+    def get_beat_tick(self) -> int:
+        """To get the number of ticks since the start of the measure"""
+        return self._beat_tick
+
+    def __lt__(self, other: "TimeCodeInMeasures"):
+        return self._key < other._key
+
+    def __le__(self, other: "TimeCodeInMeasures"):
+        return self._key <= other._key
+
+    def __gt__(self, other: "TimeCodeInMeasures"):
+        return self._key > other._key
+
+    def __ge__(self, other: "TimeCodeInMeasures"):
+        return self._key >= other._key
 
-    def __gt__(self, other: Any):
-        if self._num_measure > other._num_measure:
-            return True
-        elif self._num_measure == other._num_measure:
-            return self._num_beat > other._num_beat
-        else:
-            return False
-        
     def get_time_in_seconds(self, num_measure: int, num_beat: float, bpm: float, mt: meter) -> float:
         """Method to get time in the format of seconds."""
         """!Note!: This assumes that the BPM and the METER are fixed in the previous part of score."""
@@ -129,5 +186,103 @@ class TimeCodeInMeasures(ITimeCode):
 
     def get_time_in_measure(self) -> Tuple[int, float]:
         """Returns the field of this object."""
-        return (self._num_measure, self._num_beat)
-    
\ No newline at end of file
+        return (self._num_measure, self.get_num_beat())
+
+    def to_ticks(self, timing_map: Any, ppq: int = DEFAULT_PPQ) -> "TimeCodeInTicks":
+        """To get the absolute tick of this time code, using the meters of a timing map (see DataStructure.TimingMap)"""
+        return TimeCodeInTicks(timing_map.get_tick_at(self._num_measure, self.get_num_beat(), ppq), ppq)
+
+
+
+class TimeCodeInTicks(ITimeCode):
+    """Concrete implementation of a TimeCode, as an absolute integer tick from the start of the score.
+
+    A quarter note lasts ppq ticks (pulses per quarter note), so a beat of a x/8 meter lasts ppq / 2 ticks.
+    Time codes in ticks compare, hash and subtract as plain integers; only time codes of the same ppq can be compared.
+
+    Example (ppq 480, meter 4/4):
+        TimeCodeInTicks(4000) - TimeCodeInTicks(1000)  -> 3000
+        TimeCodeInTicks(1000) + 960                    -> TimeCodeInTicks(1960)
+    """
+
+    # ------------- Fields ---------------
+    _num_tick: int
+    """Number of ticks from the start of the score"""
+
+    _ppq: int
+    """Number of ticks in a quarter note"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, num_tick: int, ppq: int = DEFAULT_PPQ) -> None:
+        if not isinstance(num_tick, Integral) or isinstance(num_tick, bool) or not isinstance(ppq, Integral):
+            raise TypeError('_num_tick and _ppq must be integers')
+        if ppq <= 0:
+            raise ValueError('_ppq must be positive')
+        self._num_tick = int(num_tick)
+        self._ppq = int(ppq)
+
+
+    # ------------- Methods --------------
+    def __hash__(self):
+        return hash(self._num_tick)
+
+    def __eq__(self, obj: Any) -> bool:
+        if not isinstance(obj, TimeCodeInTicks):
+            return False
+        return self._num_tick == obj._num_tick and self._ppq == obj._ppq
+
+    def __repr__(self) -> str:
+        return f'TimeCodeInTicks({self._num_tick}, ppq={self._ppq})'
+
+    def _check_ppq(self, other: "TimeCodeInTicks") -> None:
+        if self._ppq != other._ppq:
+            raise ValueError(f'time codes of ppq {self._ppq} and {other._ppq} can not be mixed')
+
+    def __lt__(self, other: "TimeCodeInTicks"):
+        self._check_ppq(other)
+        return self._num_tick < other._num_tick
+
+    def __le__(self, other: "TimeCodeInTicks"):
+        self._check_ppq(other)
+        return self._num_tick <= other._num_tick
+
+    def __gt__(self, other: "TimeCodeInTicks"):
+        self._check_ppq(other)
+        return self._num_tick > other._num_tick
+
+    def __ge__(self, other: "TimeCodeInTicks"):
+        self._check_ppq(other)
+        return self._num_tick >= other._num_tick
+
+    def __sub__(self, other: Any):
+        """The number of ticks between two time codes, or this time code moved back by a number of ticks"""
+        if isinstance(other, TimeCodeInTicks):
+            self._check_ppq(other)
+            return self._num_tick - other._num_tick
+        if isinstance(other, Integral):
+            return TimeCodeInTicks(self._num_tick - other, self._ppq)
+        return NotImplemented
+
+    def __add__(self, other: Any) -> "TimeCodeInTicks":
+        """This time code moved forward by a number of ticks"""
+        if isinstance(other, Integral):
+            return TimeCodeInTicks(self._num_tick + other, self._ppq)
+        return NotImplemented
+
+    def get_num_tick(self) -> int:
+        """To get the number of ticks of this time code"""
+        return self._num_tick
+
+    def get_ppq(self) -> int:
+        """To get the number of ticks in a quarter note"""
+        return self._ppq
+
+    def get_time_in_seconds(self, timing_map: Any) -> float:
+        """Method to get time in seconds, using the tempo of a timing map (see DataStructure.TimingMap)"""
+        return timing_map.get_second_at_tick(self._num_tick, self._ppq)
+
+    def get_time_in_measure(self, timing_map: Any) -> TimeCodeInMeasures:
+        """Method to get the measure-beat of this tick, using the meters of a timing map"""
+        num_measure, beat_tick = timing_map.get_measure_at_tick(self._num_tick, self._ppq)
+        return TimeCodeInMeasures.from_beat_tick(num_measure, beat_tick)
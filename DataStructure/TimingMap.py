@@ -0,0 +1,253 @@
+# This is the indexed tempo / meter map of a score, used to convert time codes between measures and seconds
+
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+from DataStructure.MeterMap import MeterMap
+from DataStructure.TimeCode import DEFAULT_PPQ, TICKS_PER_BEAT, TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+import numpy as np
+
+
+class TimingMap():
+    """The timing map of a score, built once from the bpm changes and the meter changes of that score.
+
+    Positions inside the score are measured in whole notes, so that:
+        - the meter decides how many whole notes there are in a measure
+        - the bpm decides how many seconds a whole note lasts (240 / bpm)
+
+    Every boundary of a meter segment stores the whole notes elapsed before it,
+    and every boundary of a bpm segment stores the seconds elapsed before it.
+    Both directions of conversion are then answered by a binary search over the boundaries.
+
+    Example:
+        bpm   120              90                80
+              ||   |   |   |   ||   |   |   ||   |   || ...
+        meter 4/4              3/4          2/4
+            ↓
+        meter boundaries: measure 0 -> 0.0 whole notes, measure 1 -> 1.0, measure 2 -> 1.75
+        bpm boundaries:   1.0 whole notes -> 2.0 seconds, 1.75 whole notes -> 4.0 seconds, ...
+    """
+
+    # ------------- Fields ---------------
+    _meter_map: MeterMap
+    """The meter segments, as runs of measures"""
+
+    _meter_measures: List[int]
+    """The measure where every meter segment starts, in ascending order"""
+
+    _meter_values: List[meter]
+    """The meter of every meter segment"""
+
+    _meter_whole_notes: List[float]
+    """The number of whole notes elapsed before every meter segment"""
+
+    _bpm_times: List[Tuple[int, float]]
+    """The measure-beat where every bpm segment starts, in ascending order"""
+
+    _bpm_whole_notes: List[float]
+    """The position (in whole notes) where every bpm segment starts, in ascending order"""
+
+    _bpm_values: List[float]
+    """The bpm of every bpm segment"""
+
+    _bpm_seconds: List[float]
+    """The number of seconds elapsed before every bpm segment"""
+
+    _segment_arrays: Tuple[np.ndarray, ...]
+    """The segment boundaries above as numpy arrays, used by the batch conversions"""
+
+    _meter_ticks: Dict[int, List[int]]
+    """The number of ticks elapsed before every meter segment, for every ppq asked so far"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, var_bpm: Dict[TimeCodeInMeasures, float], var_meter: Dict[TimeCodeInMeasures, meter]) -> None:
+        if len(var_bpm) == 0 or len(var_meter) == 0:
+            raise ValueError('a timing map needs at least one bpm and one meter')
+
+        # Meter segments, changes of meter can only happen at the start of measures
+        self._meter_map = MeterMap(var_meter)
+        self._meter_measures, self._meter_values, self._meter_whole_notes = self._meter_map.get_segments()
+
+        self._meter_ticks = {}
+
+        # Bpm segments, changes of bpm can happen anywhere
+        self._bpm_times = []
+        self._bpm_whole_notes = []
+        self._bpm_values = []
+        self._bpm_seconds = []
+
+        elapsed_seconds = 0.0
+        for timecode in sorted(var_bpm.keys()):
+            current_bpm = var_bpm[timecode]
+            position = self.get_whole_notes_at(timecode.get_num_measure(), timecode.get_num_beat())
+            if self._bpm_values:
+                elapsed_seconds += (position - self._bpm_whole_notes[-1]) * 240 / self._bpm_values[-1]
+            self._bpm_times.append(timecode.get_time_in_measure())
+            self._bpm_whole_notes.append(position)
+            self._bpm_values.append(current_bpm)
+            self._bpm_seconds.append(elapsed_seconds)
+
+        self._segment_arrays = (
+            np.array(self._meter_measures, dtype=np.int64),
+            np.array(self._meter_whole_notes, dtype=np.float64),
+            np.array([mt.get_num_beats() for mt in self._meter_values], dtype=np.float64),
+            np.array([mt.get_beat_unit() for mt in self._meter_values], dtype=np.float64),
+            np.array(self._bpm_whole_notes, dtype=np.float64),
+            np.array(self._bpm_values, dtype=np.float64),
+            np.array(self._bpm_seconds, dtype=np.float64))
+
+
+    # ------------- Methods --------------
+    def get_meter_changes(self) -> List[Tuple[int, meter]]:
+        """To get every change of meter, as (measure, meter), in ascending order"""
+        return self._meter_map.get_changes()
+
+
+    def get_meter_map(self) -> MeterMap:
+        """To get the run-length meter map of this timing map"""
+        return self._meter_map
+
+
+    def get_bpm_changes(self) -> List[Tuple[Tuple[int, float], float]]:
+        """To get every change of bpm, as ((measure, beat), bpm), in ascending order"""
+        return list(zip(self._bpm_times, self._bpm_values))
+
+
+    def get_meter_at_measure(self, num_measure: int) -> meter:
+        """To get the meter which is in use in the given measure"""
+        return self._meter_values[self._find_meter_segment(num_measure)]
+
+
+    def get_bpm_at_second(self, num_second: float) -> float:
+        """To get the bpm which is in use at the given time in seconds"""
+        return self._bpm_values[self._find_bpm_segment_by_second(num_second)]
+
+
+    def get_whole_notes_at(self, num_measure: int, num_beat: float) -> float:
+        """To get the number of whole notes elapsed before a given measure-beat"""
+        i = self._find_meter_segment(num_measure)
+        current_meter = self._meter_values[i]
+        return self._meter_whole_notes[i] \
+            + ((num_measure - self._meter_measures[i]) * current_meter.get_num_beats() + num_beat) \
+            / current_meter.get_beat_unit()
+
+
+    def get_second_at(self, num_measure: int, num_beat: float) -> float:
+        """To get the time in seconds of a given measure-beat"""
+        return self.get_second_at_whole_notes(self.get_whole_notes_at(num_measure, num_beat))
+
+
+    def get_second_at_whole_notes(self, position: float) -> float:
+        """To get the time in seconds of a position in whole notes"""
+        i = max(bisect_right(self._bpm_whole_notes, position) - 1, 0)
+        return self._bpm_seconds[i] + (position - self._bpm_whole_notes[i]) * 240 / self._bpm_values[i]
+
+
+    def get_tick_at(self, num_measure: int, num_beat: float, ppq: int = DEFAULT_PPQ) -> int:
+        """To get the absolute tick of a given measure-beat, a beat between two ticks is rounded to the nearest"""
+        i = self._find_meter_segment(num_measure)
+        ticks_per_beat = self._get_ticks_per_beat(self._meter_values[i], ppq)
+        return self._get_meter_ticks(ppq)[i] \
+            + (num_measure - self._meter_measures[i]) * self._meter_values[i].get_num_beats() * ticks_per_beat \
+            + round(num_beat * ticks_per_beat)
+
+
+    def get_measure_at_tick(self, num_tick: int, ppq: int = DEFAULT_PPQ) -> Tuple[int, int]:
+        """To get the measure of an absolute tick and the beat inside it, in ticks of TimeCodeInMeasures"""
+        meter_ticks = self._get_meter_ticks(ppq)
+        i = max(bisect_right(meter_ticks, num_tick) - 1, 0)
+        current_meter = self._meter_values[i]
+        ticks_per_beat = self._get_ticks_per_beat(current_meter, ppq)
+        num_measure_elapsed, ticks_in_measure = divmod(num_tick - meter_ticks[i], \
+            current_meter.get_num_beats() * ticks_per_beat)
+        # Rounded integer division, exact whenever the beat falls on a tick of TimeCodeInMeasures
+        beat_tick = (2 * ticks_in_measure * TICKS_PER_BEAT + ticks_per_beat) // (2 * ticks_per_beat)
+        return (self._meter_measures[i] + num_measure_elapsed, beat_tick)
+
+
+    def get_second_at_tick(self, num_tick: int, ppq: int = DEFAULT_PPQ) -> float:
+        """To get the time in seconds of an absolute tick"""
+        return self.get_second_at_whole_notes(num_tick / (4 * ppq))
+
+
+    def get_time_in_second(self, t_in_measure: TimeCodeInMeasures) -> float:
+        """Method to locate a specific time in seconds using a time code in measures"""
+        return self.get_second_at(t_in_measure.get_num_measure(), t_in_measure.get_num_beat())
+
+
+    def get_whole_notes_at_second(self, num_second: float) -> float:
+        """To get the position (in whole notes) of a time in seconds, the first and the last bpm segments
+        are extended before the start and after the end of the score"""
+        i = self._find_bpm_segment_by_second(num_second)
+        return self._bpm_whole_notes[i] + (num_second - self._bpm_seconds[i]) * self._bpm_values[i] / 240
+
+
+    def get_time_in_measure(self, num_second: float) -> Tuple[int, float]:
+        """Method to locate a specific time in measure-beat using a time in seconds"""
+        # Seconds -> whole notes, using the bpm segment of that second
+        position = self.get_whole_notes_at_second(num_second)
+
+        # Whole notes -> measure-beat, using the meter segment of that position
+        j = max(bisect_right(self._meter_whole_notes, position) - 1, 0)
+        current_meter = self._meter_values[j]
+        num_beats_elapsed = (position - self._meter_whole_notes[j]) * current_meter.get_beat_unit()
+        num_measure_elapsed = int(num_beats_elapsed // current_meter.get_num_beats())
+
+        return (self._meter_measures[j] + num_measure_elapsed,
+                num_beats_elapsed - num_measure_elapsed * current_meter.get_num_beats())
+
+
+    def get_whole_notes_of(self, num_measures: np.ndarray, num_beats: np.ndarray) -> np.ndarray:
+        """The batch version of get_whole_notes_at, for arrays of measures and beats of the same length"""
+        meter_measures, meter_whole_notes, meter_num_beats, meter_beat_units = self._segment_arrays[:4]
+        num_measures = np.asarray(num_measures, dtype=np.int64)
+        num_beats = np.asarray(num_beats, dtype=np.float64)
+
+        i = np.maximum(np.searchsorted(meter_measures, num_measures, side='right') - 1, 0)
+        return meter_whole_notes[i] \
+            + ((num_measures - meter_measures[i]) * meter_num_beats[i] + num_beats) / meter_beat_units[i]
+
+
+    def get_seconds_of(self, num_measures: np.ndarray, num_beats: np.ndarray) -> np.ndarray:
+        """The batch version of get_second_at, returns a float64 array of the time in seconds"""
+        return self.get_seconds_at_whole_notes(self.get_whole_notes_of(num_measures, num_beats))
+
+
+    def get_seconds_at_whole_notes(self, positions: np.ndarray) -> np.ndarray:
+        """The batch version of get_second_at_whole_notes, returns a float64 array of the time in seconds"""
+        bpm_whole_notes, bpm_values, bpm_seconds = self._segment_arrays[4:]
+        positions = np.asarray(positions, dtype=np.float64)
+
+        i = np.maximum(np.searchsorted(bpm_whole_notes, positions, side='right') - 1, 0)
+        return bpm_seconds[i] + (positions - bpm_whole_notes[i]) * 240 / bpm_values[i]
+
+
+    def _get_meter_ticks(self, ppq: int) -> List[int]:
+        """To get the number of ticks elapsed before every meter segment, computed once per ppq"""
+        meter_ticks = self._meter_ticks.get(ppq)
+        if meter_ticks is None:
+            meter_ticks = [0]
+            for i in range(1, len(self._meter_measures)):
+                previous_meter = self._meter_values[i - 1]
+                meter_ticks.append(meter_ticks[-1] + (self._meter_measures[i] - self._meter_measures[i - 1]) \
+                    * previous_meter.get_num_beats() * self._get_ticks_per_beat(previous_meter, ppq))
+            self._meter_ticks[ppq] = meter_ticks
+        return meter_ticks
+
+
+    def _get_ticks_per_beat(self, mt: meter, ppq: int) -> int:
+        """To get the number of ticks in one beat of a meter"""
+        if (4 * ppq) % mt.get_beat_unit() != 0:
+            raise ValueError(f'a beat of {mt.get_num_beats()}/{mt.get_beat_unit()} is not a whole number of ticks at ppq {ppq}')
+        return 4 * ppq // mt.get_beat_unit()
+
+
+    def _find_meter_segment(self, num_measure: int) -> int:
+        """To get the index of the meter segment which contains the given measure"""
+        return max(bisect_right(self._meter_measures, num_measure) - 1, 0)
+
+
+    def _find_bpm_segment_by_second(self, num_second: float) -> int:
+        """To get the index of the bpm segment which contains the given time in seconds"""
+        return max(bisect_right(self._bpm_seconds, num_second) - 1, 0)
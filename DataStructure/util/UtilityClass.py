@@ -1,7 +1,18 @@
 #stashes all utilities used by data structure
 
 from typing import Any, Tuple, Dict
-from Game.Util.UtilityFunctions import isPowerOfTwo
+import math
+
+
+def Log2(x):
+    """To get the the exponential factor of log base 2 and the input"""
+    return (math.log10(x) /
+            math.log10(2))
+
+
+def isPowerOfTwo(n) -> bool:
+    """To check if an integer is the power of 2"""
+    return (math.ceil(Log2(n)) == math.floor(Log2(n)))
 
 
 class meter():
@@ -29,8 +40,8 @@ class meter():
 
 
     # --------------------- Methods -----------------------    
-    def __hash__(self, num_beats: int, beat_unit: int) -> int:
-        return hash(self._num_beats + self._beat_unit)
+    def __hash__(self) -> int:
+        return hash((self._num_beats, self._beat_unit))
 
     def __eq__(self, obj: Any) -> bool:
         if not isinstance(obj, meter):
@@ -0,0 +1,195 @@
+# This is the batch compiler of the content pipeline, run from the root of the repository:
+#     python -m Game.batchCompiler songs --output build/charts --workers 8
+
+"""Every chart of a directory (or listed by a manifest, one path per line) is parsed, validated and compiled
+into a binary chart (see Game.binaryChart), which holds the sorted nodes, their seconds columns and the timing map.
+
+The charts are compiled over a pool of processes. A chart which fails does not stop the run:
+its error is collected, reported at the end (and in the JSON report), and the exit status is 1.
+The binary chart of a source `songs/pack/song.chart` is written to `<output>/pack/song.rgcb`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from Game.binaryChart import write_binary_chart_to
+from Game.chartParser import read_chart_file
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.songLibrary import CHART_SUFFIX, find_chart_files
+import numpy as np
+
+
+COMPILED_SUFFIX = '.rgcb'
+"""The suffix of the compiled charts"""
+
+CompileJob = Tuple[str, str]
+"""Represents the compilation of one chart: (path of the source chart, path of the compiled chart)"""
+
+
+class CompileResult(NamedTuple):
+    """The outcome of the compilation of one chart"""
+    source: str
+    output: str
+    error: Optional[str]
+    """Why the chart could not be compiled, None when it was written"""
+    num_node: int
+    seconds: float
+    """Time spent on this chart by its worker"""
+
+
+
+def validate_compiled_score(score: pianoGameMusicScore) -> List[str]:
+    """To find what is wrong with a score beyond what the chart parser checks, an empty list for a legal score:
+        - the checks of validate_piano_score (trail bounds, first bpm and meter at (0, 0), ...)
+        - every node and every bpm change must fall inside its measure, given the meter of that measure
+        - every time in seconds must be a finite number
+    """
+    if not score.validate_piano_score():
+        return ['the trails, meters or bpm of the score are not legal']
+
+    problems = []
+    timing_map = score.retrieve_timing_map()
+    meter_map = timing_map.get_meter_map()
+    all_nodes = score.retrieve_all_nodes()
+
+    # The number of beats of a measure is the absolute beat of the next measure minus its own
+    for name, measures, beats, allow_end in (('starts', all_nodes.start_measures, all_nodes.start_beats, False), \
+        ('ends', all_nodes.end_measures, all_nodes.end_beats, True)):
+        num_beats = meter_map.get_beats_of(measures + 1) - meter_map.get_beats_of(measures)
+        outside = np.flatnonzero(beats > num_beats if allow_end else beats >= num_beats)
+        if len(outside) > 0:
+            row = int(outside[0])
+            problems.append(f'{len(outside)} node(s) {name} outside of their measure, the first one at measure ' \
+                f'{int(measures[row])} beat {float(beats[row])!r} of a measure of {int(num_beats[row])} beats')
+
+    for (num_measure, num_beat), _ in timing_map.get_bpm_changes():
+        num_beats = meter_map.get_meter_at(num_measure).get_num_beats()
+        if num_beat >= num_beats:
+            problems.append(f'the bpm change at measure {num_measure} beat {num_beat!r} is outside of its measure')
+
+    if not (np.isfinite(all_nodes.start_seconds).all() and np.isfinite(all_nodes.end_seconds).all()):
+        problems.append('some times in seconds are not finite')
+    return problems
+
+
+def compile_chart(job: CompileJob) -> CompileResult:
+    """To parse, validate and compile one chart, any error is returned in the result instead of being raised"""
+    source, output = job
+    started = time.perf_counter()
+    num_node = 0
+    try:
+        score = read_chart_file(source)
+        num_node = score.get_num_node()
+        problems = validate_compiled_score(score)
+        if problems:
+            raise ValueError('; '.join(problems))
+        _write_atomically(score, output)
+    except (OSError, ValueError) as error:
+        return CompileResult(source, output, str(error), num_node, time.perf_counter() - started)
+    except Exception as error:
+        # An unexpected error is reported with its chart too, it never stops the compilation of the other charts
+        return CompileResult(source, output, f'{type(error).__name__}: {error}', num_node, \
+            time.perf_counter() - started)
+    return CompileResult(source, output, None, num_node, time.perf_counter() - started)
+
+
+def compile_charts(jobs: List[CompileJob], max_workers: Optional[int] = None, chunksize: int = 8, \
+    progress: Callable[[int, int, CompileResult], Any] = lambda done, total, result: None) -> List[CompileResult]:
+    """To compile many charts over a process pool (in this process when max_workers is 1),
+    progress is called after every chart with the number of charts done so far. The results are in job order."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    results = []
+    for result in _map_jobs(jobs, max_workers, chunksize):
+        results.append(result)
+        progress(len(results), len(jobs), result)
+    return results
+
+
+def find_jobs(source: str, output_directory: str) -> List[CompileJob]:
+    """To list the charts to compile from a directory (every chart file under it) or from a manifest file
+    (one path per line, relative to the manifest, blank lines and # comments are ignored)"""
+    if os.path.isdir(source):
+        root = os.path.abspath(source)
+        paths: Iterable[str] = sorted(path for path, _, _ in find_chart_files(root))
+    else:
+        root = os.path.dirname(os.path.abspath(source))
+        paths = list(_read_manifest(source, root))
+
+    jobs = []
+    for path in paths:
+        relative = os.path.relpath(path, root)
+        if relative.endswith(CHART_SUFFIX):
+            relative = relative[:-len(CHART_SUFFIX)]
+        jobs.append((path, os.path.join(output_directory, relative + COMPILED_SUFFIX)))
+    return jobs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Validate and compile charts into binary charts.')
+    parser.add_argument('source', help=f'a directory of {CHART_SUFFIX} files, or a manifest listing chart files')
+    parser.add_argument('--output', required=True, help='directory of the compiled charts')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (all cores by default)')
+    parser.add_argument('--chunksize', type=int, default=8, help='charts sent to a process at once')
+    parser.add_argument('--report', default=None, help='file of a JSON report of every chart')
+    parser.add_argument('--quiet', action='store_true', help='only report the errors')
+    arguments = parser.parse_args(argv)
+
+    jobs = find_jobs(arguments.source, arguments.output)
+    started = time.perf_counter()
+
+    def report_progress(done: int, total: int, result: CompileResult) -> None:
+        if result.error is not None:
+            print(f'[{done}/{total}] {result.source}: {result.error}', file=sys.stderr)
+        elif not arguments.quiet:
+            print(f'[{done}/{total}] {result.source}', file=sys.stderr)
+
+    results = compile_charts(jobs, arguments.workers, arguments.chunksize, report_progress)
+    failed = [result for result in results if result.error is not None]
+    print(f'compiled {len(results) - len(failed)} of {len(results)} charts in ' \
+        f'{time.perf_counter() - started:.1f} s, {len(failed)} failed', file=sys.stderr)
+
+    if arguments.report is not None:
+        with open(arguments.report, 'w') as report_file:
+            json.dump([result._asdict() for result in results], report_file, indent=2)
+    return 1 if failed else 0
+
+
+
+def _map_jobs(jobs: List[CompileJob], max_workers: int, chunksize: int) -> Iterator[CompileResult]:
+    if max_workers <= 1 or len(jobs) <= 1:
+        yield from map(compile_chart, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        yield from executor.map(compile_chart, jobs, chunksize=chunksize)
+
+
+def _read_manifest(path: str, root: str) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8') as manifest_file:
+        for line in manifest_file:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield os.path.normpath(os.path.join(root, line))
+
+
+def _write_atomically(score: pianoGameMusicScore, output: str) -> None:
+    """To write a binary chart through a temporary file, so that a reader never sees half a chart"""
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as chart_file:
+            write_binary_chart_to(score, chart_file)
+        os.replace(temporary_path, output)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# This is the versioned binary container of compiled scores, opened with mmap without copying
+
+"""Layout of a compiled chart (little-endian, every section starts on an 8-byte boundary):
+
+    header    magic b'RGCB', version, score kind, number of trails / nodes / meter changes / bpm changes
+    meters    one record per meter change: measure (int64), num_beats (int32), beat_unit (int32)
+    bpms      one record per bpm change:   measure (int64), beat (float64), bpm (float64)
+    nodes     one fixed-width column per field, in the sorted order of the score:
+              start measures (int64), start beats (float64), end measures (int64), end beats (float64),
+              start seconds (float64), end seconds (float64), trails (int32), kinds (int8)
+
+Opening a chart maps the file and wraps every column with numpy.frombuffer, so nothing is read
+or copied up front, the pages of a column are loaded by the OS when that column is first touched.
+"""
+
+import mmap
+import struct
+from typing import Dict, Optional, Type
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.gameMusicScore import pianoGameMusicScore, VBPMPianoGameMusicScore, VMVBPianoGameMusicScore
+from Game.nodeTable import NodeTable
+import numpy as np
+
+
+BINARY_CHART_MAGIC = b'RGCB'
+BINARY_CHART_VERSION = 1
+
+_HEADER = struct.Struct('<4sHBxIQII4x')
+"""magic, version, score kind, (pad), number of trails, nodes, meter changes, bpm changes, (pad)"""
+
+_METER_RECORD = np.dtype([('measure', '<i8'), ('num_beats', '<i4'), ('beat_unit', '<i4')])
+_BPM_RECORD = np.dtype([('measure', '<i8'), ('beat', '<f8'), ('bpm', '<f8')])
+
+_NODE_COLUMNS = (('start_measures', '<i8'), ('start_beats', '<f8'), ('end_measures', '<i8'), ('end_beats', '<f8'),
+                 ('start_seconds', '<f8'), ('end_seconds', '<f8'), ('trails', '<i4'), ('kinds', '<i1'))
+
+_SCORE_KINDS = (pianoGameMusicScore, VBPMPianoGameMusicScore, VMVBPianoGameMusicScore)
+"""The score class stored in the header, by its position in this tuple"""
+
+
+class BinaryChartError(ValueError):
+    """Raised when a file is not a compiled chart that this version can open, or holds values no score can have"""
+
+
+
+def write_binary_chart(score: pianoGameMusicScore, path: str) -> None:
+    """To write a compiled score into a binary chart file"""
+    with open(path, 'wb') as chart_file:
+        write_binary_chart_to(score, chart_file)
+
+
+def write_binary_chart_to(score: pianoGameMusicScore, chart_file) -> None:
+    """To write a compiled score into an opened binary file"""
+    timing_map = score.retrieve_timing_map()
+    all_nodes = score.retrieve_all_nodes()
+
+    meters = np.array([(num_measure, mt.get_num_beats(), mt.get_beat_unit()) \
+        for num_measure, mt in timing_map.get_meter_changes()], dtype=_METER_RECORD)
+    bpms = np.array([(num_measure, num_beat, bpm) \
+        for (num_measure, num_beat), bpm in timing_map.get_bpm_changes()], dtype=_BPM_RECORD)
+    score_kind = max(i for i, score_class in enumerate(_SCORE_KINDS) if isinstance(score, score_class))
+
+    chart_file.write(_HEADER.pack(BINARY_CHART_MAGIC, BINARY_CHART_VERSION, score_kind, score.get_num_trail(), \
+        len(all_nodes), len(meters), len(bpms)))
+    _write_section(chart_file, meters)
+    _write_section(chart_file, bpms)
+    for name, dtype in _NODE_COLUMNS:
+        _write_section(chart_file, np.ascontiguousarray(getattr(all_nodes, name), dtype=dtype))
+
+
+def open_binary_chart(path: str, score_class: Optional[Type[pianoGameMusicScore]] = None) -> pianoGameMusicScore:
+    """To open a binary chart file as a score, memory-mapped and without copying the node columns.
+    The score is of the class stored in the file, unless another score class is asked for."""
+    with open(path, 'rb') as chart_file:
+        if chart_file.seek(0, 2) < _HEADER.size:
+            raise BinaryChartError(f'{path} is too short to be a compiled chart')
+        mapped = mmap.mmap(chart_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return load_binary_chart(mapped, score_class)
+
+
+def load_binary_chart(buffer, score_class: Optional[Type[pianoGameMusicScore]] = None) -> pianoGameMusicScore:
+    """To build a score on top of a buffer holding a binary chart, the node columns are views of the buffer"""
+    if len(buffer) < _HEADER.size:
+        raise BinaryChartError('the buffer is too short to be a compiled chart')
+    magic, version, score_kind, num_trail, num_node, num_meter, num_bpm = _HEADER.unpack_from(buffer, 0)
+    if magic != BINARY_CHART_MAGIC:
+        raise BinaryChartError('this is not a compiled chart')
+    if version != BINARY_CHART_VERSION:
+        raise BinaryChartError(f'compiled chart version {version} is not supported (expected {BINARY_CHART_VERSION})')
+    if score_kind >= len(_SCORE_KINDS):
+        raise BinaryChartError(f'unknown score kind {score_kind}')
+
+    offset = _HEADER.size
+    meters, offset = _read_section(buffer, offset, _METER_RECORD, num_meter)
+    bpms, offset = _read_section(buffer, offset, _BPM_RECORD, num_bpm)
+    columns = {}
+    for name, dtype in _NODE_COLUMNS:
+        columns[name], offset = _read_section(buffer, offset, np.dtype(dtype), num_node)
+
+    try:
+        var_meter: Dict[TimeCodeInMeasures, meter] = {TimeCodeInMeasures(int(record['measure']), 0.0): \
+            meter(int(record['num_beats']), int(record['beat_unit'])) for record in meters}
+        var_bpm: Dict[TimeCodeInMeasures, float] = {TimeCodeInMeasures(int(record['measure']), float(record['beat'])): \
+            float(record['bpm']) for record in bpms}
+    except ValueError as error:
+        raise BinaryChartError(f'the compiled chart holds an illegal timing change: {error}') from error
+
+    all_nodes = NodeTable(columns['start_measures'], columns['start_beats'], columns['end_measures'], \
+        columns['end_beats'], columns['trails'], columns['kinds'], columns['start_seconds'], columns['end_seconds'])
+    stored_class = _SCORE_KINDS[score_kind]
+    try:
+        return (score_class or stored_class).from_compiled_nodes(all_nodes, num_trail, var_meter, var_bpm)
+    except ValueError as error:
+        # A score of the stored class can always be built from a sound chart, another class may not fit it
+        if score_class is not None and score_class is not stored_class:
+            raise
+        raise BinaryChartError(f'the compiled chart holds an illegal score: {error}') from error
+
+
+def _write_section(chart_file, values: np.ndarray) -> None:
+    """To write an array, followed by the padding up to the next 8-byte boundary"""
+    data = values.tobytes()
+    chart_file.write(data)
+    chart_file.write(b'\0' * (-len(data) % 8))
+
+
+def _read_section(buffer, offset: int, dtype: np.dtype, count: int):
+    """To view an array inside the buffer, returns the view and the offset of the next section"""
+    end = offset + dtype.itemsize * count
+    if end > len(buffer):
+        raise BinaryChartError('the compiled chart is truncated')
+    values = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    return values, end + (-end % 8)
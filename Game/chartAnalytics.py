@@ -0,0 +1,152 @@
+# This is the note-density and difficulty analytics of a compiled score, computed from its seconds columns
+
+"""Every measure is computed over whole columns with NumPy (sorting, searchsorted, cumulative sums),
+never with a Python loop over the nodes, so a chart of a million nodes is analysed in milliseconds.
+
+The functions take the columns of a node table sorted by starting time (as held by a compiled score),
+analyze_score computes all of them at once:
+
+    analytics = analyze_score(score)
+    analytics.peak_density, analytics.max_stream, analytics.hold_coverage
+"""
+
+from typing import NamedTuple, Optional, Tuple
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.nodeTable import NODE_KIND_HOLD, argsort_by_trail
+import numpy as np
+
+
+DENSITY_WINDOW = 1.0
+"""The length (in seconds) of the sliding window of the density measures"""
+
+CHORD_TOLERANCE = 1e-3
+"""Nodes starting less than this many seconds apart are played together, as one chord"""
+
+JACK_INTERVAL = 0.2
+"""The longest gap (in seconds) between two nodes of the same trail which still makes a jack"""
+
+STREAM_INTERVAL = 0.2
+"""The longest gap (in seconds) between two chords on different trails which still makes a stream"""
+
+
+class ChartAnalytics(NamedTuple):
+    """The density and difficulty measures of a score"""
+    num_node: int
+    duration: float
+    """Time (in seconds) from the start of the score to the end of its last node"""
+    mean_density: float
+    """Nodes per second over the whole score"""
+    peak_density: float
+    """Largest number of nodes starting within DENSITY_WINDOW seconds, per second"""
+    trail_loads: np.ndarray
+    """Share of the nodes on every trail, the first entry is trail 1"""
+    num_chord: int
+    """Number of times two nodes or more start together"""
+    max_chord: int
+    """Size of the largest chord, 1 when no nodes start together"""
+    num_jack: int
+    """Number of nodes following another node of the same trail within JACK_INTERVAL"""
+    max_jack: int
+    """Number of nodes of the longest jack run (1 when there is none)"""
+    max_stream: int
+    """Number of chords of the longest stream, chords on changing trails following each other within STREAM_INTERVAL"""
+    hold_coverage: float
+    """Share of the duration during which at least one hold node is held"""
+
+
+
+def get_density_curve(starts: np.ndarray, window: float = DENSITY_WINDOW, step: float = 0.5, \
+    end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """To get the notes-per-second curve of sorted starting times: the number of nodes starting in
+    [t, t + window) divided by the window, for t = 0, step, 2 step, ... until end (the last start by default).
+    Returns the times and the densities."""
+    if end is None:
+        end = float(starts[-1]) if len(starts) > 0 else 0.0
+    times = np.arange(0.0, end + step, step)
+    counts = np.searchsorted(starts, times + window, side='left') - np.searchsorted(starts, times, side='left')
+    return times, counts / window
+
+
+def get_peak_density(starts: np.ndarray, window: float = DENSITY_WINDOW) -> float:
+    """To get the largest number of nodes starting within a window (in seconds) of sorted starting times,
+    per second. Every window worth checking begins on a node, so one searchsorted gives all of them."""
+    if len(starts) == 0:
+        return 0.0
+    counts = np.searchsorted(starts, starts + window, side='left') - np.arange(len(starts))
+    return int(counts.max()) / window
+
+
+def get_trail_loads(trails: np.ndarray, num_trail: int) -> np.ndarray:
+    """To get the share of the nodes on every trail (trail 1 first)"""
+    counts = np.bincount(trails, minlength=num_trail + 1)[1:num_trail + 1]
+    return counts / max(len(trails), 1)
+
+
+def get_chord_sizes(starts: np.ndarray, tolerance: float = CHORD_TOLERANCE) -> np.ndarray:
+    """To get the number of nodes of every group of nodes starting together, in order, from sorted starting times"""
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    group_starts = np.flatnonzero(np.concatenate(([True], np.diff(starts) > tolerance)))
+    return np.diff(np.append(group_starts, len(starts)))
+
+
+def get_jacks(starts: np.ndarray, trails: np.ndarray, interval: float = JACK_INTERVAL) -> Tuple[int, int]:
+    """To find the jacks of sorted starting times: nodes following another node of the same trail within interval.
+    Returns the number of such nodes and the length (in nodes) of the longest run of them."""
+    if len(starts) < 2:
+        return 0, min(len(starts), 1)
+    order = argsort_by_trail(trails)
+    by_trail = starts[order]
+    same_trail = trails[order][1:] == trails[order][:-1]
+    is_jack = same_trail & (np.diff(by_trail) <= interval)
+    return int(np.count_nonzero(is_jack)), _get_longest_run(is_jack) + 1
+
+
+def get_longest_stream(starts: np.ndarray, trails: np.ndarray, interval: float = STREAM_INTERVAL, \
+    tolerance: float = CHORD_TOLERANCE) -> int:
+    """To find the longest stream of sorted starting times, in chords: chords following each other within interval,
+    each one starting on another trail than the previous one (a chord counts by its lowest trail)"""
+    if len(starts) == 0:
+        return 0
+    chord_rows = np.flatnonzero(np.concatenate(([True], np.diff(starts) > tolerance)))
+    chord_starts = starts[chord_rows]
+    chord_trails = np.minimum.reduceat(trails, chord_rows)
+    is_stream = (np.diff(chord_starts) <= interval) & (chord_trails[1:] != chord_trails[:-1])
+    return _get_longest_run(is_stream) + 1
+
+
+def get_hold_coverage(starts: np.ndarray, ends: np.ndarray, duration: float) -> float:
+    """To get the share of duration during which at least one of the intervals [start, end] is held,
+    from intervals sorted by start. The union of the intervals is measured with a running maximum of their ends."""
+    if len(starts) == 0 or duration <= 0:
+        return 0.0
+    reach = np.maximum.accumulate(ends)
+    previous_reach = np.concatenate(([-np.inf], reach[:-1]))
+    covered = np.maximum(reach - np.maximum(starts, previous_reach), 0.0).sum()
+    return float(min(covered / duration, 1.0))
+
+
+def analyze_score(score: pianoGameMusicScore, window: float = DENSITY_WINDOW) -> ChartAnalytics:
+    """To compute every measure of a score from its seconds columns"""
+    all_nodes = score.retrieve_all_nodes()
+    starts = all_nodes.start_seconds
+    trails = all_nodes.trails
+    num_node = len(all_nodes)
+    duration = float(all_nodes.end_seconds.max()) if num_node > 0 else 0.0
+
+    chord_sizes = get_chord_sizes(starts)
+    num_jack, max_jack = get_jacks(starts, trails)
+    holds = all_nodes.kinds == NODE_KIND_HOLD
+    return ChartAnalytics(num_node, duration, num_node / duration if duration > 0 else 0.0, \
+        get_peak_density(starts, window), get_trail_loads(trails, score.get_num_trail()), \
+        int(np.count_nonzero(chord_sizes > 1)), int(chord_sizes.max()) if num_node > 0 else 0, num_jack, max_jack, \
+        get_longest_stream(starts, trails), get_hold_coverage(starts[holds], all_nodes.end_seconds[holds], duration))
+
+
+
+def _get_longest_run(flags: np.ndarray) -> int:
+    """To get the length of the longest run of True in a boolean array"""
+    if not flags.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
@@ -0,0 +1,316 @@
+# This is the streaming parser of the text chart format
+
+"""The text chart format, one statement per line:
+
+    # comments and blank lines are ignored
+    trails 4                  <- number of trails, must come first
+    meter 0 4/4               <- meter change: measure, num_beats/beat_unit (only at the start of a measure)
+    meter 16 3/4
+    bpm 0 0 120               <- bpm change: measure, beat, bpm
+    bpm 8 2.5 90
+    nodes                     <- every following line is a node
+    0 1 0 1 2                 <- start measure, start beat, end measure, end beat, trail
+    1 0 2 0 3
+
+Beats are in steps of 1/1920 beat (see DataStructure.TimeCode.TICKS_PER_BEAT): halves down to 1/128,
+triplets and quintuplets, but not septuplets. A beat between two steps is an error of its line.
+
+The parser is a generator over the lines, so a chart is read in a single pass and only the node
+columns of the score are ever held in memory, never a list of lines or of node objects.
+"""
+
+import math
+from array import array
+from bisect import bisect_right, insort
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, TextIO, Union
+from DataStructure.TimeCode import TICKS_PER_BEAT, TimeCodeInMeasures, is_on_tick
+from DataStructure.util.UtilityClass import meter
+from Game.gameMusicScore import pianoGameMusicScore, build_piano_score
+from Game.nodeTable import NodeTable
+
+
+_INT64_MAX = 2 ** 63 - 1
+"""The largest measure which fits the int64 measure columns"""
+
+_INT32_MAX = 2 ** 31 - 1
+"""The largest number of trails which fits the int32 trail column"""
+
+
+class ChartParseError(ValueError):
+    """Raised when a chart can not be parsed, the message starts with the line number"""
+
+    # ------------- Fields ---------------
+    line_number: int
+
+
+    # ----------- Constructor ------------
+    def __init__(self, line_number: int, message: str) -> None:
+        super().__init__(f'line {line_number}: {message}')
+        self.line_number = line_number
+
+
+
+class TrailCountEvent(NamedTuple):
+    line_number: int
+    num_trail: int
+
+class MeterEvent(NamedTuple):
+    line_number: int
+    time: TimeCodeInMeasures
+    value: meter
+
+class BpmEvent(NamedTuple):
+    line_number: int
+    time: TimeCodeInMeasures
+    value: float
+
+class NodeEvent(NamedTuple):
+    line_number: int
+    start_measure: int
+    start_beat: float
+    end_measure: int
+    end_beat: float
+    trail: int
+
+ChartEvent = Union[TrailCountEvent, MeterEvent, BpmEvent, NodeEvent]
+"""Represents one statement of a chart"""
+
+
+def parse_chart_lines(lines: Iterable[str]) -> Iterator[ChartEvent]:
+    """To parse the lines of a chart lazily, one event per statement.
+    Raises ChartParseError, with the line number, on the first illegal line.
+
+    Every beat must lie inside its measure, by the meter in force there. The meters are only all known
+    at the end of the header, so the bpm changes are held back and checked (and yielded) there."""
+    num_trail = None
+    in_nodes = False
+    meters = _MeterBeats()
+    bpm_events: List[BpmEvent] = []
+
+    for line_number, line in enumerate(lines, start=1):
+        words = line.split('#', 1)[0].split()
+        if len(words) == 0:
+            continue
+
+        if in_nodes:
+            event = _parse_node(line_number, words, num_trail)
+            meters.check(line_number, event.start_measure, event.start_beat)
+            meters.check(line_number, event.end_measure, event.end_beat)
+            yield event
+            continue
+
+        keyword = words[0]
+        if keyword == 'trails':
+            _expect_length(line_number, words, 2)
+            num_trail = _parse_number(line_number, words[1], int)
+            if not 1 <= num_trail <= _INT32_MAX:
+                raise ChartParseError(line_number, f'the number of trails must be between 1 and {_INT32_MAX}')
+            yield TrailCountEvent(line_number, num_trail)
+        elif num_trail is None:
+            raise ChartParseError(line_number, 'the number of trails must be given first')
+        elif keyword == 'meter':
+            _expect_length(line_number, words, 3)
+            num_measure = _parse_number(line_number, words[1], int)
+            if num_measure < 0:
+                raise ChartParseError(line_number, 'measure can not be negative')
+            event = MeterEvent(line_number, TimeCodeInMeasures(num_measure, 0.0), _parse_meter(line_number, words[2]))
+            meters.add(num_measure, event.value)
+            yield event
+        elif keyword == 'bpm':
+            _expect_length(line_number, words, 4)
+            bpm = _parse_number(line_number, words[3], float)
+            if bpm <= 0:
+                raise ChartParseError(line_number, 'bpm must be positive')
+            bpm_events.append(BpmEvent(line_number, _parse_time(line_number, words[1], words[2]), bpm))
+        elif keyword == 'nodes':
+            _expect_length(line_number, words, 1)
+            yield from _check_bpm_events(bpm_events, meters)
+            in_nodes = True
+        else:
+            raise ChartParseError(line_number, f'unknown statement {keyword!r}')
+
+    if not in_nodes:
+        yield from _check_bpm_events(bpm_events, meters)
+
+
+def load_chart(lines: Iterable[str]) -> pianoGameMusicScore:
+    """To build a score from the lines of a chart, in a single pass.
+    The nodes are streamed into typed column buffers, which become the node table of the score."""
+    num_trail = None
+    var_meter: Dict[TimeCodeInMeasures, meter] = {}
+    var_bpm: Dict[TimeCodeInMeasures, float] = {}
+    columns = (array('q'), array('d'), array('q'), array('d'), array('i'))
+    start_measures, start_beats, end_measures, end_beats, trails = columns
+
+    for event in parse_chart_lines(lines):
+        if isinstance(event, NodeEvent):
+            start_measures.append(event.start_measure)
+            start_beats.append(event.start_beat)
+            end_measures.append(event.end_measure)
+            end_beats.append(event.end_beat)
+            trails.append(event.trail)
+        elif isinstance(event, BpmEvent):
+            _expect_unique(event, var_bpm)
+            var_bpm[event.time] = event.value
+        elif isinstance(event, MeterEvent):
+            _expect_unique(event, var_meter)
+            var_meter[event.time] = event.value
+        else:
+            num_trail = event.num_trail
+
+    if num_trail is None:
+        raise ChartParseError(0, 'the chart is empty')
+    if TimeCodeInMeasures(0, 0.0) not in var_meter:
+        raise ChartParseError(0, 'the first meter must be at measure 0')
+    if TimeCodeInMeasures(0, 0.0) not in var_bpm:
+        raise ChartParseError(0, 'the first bpm must be at measure 0, beat 0')
+
+    all_nodes = NodeTable(*columns)
+    return build_piano_score(all_nodes, num_trail, var_meter, var_bpm)
+
+
+def read_chart_file(path: str, encoding: str = 'utf-8') -> pianoGameMusicScore:
+    """To build a score from a chart file, reading it line by line"""
+    with open(path, 'r', encoding=encoding) as chart_file:
+        return load_chart(chart_file)
+
+
+def write_chart(score: pianoGameMusicScore, chart_file: TextIO) -> None:
+    """To write a score in the text chart format"""
+    timing_map = score.retrieve_timing_map()
+    chart_file.write(f'trails {score.get_num_trail()}\n')
+    for num_measure, mt in timing_map.get_meter_changes():
+        chart_file.write(f'meter {num_measure} {mt.get_num_beats()}/{mt.get_beat_unit()}\n')
+    for (num_measure, num_beat), bpm in timing_map.get_bpm_changes():
+        chart_file.write(f'bpm {num_measure} {num_beat!r} {bpm!r}\n')
+
+    chart_file.write('nodes\n')
+    all_nodes = score.retrieve_all_nodes()
+    for row in zip(all_nodes.start_measures.tolist(), all_nodes.start_beats.tolist(), \
+        all_nodes.end_measures.tolist(), all_nodes.end_beats.tolist(), all_nodes.trails.tolist()):
+        chart_file.write('%d %r %d %r %d\n' % row)
+
+
+class _MeterBeats():
+    """The number of beats of the measures of a chart, from the meter changes parsed so far"""
+
+    # ------------- Fields ---------------
+    _measures: List[int]
+    """Measure of every meter change, ascending"""
+
+    _num_beats: Dict[int, int]
+    """Number of beats of the meter of every meter change, by its measure"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self) -> None:
+        self._measures = []
+        self._num_beats = {}
+
+
+    # ------------- Methods --------------
+    def add(self, num_measure: int, mt: meter) -> None:
+        """Method to add a meter change, a second one at the same measure is reported by load_chart"""
+        if num_measure not in self._num_beats:
+            insort(self._measures, num_measure)
+        self._num_beats[num_measure] = mt.get_num_beats()
+
+    def check(self, line_number: int, num_measure: int, num_beat: float) -> None:
+        """To reject a beat past the end of its measure. Without a meter before the measure
+        nothing is checked, the missing first meter is reported by load_chart."""
+        i = bisect_right(self._measures, num_measure) - 1
+        if i < 0:
+            return
+        num_beats = self._num_beats[self._measures[i]]
+        if num_beat >= num_beats:
+            raise ChartParseError(line_number, f'beat {num_beat} is past the end of measure {num_measure}, ' \
+                f'which has {num_beats} beats')
+
+
+def _check_bpm_events(bpm_events: List[BpmEvent], meters: _MeterBeats) -> Iterator[BpmEvent]:
+    """To check the beats of the bpm changes of the header, once every meter is known"""
+    for event in bpm_events:
+        meters.check(event.line_number, event.time.get_num_measure(), event.time.get_num_beat())
+        yield event
+    bpm_events.clear()
+
+
+def _parse_node(line_number: int, words: list, num_trail: int) -> NodeEvent:
+    """To parse the words of one node line"""
+    _expect_length(line_number, words, 5)
+    try:
+        start_measure, start_beat, end_measure, end_beat, trail = \
+            int(words[0]), float(words[1]), int(words[2]), float(words[3]), int(words[4])
+    except ValueError:
+        raise ChartParseError(line_number, f'expected int float int float int, got {" ".join(words)!r}') from None
+    for value in (start_measure, start_beat, end_measure, end_beat):
+        _check_number(line_number, value)
+    for value in (start_beat, end_beat):
+        _check_beat(line_number, value)
+
+    if (start_measure, start_beat) > (end_measure, end_beat):
+        raise ChartParseError(line_number, 'starting time can not be latter than ending time')
+    if start_measure < 0 or start_beat < 0 or end_beat < 0:
+        raise ChartParseError(line_number, 'time can not be negative')
+    if not 1 <= trail <= num_trail:
+        raise ChartParseError(line_number, f'trail must be between 1 and {num_trail}')
+    return NodeEvent(line_number, start_measure, start_beat, end_measure, end_beat, trail)
+
+
+def _parse_time(line_number: int, measure_word: str, beat_word: str) -> TimeCodeInMeasures:
+    """To parse a measure and a beat into a time code in measures"""
+    num_measure = _parse_number(line_number, measure_word, int)
+    num_beat = _parse_number(line_number, beat_word, float)
+    if num_measure < 0 or num_beat < 0:
+        raise ChartParseError(line_number, 'time can not be negative')
+    _check_beat(line_number, num_beat)
+    return TimeCodeInMeasures(num_measure, num_beat)
+
+
+def _parse_meter(line_number: int, word: str) -> meter:
+    """To parse a meter written as num_beats/beat_unit"""
+    parts = word.split('/')
+    if len(parts) != 2:
+        raise ChartParseError(line_number, f'meter must be written as num_beats/beat_unit, got {word!r}')
+    num_beats, beat_unit = (_parse_number(line_number, part, int) for part in parts)
+    if num_beats < 1 or beat_unit < 1:
+        raise ChartParseError(line_number, 'num_beats and beat_unit must be positive')
+    try:
+        return meter(num_beats, beat_unit)
+    except ValueError as error:
+        raise ChartParseError(line_number, str(error)) from error
+
+
+def _parse_number(line_number: int, word: str, number_type: type):
+    """To parse a word into an int or a float"""
+    try:
+        value = number_type(word)
+    except ValueError:
+        raise ChartParseError(line_number, f'expected {number_type.__name__}, got {word!r}') from None
+    _check_number(line_number, value)
+    return value
+
+
+def _check_number(line_number: int, value: float) -> None:
+    """To check that a number fits the columns of a score: a finite float, or an int within the int64 range"""
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ChartParseError(line_number, f'expected a finite number, got {value!r}')
+    elif not -_INT64_MAX - 1 <= value <= _INT64_MAX:
+        raise ChartParseError(line_number, f'{value} is out of the range of a 64-bit integer')
+
+
+def _check_beat(line_number: int, num_beat: float) -> None:
+    """To reject a beat which a time code in measures can not hold exactly"""
+    if not is_on_tick(num_beat):
+        raise ChartParseError(line_number, f'beat {num_beat} does not fall on a tick, beats are in steps of 1/{TICKS_PER_BEAT}')
+
+
+def _expect_length(line_number: int, words: list, length: int) -> None:
+    if len(words) != length:
+        raise ChartParseError(line_number, f'expected {length} fields, got {len(words)}')
+
+
+def _expect_unique(event: Union[MeterEvent, BpmEvent], changes: Dict[TimeCodeInMeasures, Any]) -> None:
+    if event.time in changes:
+        raise ChartParseError(event.line_number, 'there is already a change at this time')
@@ -0,0 +1,220 @@
+# This is the asyncio game clock of a compiled score, which dispatches the events of its nodes frame by frame
+
+import asyncio
+from enum import IntEnum
+import inspect
+from typing import Any, Callable, List, NamedTuple, Optional
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.judgement import JudgementWindows
+from Game.nodeTable import NODE_KIND_HOLD
+from time import perf_counter
+from Util.Metrics import METRICS
+import numpy as np
+
+
+class EventKind(IntEnum):
+    """What happens to a node at the time of an event, events of the same time are dispatched in this order"""
+    SPAWN = 0
+    """The node appears, lookahead seconds before it reaches the judgement line"""
+    REACH_LINE = 1
+    """The start of the node reaches the judgement line"""
+    JUDGE_WINDOW_CLOSE = 2
+    """The node can no longer be hit, an unhit node is a miss from now on"""
+    HOLD_END = 3
+    """The end of a hold node reaches the judgement line"""
+
+
+
+class ScheduledEvent(NamedTuple):
+    """One event of one node"""
+    time: float
+    """Time of the event in seconds, on the clock of the score"""
+    kind: EventKind
+    row: int
+    """Position of the node in the node table of the score"""
+    trail: int
+
+
+EventDispatch = Callable[[float, List[ScheduledEvent]], Any]
+"""Receives the time of a frame and every event due in that frame, may be a coroutine function"""
+
+AudioClock = Callable[[], Optional[float]]
+"""Returns the playback position of the music in seconds, or None when it is not known yet"""
+
+_FRAME_POLL_SECONDS = METRICS.histogram('frame_poll_seconds', 'Time spent collecting the events of a frame')
+_DISPATCHED_EVENTS = METRICS.counter('frame_events_total', 'Number of node events dispatched')
+
+
+
+class GameClockScheduler():
+    """The event timeline of a compiled score, driven by an asyncio clock kept in sync with the audio.
+
+    Every node gives up to four events, all computed at once and sorted by time when the scheduler is built:
+        spawn             start - lookahead
+        reach line        start
+        judge window      start + good window
+        hold end          end (hold nodes only)
+    A cursor walks the sorted timeline, so a frame only costs the events it dispatches.
+
+    Example (lookahead 1.0, good window 0.1):
+        node 0: tap at 2.0    -> spawn 1.0, reach line 2.0, judge window 2.1
+        node 1: hold 2.0-3.0  -> spawn 1.0, reach line 2.0, judge window 2.1, hold end 3.0
+
+        A frame at 1.01 dispatches both spawns in one batch, a frame at 2.05 both reach line events.
+
+    Drift correction: the game clock is the loop clock minus an origin. Every frame the audio clock is read,
+    small errors move the origin by DRIFT_GAIN of the error (no visible jump), errors larger than
+    SNAP_THRESHOLD move it all the way at once (seeks, stalls of the audio device).
+    """
+
+    DRIFT_GAIN: float = 0.1
+    """The part of the error against the audio clock corrected on each frame"""
+
+    SNAP_THRESHOLD: float = 0.1
+    """The error (in seconds) against the audio clock above which the game clock jumps to the audio clock"""
+
+    # ------------- Fields ---------------
+    _times: np.ndarray
+    """Time of every event, ascending"""
+
+    _kinds: np.ndarray
+    """Kind of every event, in the order of _times"""
+
+    _rows: np.ndarray
+    """Row of the node of every event, in the order of _times"""
+
+    _trails: np.ndarray
+    """Trail of the node of every event, in the order of _times"""
+
+    _cursor: int
+    """Position of the first event which has not been dispatched"""
+
+    _dispatch: EventDispatch
+    _audio_clock: Optional[AudioClock]
+    _frame_interval: float
+    """Longest time (in seconds) between two frames, even when no event is due"""
+
+    _origin: Optional[float]
+    """Loop time at which the game clock reads 0, None before the clock is started"""
+
+    _running: bool
+
+
+    # ----------- Constructor ------------
+    def __init__(self, score: pianoGameMusicScore, dispatch: EventDispatch, lookahead: float = 1.0, \
+        windows: Optional[JudgementWindows] = None, audio_clock: Optional[AudioClock] = None, \
+        frame_interval: float = 1 / 120) -> None:
+        if lookahead < 0:
+            raise ValueError('lookahead can not be negative')
+        if frame_interval <= 0:
+            raise ValueError('frame_interval must be positive')
+        if windows is None:
+            windows = JudgementWindows()
+
+        all_nodes = score.retrieve_all_nodes()
+        starts = score.node_start_seconds
+        ends = score.node_end_seconds
+        rows = np.arange(len(all_nodes), dtype=np.int64)
+        holds = np.flatnonzero(all_nodes.kinds == NODE_KIND_HOLD)
+
+        times = np.concatenate((starts - lookahead, starts, starts + windows.get_good(), ends[holds]))
+        kinds = np.concatenate((np.full(len(rows), EventKind.SPAWN, dtype=np.int8), \
+            np.full(len(rows), EventKind.REACH_LINE, dtype=np.int8), \
+            np.full(len(rows), EventKind.JUDGE_WINDOW_CLOSE, dtype=np.int8), \
+            np.full(len(holds), EventKind.HOLD_END, dtype=np.int8)))
+        event_rows = np.concatenate((rows, rows, rows, holds))
+
+        order = np.lexsort((event_rows, kinds, times))
+        self._times = times[order]
+        self._kinds = kinds[order]
+        self._rows = event_rows[order]
+        self._trails = np.asarray(all_nodes.trails)[self._rows]
+        self._cursor = 0
+
+        self._dispatch = dispatch
+        self._audio_clock = audio_clock
+        self._frame_interval = frame_interval
+        self._origin = None
+        self._running = False
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        """The number of events in the timeline"""
+        return len(self._times)
+
+    def get_num_pending(self) -> int:
+        """To get the number of events which have not been dispatched yet"""
+        return len(self._times) - self._cursor
+
+    def get_time(self) -> float:
+        """To get the time of the game clock in seconds"""
+        if self._origin is None:
+            raise RuntimeError('the game clock has not been started')
+        return asyncio.get_running_loop().time() - self._origin
+
+    def seek(self, t: float) -> None:
+        """To move the cursor so that the next dispatched events are the ones after time t (in seconds)"""
+        self._cursor = int(np.searchsorted(self._times, t, side='right'))
+
+    def poll(self, now: float) -> List[ScheduledEvent]:
+        """To take every event due at time now (in seconds) which has not been dispatched, in order.
+        This is one frame of the scheduler, usable without an event loop."""
+        if not METRICS.enabled:
+            return self._take_due(now)
+        started = perf_counter()
+        events = self._take_due(now)
+        _FRAME_POLL_SECONDS.observe(perf_counter() - started)
+        _DISPATCHED_EVENTS.inc(len(events))
+        return events
+
+    def _take_due(self, now: float) -> List[ScheduledEvent]:
+        end = int(np.searchsorted(self._times, now, side='right'))
+        if end <= self._cursor:
+            return []
+        begin = self._cursor
+        self._cursor = end
+        return [ScheduledEvent(time, EventKind(kind), row, trail) for time, kind, row, trail in \
+            zip(self._times[begin:end].tolist(), self._kinds[begin:end].tolist(), \
+                self._rows[begin:end].tolist(), self._trails[begin:end].tolist())]
+
+    async def run(self, start_second: float = 0.0) -> None:
+        """To run the game clock from start_second until every event is dispatched or stop() is called"""
+        loop = asyncio.get_running_loop()
+        self._origin = loop.time() - start_second
+        self._running = True
+        self.seek(np.nextafter(start_second, -np.inf))
+
+        while self._running and self._cursor < len(self._times):
+            self._correct_drift(loop.time())
+            now = loop.time() - self._origin
+            events = self.poll(now)
+            if events:
+                dispatched = self._dispatch(now, events)
+                if inspect.isawaitable(dispatched):
+                    await dispatched
+
+            if self._cursor >= len(self._times):
+                break
+            # Sleep until the next event, but wake up every frame to follow the audio clock
+            now = loop.time() - self._origin
+            await asyncio.sleep(max(0.0, min(float(self._times[self._cursor]) - now, self._frame_interval)))
+
+        self._running = False
+
+    def stop(self) -> None:
+        """To stop run() after the current frame"""
+        self._running = False
+
+    def _correct_drift(self, loop_time: float) -> None:
+        """To move the origin of the game clock towards the audio clock"""
+        if self._audio_clock is None:
+            return
+        audio_time = self._audio_clock()
+        if audio_time is None:
+            return
+        error = audio_time - (loop_time - self._origin)
+        if abs(error) > self.SNAP_THRESHOLD:
+            self._origin -= error
+        else:
+            self._origin -= error * self.DRIFT_GAIN
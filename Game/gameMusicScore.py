@@ -1,8 +1,40 @@
-from typing import Any, Dict, List
-from node import ANode
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+from Game.node import ANode
+from Game.nodeTable import NodeTable, build_node_table, build_sorted_node_table
+from DataStructure.MeterMap import MeterMap
 from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.TimingMap import TimingMap
 from DataStructure.util.UtilityClass import meter
-from Game.Util.UtilityFunctions import sort_node_list_by_start_time, differenceBetweenTimeInMeasure
+from Game.holdTicks import HOLD_TICKS_PER_BEAT, HoldTicks, get_total_combo
+from Game.scrollView import ScrollView, VisibleNodes
+from Game.trailIntervalIndex import TrailIntervalIndex
+from time import perf_counter
+from Util.Metrics import METRICS
+import numpy as np
+
+_CONSTRUCTION_SECONDS = 'score_construction_seconds'
+_CONSTRUCTION_HELP = 'Duration of the validation of a score and of the compilation of every product'
+_SCALAR_CONVERSION_SECONDS = METRICS.histogram('time_conversion_seconds', 'Latency of time conversions', kind='scalar')
+_BATCH_CONVERSION_SECONDS = METRICS.histogram('time_conversion_seconds', 'Latency of time conversions', kind='batch')
+_CONVERTED_TIMES = METRICS.counter('time_conversions_total', 'Number of time codes converted into seconds')
+_WINDOW_QUERY_SECONDS = METRICS.histogram('window_query_seconds', 'Latency of the node queries over a time window')
+
+PRODUCT_INPUTS: Dict[str, Tuple[str, ...]] = {
+    'sorted_nodes': ('nodes',),
+    'timing_map': ('timing',),
+    'seconds': ('nodes', 'timing'),
+    'interval_index': ('nodes', 'timing'),
+    'scroll_view': ('nodes', 'timing'),
+    'bpm_scroll_view': ('nodes', 'timing'),
+    'hold_ticks': ('nodes', 'timing'),
+}
+"""The data derived by a score (its products), with the inputs each of them is compiled from:
+    - nodes: the node table given to the score
+    - timing: the meter and bpm changes of the score
+A product is compiled on its first use, and dropped only when one of its inputs changes."""
+
+_SECONDS_INDEXES = ('interval_index', 'scroll_view', 'bpm_scroll_view', 'hold_ticks')
+"""The products built over the seconds columns, patched in place by the edits of the nodes and of the timing"""
 
 class pianoGameMusicScore():
     """This class represents the game score that is used by the interactive part of the game
@@ -18,41 +50,88 @@ class pianoGameMusicScore():
        
         - This is a pianoGameMusicScore with 4 trails.
         - Where `~` is a node which will fall down to the line and to be hit by players.
+
+    The constructor only stores and validates its arguments. Everything derived from them
+    (see PRODUCT_INPUTS: the sorted order, the timing map, the seconds columns, the interval index)
+    is compiled on its first use, so reading the metadata of a score (e.g. its number of trails) costs nothing.
     """
 
     # -------------- Fields ----------------
-    _all_nodes: List[ANode]
+    _all_nodes: NodeTable
+    """The nodes of this score, only sorted by starting time once the sorted_nodes product is compiled"""
     _num_trail: int
     _fix_meter: meter
     _fix_bpm: float
 
-    _node_start_time_in_seconds: Dict[ANode, float]
-    _node_end_time_in_seconds: Dict[ANode, float]
+    _products: Dict[str, Any]
+    """Every compiled product (see PRODUCT_INPUTS) by name, True for the ones stored in the node table"""
     
 
     # ------------ Constructor -------------
-    def __init__(self, all_nodes: List[ANode], num_trail: int, fix_meter: meter, fix_bpm: float) -> None:
-        self._all_nodes = sort_node_list_by_start_time(all_nodes)
+    def __init__(self, all_nodes: Union[List[ANode], NodeTable], num_trail: int, fix_meter: meter, fix_bpm: float) -> None:
+        self._all_nodes = build_node_table(all_nodes)
         self._num_trail = num_trail
         self._fix_meter = fix_meter
         self._fix_bpm = fix_bpm
+        self._products = {}
+
+        with METRICS.time(_CONSTRUCTION_SECONDS, _CONSTRUCTION_HELP, phase='validation'):
+            if not self.validate_piano_score():
+                raise ValueError('Some parameter(s) given to this object are not legal')
         
-        self._node_start_time_in_seconds = self.get_all_node_start_time_in_second()
-        self._node_end_time_in_seconds = self.get_all_node_end_time_in_second()
 
-        if not self.validate_piano_score():
+    # ------- Alternate constructors -------
+    @classmethod
+    def from_compiled_nodes(cls, all_nodes: NodeTable, num_trail: int, var_meter: Dict[TimeCodeInMeasures, meter], \
+        var_bpm: Dict[TimeCodeInMeasures, float]) -> 'pianoGameMusicScore':
+        """To build a score around a node table which is already sorted and already holds its seconds columns,
+        such as one loaded from a compiled chart. Nothing is sorted or converted again, the order is only
+        checked (O(n)), since the judgement and the scrolling binary search the starting times."""
+        if not all_nodes.is_sorted():
+            raise ValueError('the nodes of a compiled score must be sorted by starting time, then trail')
+        start_seconds = all_nodes.start_seconds
+        if not bool((start_seconds[1:] >= start_seconds[:-1]).all()):
+            raise ValueError('the starting times (in seconds) of a compiled score must be ascending')
+        score = cls.__new__(cls)
+        score._all_nodes = all_nodes
+        score._num_trail = num_trail
+        score._products = {}
+        score.set_timing_changes(var_meter, var_bpm)
+
+        if not score.validate_piano_score():
             raise ValueError('Some parameter(s) given to this object are not legal')
-        
+
+        score._products['sorted_nodes'] = True
+        score._products['seconds'] = True
+        return score
+
+
+    @classmethod
+    def from_binary_chart(cls, path: str) -> 'pianoGameMusicScore':
+        """To open a compiled binary chart (see Game.binaryChart) as a score of this class, memory-mapped"""
+        # Imported here, the binary chart module is built on top of this one
+        from Game.binaryChart import open_binary_chart
+        return open_binary_chart(path, cls)
+
 
     # -------------- Methods ---------------
     def __hash__(self):
         return hash(self._all_nodes + self._num_trail + self._fix_meter + self._fix_bpm)
 
 
+    def set_timing_changes(self, var_meter: Dict[TimeCodeInMeasures, meter], var_bpm: Dict[TimeCodeInMeasures, float]) -> None:
+        """Method to set the meter and bpm fields of this score from dictionaries of changes"""
+        if len(var_meter) != 1 or len(var_bpm) != 1:
+            raise ValueError('pianoGameMusicScore has a fixed meter and a fixed bpm')
+        self._fix_meter = var_meter.get(TimeCodeInMeasures(0, 0.0))
+        self._fix_bpm = var_bpm.get(TimeCodeInMeasures(0, 0.0))
+        self._invalidate('timing')
+
+
     def __eq__(self, obj: Any):
         if not isinstance(obj, pianoGameMusicScore):
             return False
-        return self._all_nodes == obj._all_nodes \
+        return self._get_sorted_nodes() == obj._get_sorted_nodes() \
             and self._num_trail == obj._num_trail \
             and self._fix_meter == obj._fix_meter \
             and self._fix_bpm == obj._fix_bpm
@@ -61,10 +140,9 @@ class pianoGameMusicScore():
     def validate_piano_score(self) -> bool:
         """Method to validate the legality of a pianoGameMusicScore object."""
 
-        for node in self._all_nodes:
-            if not isinstance(node, ANode) \
-                or node.get_init_trail > self._num_trail:
-                return False
+        if not isinstance(self._all_nodes, NodeTable) \
+            or (len(self._all_nodes) > 0 and self._all_nodes.trails.max() > self._num_trail):
+            return False
 
         if not isinstance(self._num_trail, int):
             return False
@@ -78,40 +156,220 @@ class pianoGameMusicScore():
         return True
  
 
+    def get_compiled_products(self) -> FrozenSet[str]:
+        """To get the names of the products (see PRODUCT_INPUTS) which are compiled at the moment"""
+        return frozenset(self._products)
+
+
+    def compile_all(self) -> None:
+        """Method to compile every product of this score now, e.g. before the score is played"""
+        for product in PRODUCT_INPUTS:
+            if hasattr(self, '_compile_' + product):
+                self._get_product(product)
+
+
+    def _get_product(self, product: str) -> Any:
+        """To get a product of this score, compiled by the method _compile_<product> if it is not compiled"""
+        try:
+            return self._products[product]
+        except KeyError:
+            pass
+        with METRICS.time(_CONSTRUCTION_SECONDS, _CONSTRUCTION_HELP, phase=product):
+            compiled = getattr(self, '_compile_' + product)()
+        self._products[product] = compiled
+        return compiled
+
+
+    def _invalidate(self, *inputs: str) -> None:
+        """Method to drop every product compiled from one of the given inputs (see PRODUCT_INPUTS)"""
+        for product in list(self._products):
+            if any(changed in PRODUCT_INPUTS[product] for changed in inputs):
+                del self._products[product]
+
+
+    def _discard(self, *products: str) -> None:
+        """Method to drop the given products, which are compiled again on their next use"""
+        for product in products:
+            self._products.pop(product, None)
+
+
+    def _get_sorted_nodes(self) -> NodeTable:
+        """To get the node table sorted by starting time, without compiling its seconds columns"""
+        self._get_product('sorted_nodes')
+        return self._all_nodes
+
+
+    def _compile_sorted_nodes(self) -> bool:
+        # The seconds columns (if any) are reordered together with the nodes
+        self._all_nodes = build_sorted_node_table(self._all_nodes)
+        return True
+
+
+    def _compile_timing_map(self) -> TimingMap:
+        return TimingMap({TimeCodeInMeasures(0, 0.0): self._fix_bpm}, {TimeCodeInMeasures(0, 0.0): self._fix_meter})
+
+
+    def _compile_seconds(self) -> bool:
+        node_start_seconds, node_end_seconds = self.get_all_node_time_in_second_array()
+        self._all_nodes.set_seconds(node_start_seconds, node_end_seconds)
+        return True
+
+
+    def _compile_interval_index(self) -> TrailIntervalIndex:
+        return TrailIntervalIndex(self.retrieve_all_nodes(), self._num_trail)
+
+
+    def _compile_scroll_view(self) -> ScrollView:
+        return ScrollView(self.retrieve_all_nodes(), self._num_trail, self.retrieve_timing_map())
+
+
+    def _compile_bpm_scroll_view(self) -> ScrollView:
+        return ScrollView(self.retrieve_all_nodes(), self._num_trail, self.retrieve_timing_map(), bpm_relative=True)
+
+
+    def _compile_hold_ticks(self) -> HoldTicks:
+        return HoldTicks(self.retrieve_all_nodes(), self.retrieve_timing_map())
+
+
     def sort_all_nodes_in_score(self) -> None:
         """Method to sort all the nodes in the score according to the start time"""
-        sorted_nodes = sort_node_list_by_start_time(self._all_nodes)
-        self._all_nodes = sorted_nodes
+        self._get_sorted_nodes()
+
+
+    def compile_node_seconds(self) -> None:
+        """Method to convert the start and end time of all nodes into seconds, in one vectorized pass each,
+        and to store them as the seconds columns of the node table.
+        The indexes over these columns are built again on their next use."""
+        self._discard('seconds', *_SECONDS_INDEXES)
+        self._get_product('seconds')
+
+
+    def get_all_node_time_in_second_array(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Method to come up with two float64 arrays, the starting and the ending time (in seconds) of all nodes,
+        in the same order as the nodes of this score"""
+        all_nodes = self._get_sorted_nodes()
+        return self.get_time_in_second_array(all_nodes.start_measures, all_nodes.start_beats), \
+            self.get_time_in_second_array(all_nodes.end_measures, all_nodes.end_beats)
 
 
     def get_all_node_start_time_in_second(self) -> Dict[ANode, float]:
         """Method to come up with a dictionary indicating the starting time (in seconds) of all nodes"""
-        node_start_seconds: Dict[ANode, float]
-        
-        for node in self._all_nodes:
-            node_start_seconds[node] = self.get_note_start_time_in_second(node)
-
-        return node_start_seconds
+        node_start_seconds, _ = self.get_all_node_time_in_second_array()
+        return dict(zip(self._all_nodes, node_start_seconds.tolist()))
 
 
     def get_all_node_end_time_in_second(self) -> Dict[ANode, float]:
         """Method to come up with a dictionary indicating the ending time (in seconds) of all nodes"""
-        node_end_seconds: Dict[ANode, float]
+        _, node_end_seconds = self.get_all_node_time_in_second_array()
+        return dict(zip(self._all_nodes, node_end_seconds.tolist()))
+
+
+    @property
+    def node_start_seconds(self) -> np.ndarray:
+        """The starting time (in seconds) of all nodes, in the same order as the nodes of this score"""
+        return self.retrieve_all_nodes().start_seconds
+
 
-        for node in self._all_nodes:
-            node_end_seconds[node] = self.get_note_end_time_in_second(node)
-            
-        return node_end_seconds
+    @property
+    def node_end_seconds(self) -> np.ndarray:
+        """The ending time (in seconds) of all nodes, in the same order as the nodes of this score"""
+        return self.retrieve_all_nodes().end_seconds
 
 
     def retrieve_all_node_start_time(self) -> Dict[ANode, float]:
-        """The getter for the start-time-in-second dictionary"""
-        return self._node_start_time_in_seconds
+        """The getter for the start-time-in-second dictionary, built from the seconds column of the node table"""
+        all_nodes = self.retrieve_all_nodes()
+        return dict(zip(all_nodes, all_nodes.start_seconds.tolist()))
 
 
     def retrieve_all_node_end_time(self) -> Dict[ANode, float]:
-        """The getter for the end-time-in-second dictionary"""
-        return self._node_end_time_in_seconds
+        """The getter for the end-time-in-second dictionary, built from the seconds column of the node table"""
+        all_nodes = self.retrieve_all_nodes()
+        return dict(zip(all_nodes, all_nodes.end_seconds.tolist()))
+
+
+    def retrieve_all_nodes(self) -> NodeTable:
+        """The getter for the node table of this score, sorted by starting time and holding the seconds columns"""
+        self._get_product('seconds')
+        return self._all_nodes
+
+
+    def get_num_node(self) -> int:
+        """The getter for the number of nodes of this score, nothing is compiled"""
+        return len(self._all_nodes)
+
+
+    def get_num_trail(self) -> int:
+        """The getter for the number of trails of this score"""
+        return self._num_trail
+
+
+    def get_duration(self) -> float:
+        """Method to find the time (in seconds) at which the last node ends, 0.0 for a score without nodes.
+        Only the latest ending time is converted when the seconds columns are not compiled yet."""
+        if len(self._all_nodes) == 0:
+            return 0.0
+        if 'seconds' in self._products:
+            return float(self._all_nodes.end_seconds.max())
+        end_measures = self._all_nodes.end_measures
+        last_measure = int(end_measures.max())
+        last_beat = float(self._all_nodes.end_beats[end_measures == last_measure].max())
+        return self.retrieve_timing_map().get_second_at(last_measure, last_beat)
+
+
+    def retrieve_timing_map(self) -> TimingMap:
+        """The getter for the timing map of this score, which is built on its first use"""
+        return self._get_product('timing_map')
+
+
+    def retrieve_interval_index(self) -> TrailIntervalIndex:
+        """The getter for the per-trail interval index of this score, which is built on its first use"""
+        return self._get_product('interval_index')
+
+
+    def retrieve_scroll_view(self, bpm_relative: bool = False) -> ScrollView:
+        """The getter for the scroll view of this score (see Game.scrollView), which is built on its first use.
+        A bpm-relative scroll view scrolls with the bpm changes, relative to the first bpm."""
+        return self._get_product('bpm_scroll_view' if bpm_relative else 'scroll_view')
+
+
+    def get_visible_nodes(self, num_second: float, scroll_speed: float, viewport_height: float, \
+        bpm_relative: bool = False) -> List[VisibleNodes]:
+        """Method to find the nodes of every trail (trail 1 first) on the screen at a song time (in seconds),
+        with their clipped heights above the judgement line, see ScrollView.get_visible_nodes"""
+        return self.retrieve_scroll_view(bpm_relative).get_visible_nodes(num_second, scroll_speed, viewport_height)
+
+
+    def retrieve_hold_ticks(self, ticks_per_beat: int = HOLD_TICKS_PER_BEAT) -> HoldTicks:
+        """The getter for the ticks of the hold nodes of this score (see Game.holdTicks).
+        The ticks of the default ticks_per_beat are built on their first use and kept,
+        the ones of another number of ticks per beat are built on every call."""
+        if ticks_per_beat == HOLD_TICKS_PER_BEAT:
+            return self._get_product('hold_ticks')
+        return HoldTicks(self.retrieve_all_nodes(), self.retrieve_timing_map(), ticks_per_beat)
+
+
+    def get_total_combo(self, ticks_per_beat: int = HOLD_TICKS_PER_BEAT) -> int:
+        """To get the combo of a full combo play of this score, the ticks of the hold nodes included.
+        Only the number of ticks of every hold is computed, neither the ticks nor the seconds columns."""
+        return get_total_combo(self._all_nodes, self.retrieve_timing_map().get_meter_map(), ticks_per_beat)
+
+
+    def get_nodes_in_window(self, trail: int, t0: float, t1: float) -> np.ndarray:
+        """Method to find the nodes on a trail which are active at some point of [t0, t1] (in seconds).
+        Returns their positions in the node table, in the order of their starting time."""
+        if not METRICS.enabled:
+            return self.retrieve_interval_index().query_window(trail, t0, t1)
+        started = perf_counter()
+        rows = self.retrieve_interval_index().query_window(trail, t0, t1)
+        _WINDOW_QUERY_SECONDS.observe(perf_counter() - started)
+        return rows
+
+
+    def get_nodes_at(self, trail: int, t: float) -> np.ndarray:
+        """Method to find the nodes on a trail which are active at time t (in seconds).
+        Returns their positions in the node table, in the order of their starting time."""
+        return self.get_nodes_in_window(trail, t, t)
 
 
     def get_note_start_time_in_second(self, specific_node: ANode) -> float:
@@ -126,15 +384,109 @@ class pianoGameMusicScore():
 
     def get_time_in_second(self, t_in_measure: TimeCodeInMeasures) -> float:
         """Method to locate a specific time in seconds using a time code in measures"""
+        # The timing map is built on the first lookup, every lookup is a binary search over its segments
+        if not METRICS.enabled:
+            return self.retrieve_timing_map().get_time_in_second(t_in_measure)
+        started = perf_counter()
+        num_second = self.retrieve_timing_map().get_time_in_second(t_in_measure)
+        _SCALAR_CONVERSION_SECONDS.observe(perf_counter() - started)
+        _CONVERTED_TIMES.inc()
+        return num_second
+
+
+    def get_time_in_second_array(self, num_measures: np.ndarray, num_beats: np.ndarray) -> np.ndarray:
+        """Method to locate many times in seconds at once, given the arrays of their measures and beats"""
+        if not METRICS.enabled:
+            return self.retrieve_timing_map().get_seconds_of(num_measures, num_beats)
+        started = perf_counter()
+        num_seconds = self.retrieve_timing_map().get_seconds_of(num_measures, num_beats)
+        _BATCH_CONVERSION_SECONDS.observe(perf_counter() - started)
+        _CONVERTED_TIMES.inc(len(num_seconds))
+        return num_seconds
+
+
+    # -------------- Editing ---------------
+    def insert_node(self, node: ANode) -> int:
+        """Method to add a node to this score, returns its row in the node table.
+        Once the nodes are sorted, the node is inserted at its place (binary search, then the rows after it
+        move into the spare capacity of the columns), only its own times are converted into seconds,
+        and the indexes over the seconds are patched."""
+        if not isinstance(node, ANode) or node.get_init_trail() > self._num_trail:
+            raise ValueError('the node does not fit in this score')
+        all_nodes = self._all_nodes
+        if 'sorted_nodes' not in self._products:
+            all_nodes.insert_row(len(all_nodes), node)
+            self._invalidate('nodes')
+            return len(all_nodes) - 1
+
+        num_measure, num_beat = node.get_start_time().get_time_in_measure()
+        row = all_nodes.search_sorted_row(num_measure, num_beat, node.get_init_trail())
+        if 'seconds' not in self._products:
+            all_nodes.insert_row(row, node)
+            return row
+        all_nodes.insert_row(row, node, self.get_time_in_second(node.get_start_time()), \
+            self.get_time_in_second(node.get_end_time()))
+        for index in self._get_seconds_indexes():
+            index.insert_row(all_nodes, row)
+        return row
+
+
+    def remove_node(self, row: int) -> None:
+        """Method to remove the node of a row of the node table, the nodes after it move one row up"""
+        all_nodes = self._all_nodes
+        if not 0 <= row < len(all_nodes):
+            raise IndexError('node table index out of range')
+        if 'seconds' in self._products:
+            for index in self._get_seconds_indexes():
+                index.delete_row(all_nodes, row)
+        all_nodes.delete_row(row)
+
+
+    def move_node(self, row: int, node: ANode) -> int:
+        """Method to replace the node of a row by a node with other times or another trail,
+        returns the row of the new node"""
+        if not isinstance(node, ANode) or node.get_init_trail() > self._num_trail:
+            raise ValueError('the node does not fit in this score')
+        self.remove_node(row)
+        return self.insert_node(node)
+
+
+    def _get_seconds_indexes(self) -> List[Any]:
+        """To get the compiled products which are built over the seconds columns, see _SECONDS_INDEXES"""
+        return [self._products[product] for product in _SECONDS_INDEXES if product in self._products]
+
+
+    def _retime_from(self, num_measure: int, num_beat: float) -> None:
+        """Method to follow a change of the timing at (num_measure, num_beat): the timing map is built again,
+        only the seconds of the nodes starting or ending at or after that time are converted again,
+        and only these nodes are moved in the indexes over the seconds"""
+        self._discard('timing_map')
+        if 'seconds' not in self._products:
+            self._discard(*_SECONDS_INDEXES)
+            return
+        all_nodes = self._all_nodes
+        timing_map = self.retrieve_timing_map()
+        # The columns of a memory-mapped chart are read-only
+        if not (all_nodes.start_seconds.flags.writeable and all_nodes.end_seconds.flags.writeable):
+            all_nodes.set_seconds(all_nodes.start_seconds.copy(), all_nodes.end_seconds.copy())
+        start_seconds, end_seconds = all_nodes.start_seconds, all_nodes.end_seconds
+
+        # Nodes are sorted by starting time, every node after the first one starting after the change moves,
+        # and so does the end of every hold before it which ends after the change
+        row = all_nodes.search_sorted_row(num_measure, num_beat)
+        end_measures, end_beats = all_nodes.end_measures, all_nodes.end_beats
+        held = np.flatnonzero((end_measures[:row] > num_measure) \
+            | ((end_measures[:row] == num_measure) & (end_beats[:row] >= num_beat)))
+        moved = np.concatenate((held, np.arange(row, len(all_nodes))))
+        start_seconds[row:] = timing_map.get_seconds_of(all_nodes.start_measures[row:], all_nodes.start_beats[row:])
+        end_seconds[moved] = timing_map.get_seconds_of(end_measures[moved], end_beats[moved])
+
+        if 'interval_index' in self._products:
+            self._products['interval_index'].retime(all_nodes, moved, timing_map.get_second_at(num_measure, num_beat))
+        for product in ('scroll_view', 'bpm_scroll_view', 'hold_ticks'):
+            if product in self._products:
+                self._products[product].retime(all_nodes, timing_map, moved)
 
-        # The following would be an transformation equation used for all fix-meter, fix-bpm music
-        num_measure = t_in_measure.get_num_measure()
-        num_beat = t_in_measure.get_num_beat()
-
-        return (240 / self._fix_bpm) * (self._fix_meter.get_num_beats() / self._fix_meter.get_beat_unit()) \
-            * (num_measure + (num_beat / self._fix_meter.get_num_beats()))
-
-    
         
 
 class VBPMPianoGameMusicScore(pianoGameMusicScore):
@@ -146,29 +498,27 @@ class VBPMPianoGameMusicScore(pianoGameMusicScore):
     """
 
     # --------------- Fields -----------------
-    _all_nodes: List[ANode]
+    _all_nodes: NodeTable
     _num_trail: int
     _fix_meter: meter
     _var_bpm: Dict[TimeCodeInMeasures, float]
 
-    _node_start_time_in_seconds: Dict[ANode, float]
-    _node_end_time_in_seconds: Dict[ANode, float]
+    _products: Dict[str, Any]
 
 
     # ------------- Constructor --------------
-    def __init__(self, all_nodes: List[ANode], num_trail: int, fix_meter: meter, \
+    def __init__(self, all_nodes: Union[List[ANode], NodeTable], num_trail: int, fix_meter: meter, \
         var_bpm: Dict[TimeCodeInMeasures, float]) -> None:
-        self._all_nodes = sort_node_list_by_start_time(all_nodes)
+        self._all_nodes = build_node_table(all_nodes)
         self._num_trail = num_trail
         self._fix_meter = fix_meter
         # !Note!: the first bpm must be at the start, the last bpm should not exceed end of last node
         self._var_bpm = var_bpm
-        
-        self._node_start_time_in_seconds = self.get_all_node_start_time_in_second()
-        self._node_end_time_in_seconds = self.get_all_node_end_time_in_second()
+        self._products = {}
 
-        if not self.validate_piano_score():
-            raise ValueError('Parameters of this object is illegal')
+        with METRICS.time(_CONSTRUCTION_SECONDS, _CONSTRUCTION_HELP, phase='validation'):
+            if not self.validate_piano_score():
+                raise ValueError('Parameters of this object is illegal')
 
 
     # --------- Overwritten methods ----------
@@ -176,10 +526,41 @@ class VBPMPianoGameMusicScore(pianoGameMusicScore):
         return hash(self._all_nodes, self._num_trail, self._fix_meter, self._var_bpm)
 
 
+    def set_timing_changes(self, var_meter: Dict[TimeCodeInMeasures, meter], var_bpm: Dict[TimeCodeInMeasures, float]) -> None:
+        if len(var_meter) != 1:
+            raise ValueError('VBPMPianoGameMusicScore has a fixed meter')
+        self._fix_meter = var_meter.get(TimeCodeInMeasures(0, 0.0))
+        self._var_bpm = var_bpm
+        self._invalidate('timing')
+
+    def _compile_timing_map(self) -> TimingMap:
+        return TimingMap(self._var_bpm, {TimeCodeInMeasures(0, 0.0): self._fix_meter})
+
+    def set_bpm_change(self, t_in_measure: TimeCodeInMeasures, bpm: float) -> None:
+        """Method to add a bpm change, or to change the bpm of an existing one.
+        Only the nodes after it are converted into seconds again."""
+        if not isinstance(t_in_measure, TimeCodeInMeasures) or not bpm > 0:
+            raise ValueError('a bpm change needs a time code in measures and a positive bpm')
+        # The dictionary given to the constructor is left untouched
+        self._var_bpm = dict(self._var_bpm)
+        self._var_bpm[t_in_measure] = float(bpm)
+        self._retime_from(*t_in_measure.get_time_in_measure())
+
+    def remove_bpm_change(self, t_in_measure: TimeCodeInMeasures) -> None:
+        """Method to remove a bpm change, only the nodes after it are converted into seconds again"""
+        if t_in_measure == TimeCodeInMeasures(0, 0.0):
+            raise ValueError('the bpm at the start of the score can not be removed')
+        if t_in_measure not in self._var_bpm:
+            raise ValueError(f'there is no bpm change at {t_in_measure!r}')
+        self._var_bpm = dict(self._var_bpm)
+        del self._var_bpm[t_in_measure]
+        self._retime_from(*t_in_measure.get_time_in_measure())
+
+
     def __eq__(self, obj: Any):
         if not isinstance(obj, VBPMPianoGameMusicScore):
             return False
-        return self._all_nodes == obj._all_nodes \
+        return self._get_sorted_nodes() == obj._get_sorted_nodes() \
             and self._num_trail == obj._num_trail \
             and self._fix_meter == obj._fix_meter \
             and self._var_bpm == obj._var_bpm
@@ -187,10 +568,9 @@ class VBPMPianoGameMusicScore(pianoGameMusicScore):
 
     def validate_piano_score(self) -> bool:
         """Method to validate the legality of a pianoGameMusicScore object."""
-        for node in self._all_nodes:
-            if not isinstance(node, ANode) \
-                or node.get_init_trail > self._num_trail:
-                return False
+        if not isinstance(self._all_nodes, NodeTable) \
+            or (len(self._all_nodes) > 0 and self._all_nodes.trails.max() > self._num_trail):
+            return False
 
         if not isinstance(self._num_trail, int):
             return False
@@ -198,48 +578,19 @@ class VBPMPianoGameMusicScore(pianoGameMusicScore):
         if not isinstance(self._fix_meter, meter):
             return False
 
-        if self._var_bpm.__len__ == 0:   #### length是这么用的吗
+        if len(self._var_bpm) == 0:
             return False
 
         for timecode, bpms in zip(list(self._var_bpm.keys()), list(self._var_bpm.values())):
             if not isinstance(timecode, TimeCodeInMeasures) or not isinstance(bpms, float):
                 return False
 
-        first_bpm_time = list(self._var_bpm.keys())[0]
-
-        if first_bpm_time.get_num_measure != 0 or first_bpm_time.get_num_beat != 0.0:
+        # The first bpm must be at the start
+        if TimeCodeInMeasures(0, 0.0) not in self._var_bpm:
             return False
 
         return True
 
-
-    def get_time_in_second(self, t_in_measure: TimeCodeInMeasures) -> float:
-        
-        # The algorithim adds up time in second before every new change of bpm
-        total_t_in_second: float
-        total_t_in_second = 0.0
-
-        all_bpm_location: List[TimeCodeInMeasures]
-        all_bpm_location = self._var_bpm.keys()
-        all_bpm_location.append(t_in_measure)
-
-        all_bpm_value: List[float]
-        all_bpm_value = self._var_bpm.values()
-        
-        i = 0
-        while i < all_bpm_value.__len__:     #### length是这么用的吗？
-            section_t_in_second: float
-            # this stands for the duration of a particular section of bpm
-
-            current_bpm = all_bpm_value[i]
-            duration = differenceBetweenTimeInMeasure(all_bpm_location[i], all_bpm_location[i + 1], self._fix_meter)
-            section_t_in_second = (240 / current_bpm) * (self._fix_meter.get_num_beats() / self._fix_meter.get_beat_unit) \
-                * (duration.get_num_measure() + (duration.get_num_beat() / self._fix_meter.get_num_beats()))
-
-            total_t_in_second = total_t_in_second + section_t_in_second        
-
-        return total_t_in_second
-
     
 
 class VMVBPianoGameMusicScore(VBPMPianoGameMusicScore):
@@ -252,180 +603,131 @@ class VMVBPianoGameMusicScore(VBPMPianoGameMusicScore):
     """
 
     # --------------- Fields -----------------
-    _all_nodes: List[ANode]
+    _all_nodes: NodeTable
     _num_trail: int
     _var_meter: Dict[TimeCodeInMeasures, meter]
     # !Note!: meter change can only happen at start of measures
     _var_bpm: Dict[TimeCodeInMeasures, float]
 
-    _node_start_time_in_seconds: Dict[ANode, float]
-    _node_end_time_in_seconds: Dict[ANode, float]
+    _products: Dict[str, Any]
 
 
     # ------------- Constructor --------------
-    def __init__(self, all_nodes: List[ANode], num_trail: int, var_meter: Dict[TimeCodeInMeasures, meter], \
+    def __init__(self, all_nodes: Union[List[ANode], NodeTable], num_trail: int, var_meter: Dict[TimeCodeInMeasures, meter], \
         var_bpm: Dict[TimeCodeInMeasures, float]) -> None:
-        self._all_nodes = sort_node_list_by_start_time(all_nodes)
+        self._all_nodes = build_node_table(all_nodes)
         self._num_trail = num_trail
         self._var_meter = var_meter
         self._var_bpm = var_bpm
-        
-        self._node_start_time_in_seconds = self.get_all_node_start_time_in_second()
-        self._node_end_time_in_seconds = self.get_all_node_end_time_in_second()
+        self._products = {}
 
-        if not self.validate_piano_score():
-            raise ValueError('Parameters of this object is illegal')
-
-        self.fufill_var_meter()
+        with METRICS.time(_CONSTRUCTION_SECONDS, _CONSTRUCTION_HELP, phase='validation'):
+            if not self.validate_piano_score():
+                raise ValueError('Parameters of this object is illegal')
 
     
     # --------- Overwritten methods ----------
     def __hash__(self):
         return hash(self._all_nodes, self._num_trail, self._var_meter, self._var_bpm)
 
+    def set_timing_changes(self, var_meter: Dict[TimeCodeInMeasures, meter], var_bpm: Dict[TimeCodeInMeasures, float]) -> None:
+        self._var_meter = var_meter
+        self._var_bpm = var_bpm
+        self._invalidate('timing')
+
+    def _compile_timing_map(self) -> TimingMap:
+        # The bpm and the meter changes are merged into one timing map, the meter changes are not expanded
+        return TimingMap(self._var_bpm, self._var_meter)
+
+    def set_meter_change(self, num_measure: int, new_meter: meter) -> None:
+        """Method to add a meter change at the start of a measure, or to change the meter of an existing one.
+        Only the nodes after it are converted into seconds again."""
+        if not isinstance(new_meter, meter) or num_measure < 0:
+            raise ValueError('a meter change needs a measure and a meter')
+        self._var_meter = dict(self._var_meter)
+        self._var_meter[TimeCodeInMeasures(num_measure, 0.0)] = new_meter
+        self._retime_from(num_measure, 0.0)
+
+    def remove_meter_change(self, num_measure: int) -> None:
+        """Method to remove the meter change at the start of a measure, only the nodes after it are converted again"""
+        t_in_measure = TimeCodeInMeasures(num_measure, 0.0)
+        if num_measure == 0:
+            raise ValueError('the meter at the start of the score can not be removed')
+        if t_in_measure not in self._var_meter:
+            raise ValueError(f'there is no meter change at measure {num_measure}')
+        self._var_meter = dict(self._var_meter)
+        del self._var_meter[t_in_measure]
+        self._retime_from(num_measure, 0.0)
+
     def __eq__(self, obj: Any):
         if not isinstance(obj, VMVBPianoGameMusicScore):
             return False
-        return self._all_nodes == obj._all_nodes \
+        return self._get_sorted_nodes() == obj._get_sorted_nodes() \
             and self._num_trail == obj._num_trail \
-            and self._var_meter == obj._var_meter \
+            and self.retrieve_meter_map() == obj.retrieve_meter_map() \
             and self._var_bpm == obj._var_bpm
 
     def validate_piano_score(self) -> bool:
         """Method to validate the legality of a pianoGameMusicScore object."""
-        for node in self._all_nodes:
-            if not isinstance(node, ANode) \
-                or node.get_init_trail > self._num_trail:
-                return False
+        if not isinstance(self._all_nodes, NodeTable) \
+            or (len(self._all_nodes) > 0 and self._all_nodes.trails.max() > self._num_trail):
+            return False
 
         if not isinstance(self._num_trail, int):
             return False
        
-        if self._var_meter.__len__ == 0:   #### length是这么用的吗
+        if len(self._var_meter) == 0:
             return False
 
-        if self._var_bpm.__len__ == 0:   #### length是这么用的吗
+        if len(self._var_bpm) == 0:
             return False
 
         for timecode, meters in zip(list(self._var_meter.keys()), list(self._var_meter.values())):
             if not isinstance(timecode, TimeCodeInMeasures) or not isinstance(meters, meter):
                 return False
-
-        for timecode, bpms in zip(list(self._var_bpm.keys()), list(self._var_bpm.values())):
-            if not isinstance(timecode, TimeCodeInMeasures) or not isinstance(bpms, float):
-                return False
             # Change in meter can only at the start of measures
             if not timecode.get_num_beat() == 0.0:
                 return False
 
-        first_meter_time = list(self._var_bpm.keys())[0]
+        for timecode, bpms in zip(list(self._var_bpm.keys()), list(self._var_bpm.values())):
+            if not isinstance(timecode, TimeCodeInMeasures) or not isinstance(bpms, float):
+                return False
 
-        if first_meter_time.get_num_measure != 0 or first_meter_time.get_num_beat != 0.0:
+        # The first meter and the first bpm must be at the start
+        if TimeCodeInMeasures(0, 0.0) not in self._var_meter:
             return False
 
-        first_bpm_time = list(self._var_bpm.keys())[0]
-
-        if first_bpm_time.get_num_measure != 0 or first_bpm_time.get_num_beat != 0.0:
+        if TimeCodeInMeasures(0, 0.0) not in self._var_bpm:
             return False
 
         return True
 
-
-    def get_time_in_second(self, t_in_measure: TimeCodeInMeasures) -> float:
-
-        # This algorithm adds up every section
-        # The section is constructed by every change in bpm or meter
-        total_t_in_second: float
-        total_t_in_second = 0.0
-
-        # Get the location of every bpm change
-        all_bpm_location: List[TimeCodeInMeasures]
-        all_bpm_location = self._var_bpm.keys()
-        #all_bpm_location.append(t_in_measure)
-
-        # Get the value of every bpm change
-        all_bpm_value: List[float]
-        all_bpm_value = self._var_bpm.values()
-
-        # Get the location of every meter change
-        all_meter_location: List[TimeCodeInMeasures]
-        all_meter_location = self._var_meter.keys()
-
-        # Get the value of every meter change
-        all_meter_value: List[float]
-        all_meter_value = self._var_meter.values()
-
-        # Synchronize the two dictionaries
-        # For every change for bpm where there is no change of meter, add the same previous meter
-
-
-        # For every change for meter where there is no change of bpm, add the same previous bpm
-
-
-        return total_t_in_second
-
     
-    def fufill_var_meter(self) -> None:
-        """
-        Fufill the var-meter field of the class.
-        Example:
-        Total: 10 measures (last measure noted as measure No.9)
-        (0, 0): 4/4
-        (4, 0): 2/4
-        (6, 0): 3/4
-        (9, 0): 4/4
-            ↓
-        (0, 0): 4/4
-        (1, 0): 4/4
-        (2, 0): 4/4
-        (3, 0): 4/4
-        (4, 0): 2/4
-        (5, 0): 2/4
-        (6, 0): 3/4
-        (7, 0): 3/4
-        (8, 0): 3/4
-        (9, 0): 4/4
-        
-        """
-        fufilled_var_meter: Dict[TimeCodeInMeasures, meter]
+    def retrieve_meter_map(self) -> MeterMap:
+        """The getter for the run-length meter map of this score (see DataStructure.MeterMap), which answers
+        the meter and the absolute beat of any measure with a binary search over the meter changes"""
+        return self.retrieve_timing_map().get_meter_map()
 
-        # Get the total number of measures
-        num_measure_in_total: int
-        num_measure_in_total = self._all_nodes[(self._all_nodes.__len__) - 1].get_end_time().get_num_measure()
-        #### length是这么用的吗
 
-        # Make a copy of the original var_bpm field
-        var_meter_copy: Dict[TimeCodeInMeasures, meter]
-        var_meter_copy = self._var_meter
+    def fufill_var_meter(self) -> None:
+        """Method to build the meter map of this score now, instead of on its first use.
+        The meters are no longer expanded into one entry per measure, see retrieve_meter_map."""
+        self.retrieve_timing_map()
 
-        # Use a list to collect all the measure number that involve a bpm change
-        all_measure_vmeter = var_meter_copy.keys()
         
-        i = 0
-        while i < all_measure_vmeter.__len__:
-            # Get the current change in meter
-            current_vmeter_measure = all_measure_vmeter[i]
-            current_vmeter_value = var_meter_copy.get(current_vmeter_measure)
-
-            # Write it down
-            fufilled_var_meter[current_vmeter_measure] = current_vmeter_value
-
-            # Fill the value forward until the next change or the end
-            j = current_vmeter_measure + 1
-
-            # If this is not the last one in the list
-            if not (i == all_measure_vmeter.__len__ - 1):
-                # Find the next item in the list, decide how many times to copy this meter value
-                next_vmeter_measure = all_measure_vmeter[i + 1]
-                while j < next_vmeter_measure:
-                    fufilled_var_meter[j] = current_vmeter_value
-            # If this is the last one in the list
-            else:
-                # Copy the last meter value until the last measure of this 
-                while j <= num_measure_in_total:
-                    fufilled_var_meter[j] = current_vmeter_value
 
-        
-        self._var_meter = fufilled_var_meter
 
-        
\ No newline at end of file
+
+def build_piano_score(all_nodes: Union[List[ANode], NodeTable], num_trail: int, \
+    var_meter: Dict[TimeCodeInMeasures, meter], var_bpm: Dict[TimeCodeInMeasures, float]) -> pianoGameMusicScore:
+    """To build the simplest kind of pianoGameMusicScore which can hold the given meter and bpm changes:
+        - one meter and one bpm: pianoGameMusicScore
+        - one meter, many bpm: VBPMPianoGameMusicScore
+        - many meter: VMVBPianoGameMusicScore
+    """
+    if len(var_meter) == 1 and TimeCodeInMeasures(0, 0.0) in var_meter:
+        fix_meter = var_meter[TimeCodeInMeasures(0, 0.0)]
+        if len(var_bpm) == 1 and TimeCodeInMeasures(0, 0.0) in var_bpm:
+            return pianoGameMusicScore(all_nodes, num_trail, fix_meter, var_bpm[TimeCodeInMeasures(0, 0.0)])
+        return VBPMPianoGameMusicScore(all_nodes, num_trail, fix_meter, var_bpm)
+    return VMVBPianoGameMusicScore(all_nodes, num_trail, var_meter, var_bpm)
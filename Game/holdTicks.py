@@ -0,0 +1,240 @@
+# This is the tick expander of the hold nodes of a score, which gives the ticks of a time window at a time
+
+"""A hold node is worth one more combo for every tick while it is held. The ticks of a hold fall every
+1 / ticks_per_beat beat from its start (the beats of the meter of every measure), strictly before its end,
+and their times in seconds follow the bpm changes of the score through its timing map.
+
+The ticks are never stored: a score of a million hold nodes may have tens of millions of them.
+Only the number of ticks of every hold is computed (vectorized, from its start and end beats),
+and the ticks of a time window are expanded on demand:
+
+    hold_ticks = score.retrieve_hold_ticks()
+    for window in hold_ticks.iter_ticks(window=1.0):
+        window.rows, window.seconds
+    score.get_total_combo()
+"""
+
+from typing import Iterator, NamedTuple, Optional, Tuple
+from DataStructure.MeterMap import MeterMap
+from DataStructure.TimingMap import TimingMap
+from Game.nodeTable import NODE_KIND_HOLD, NodeTable, update_running_maximum
+import numpy as np
+
+
+HOLD_TICKS_PER_BEAT = 2
+"""The default number of ticks per beat of a hold node"""
+
+_BEAT_TOLERANCE = 1e-6
+"""A tick less than this many beats before the end of its hold falls on the end, which is not a tick"""
+
+
+class TickWindow(NamedTuple):
+    """The ticks of the hold nodes of a score during a time window, in the order of their time"""
+    rows: np.ndarray
+    """Position in the node table of the hold node of every tick"""
+    trails: np.ndarray
+    seconds: np.ndarray
+    """Time (in seconds) of every tick, ascending"""
+
+
+
+def count_hold_ticks(start_beats: np.ndarray, end_beats: np.ndarray, ticks_per_beat: int) -> np.ndarray:
+    """To get the number of ticks of every hold from its absolute start and end beats,
+    i.e. the number of k >= 1 such that start + k / ticks_per_beat < end"""
+    lengths = (np.asarray(end_beats) - np.asarray(start_beats)) * ticks_per_beat
+    return np.maximum(np.ceil(lengths - _BEAT_TOLERANCE * ticks_per_beat).astype(np.int64) - 1, 0)
+
+
+def get_total_combo(all_nodes: NodeTable, meter_map: MeterMap, ticks_per_beat: int = HOLD_TICKS_PER_BEAT) -> int:
+    """To get the combo of a full combo play: one for every node, one more for the end of every hold,
+    and one for every tick of the holds. The node table may be in any order and needs no seconds columns."""
+    holds = np.flatnonzero(all_nodes.kinds == NODE_KIND_HOLD)
+    start_beats = meter_map.get_beats_of(all_nodes.start_measures[holds]) + all_nodes.start_beats[holds]
+    end_beats = meter_map.get_beats_of(all_nodes.end_measures[holds]) + all_nodes.end_beats[holds]
+    return len(all_nodes) + len(holds) + int(count_hold_ticks(start_beats, end_beats, ticks_per_beat).sum())
+
+
+
+class HoldTicks():
+    """The ticks of the hold nodes of a score, expanded one time window at a time.
+
+    The holds are kept in the order of their starting time, with a running maximum of their ending times,
+    so the holds which may have ticks in a window are one slice found by two binary searches.
+    The window is turned into a range of beats, which gives the range of ticks of every one of these holds,
+    and only those ticks are expanded and converted into seconds.
+
+    Example (2 ticks per beat):
+        hold from beat 1 to beat 3:   |   ·   ·   ·   |
+                                      1  1.5  2  2.5  3
+        - It has 3 ticks, a window from the time of beat 1.75 to the time of beat 2.25 only expands beat 2.
+
+    An edit of the score patches the holds in place, only the holds after the edited node are touched.
+    """
+
+    # ------------- Fields ---------------
+    _timing_map: TimingMap
+    _meter_map: MeterMap
+    _ticks_per_beat: int
+
+    _rows: np.ndarray
+    """Rows of the hold nodes in the node table, in the order of their starting time"""
+
+    _trails: np.ndarray
+
+    _start_beats: np.ndarray
+    """Absolute beat where every hold starts"""
+
+    _num_ticks: np.ndarray
+    """Number of ticks of every hold"""
+
+    _starts: np.ndarray
+    """Starting time (in seconds) of every hold, ascending"""
+
+    _ends: np.ndarray
+    """Ending time (in seconds) of every hold"""
+
+    _reaches: np.ndarray
+    """Running maximum of the ending times (in seconds) of the holds, ascending"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, all_nodes: NodeTable, timing_map: TimingMap, ticks_per_beat: int = HOLD_TICKS_PER_BEAT) -> None:
+        """The node table must be sorted by starting time and hold its seconds columns"""
+        if ticks_per_beat < 1:
+            raise ValueError('a hold node needs at least one tick per beat')
+        self._timing_map = timing_map
+        self._meter_map = timing_map.get_meter_map()
+        self._ticks_per_beat = ticks_per_beat
+
+        rows = np.flatnonzero(all_nodes.kinds == NODE_KIND_HOLD)
+        self._rows = rows
+        self._trails = all_nodes.trails[rows]
+        self._start_beats, self._num_ticks = self._count_ticks(all_nodes, rows)
+        self._starts = all_nodes.start_seconds[rows]
+        self._ends = all_nodes.end_seconds[rows]
+        self._reaches = np.maximum.accumulate(self._ends) if len(rows) > 0 else self._ends.copy()
+
+
+    # ------------- Methods --------------
+    def get_ticks_per_beat(self) -> int:
+        return self._ticks_per_beat
+
+    def get_num_ticks(self) -> np.ndarray:
+        """To get the number of ticks of every hold node, in the order of their starting time"""
+        return self._num_ticks
+
+    def get_num_tick(self) -> int:
+        """To get the number of ticks of the whole score"""
+        return int(self._num_ticks.sum())
+
+    def get_tick_seconds(self, row: int) -> np.ndarray:
+        """To get the time (in seconds) of every tick of the hold node of a row of the node table, ascending"""
+        i = int(np.searchsorted(self._rows, row))
+        if i == len(self._rows) or self._rows[i] != row:
+            raise ValueError(f'row {row} is not a hold node')
+        ticks = np.arange(1, self._num_ticks[i] + 1)
+        return self._timing_map.get_seconds_at_whole_notes( \
+            self._meter_map.get_whole_notes_of_beats(self._start_beats[i] + ticks / self._ticks_per_beat))
+
+    def get_ticks(self, start_second: float, end_second: float) -> TickWindow:
+        """To get the ticks from start_second (included) to end_second (excluded).
+        Consecutive windows give every tick exactly once."""
+        empty = TickWindow(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=self._trails.dtype), np.zeros(0))
+        low = int(np.searchsorted(self._reaches, start_second, side='right'))
+        high = int(np.searchsorted(self._starts, end_second, side='left'))
+        if low >= high:
+            return empty
+
+        # The ranges of ticks are widened by one tick on each side, the seconds decide the border ticks
+        holds = np.arange(low, high)
+        start_beats = self._start_beats[holds]
+        first_beat = self._get_beat_at_second(start_second)
+        last_beat = self._get_beat_at_second(end_second)
+        first_ticks = np.maximum(np.floor((first_beat - start_beats) * self._ticks_per_beat).astype(np.int64), 1)
+        last_ticks = np.minimum(np.ceil((last_beat - start_beats) * self._ticks_per_beat).astype(np.int64), \
+            self._num_ticks[holds])
+        counts = np.maximum(last_ticks - first_ticks + 1, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return empty
+
+        # Expand the range of every hold: tick k of the hold i is at start_beats[i] + k / ticks_per_beat
+        tick_holds = np.repeat(holds, counts)
+        offsets = np.repeat(np.cumsum(counts) - counts - first_ticks, counts)
+        ticks = np.arange(total) - offsets
+        seconds = self._timing_map.get_seconds_at_whole_notes( \
+            self._meter_map.get_whole_notes_of_beats(self._start_beats[tick_holds] + ticks / self._ticks_per_beat))
+
+        inside = np.flatnonzero((seconds >= start_second) & (seconds < end_second))
+        inside = inside[np.argsort(seconds[inside], kind='stable')]
+        tick_holds = tick_holds[inside]
+        return TickWindow(self._rows[tick_holds], self._trails[tick_holds], seconds[inside])
+
+    def iter_ticks(self, window: float = 1.0, start_second: float = 0.0, \
+        end_second: Optional[float] = None) -> Iterator[TickWindow]:
+        """To go through the ticks from start_second to end_second (the end of the last hold by default),
+        window seconds at a time. Only the ticks of the current window are in memory."""
+        if window <= 0:
+            raise ValueError('the window must be positive')
+        if end_second is None:
+            end_second = float(self._reaches[-1]) if len(self._reaches) > 0 else start_second
+        num_window = int(np.ceil((end_second - start_second) / window))
+        for i in range(num_window):
+            yield self.get_ticks(start_second + i * window, min(start_second + (i + 1) * window, end_second))
+
+    def insert_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the insertion of a row into the node table, the table already holds its seconds"""
+        position = int(np.searchsorted(self._rows, row))
+        self._rows[position:] += 1
+        if all_nodes.kinds[row] != NODE_KIND_HOLD:
+            return
+        rows = np.array([row])
+        start_beats, num_ticks = self._count_ticks(all_nodes, rows)
+        self._rows = np.insert(self._rows, position, row)
+        self._trails = np.insert(self._trails, position, all_nodes.trails[row])
+        self._start_beats = np.insert(self._start_beats, position, start_beats)
+        self._num_ticks = np.insert(self._num_ticks, position, num_ticks)
+        self._starts = np.insert(self._starts, position, all_nodes.start_seconds[row])
+        self._ends = np.insert(self._ends, position, all_nodes.end_seconds[row])
+        self._reaches = np.insert(self._reaches, position, all_nodes.end_seconds[row])
+        update_running_maximum(self._reaches, self._ends, position)
+
+    def delete_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the removal of a row from the node table, before the table removes it"""
+        position = int(np.searchsorted(self._rows, row))
+        if all_nodes.kinds[row] == NODE_KIND_HOLD:
+            self._rows = np.delete(self._rows, position)
+            self._trails = np.delete(self._trails, position)
+            self._start_beats = np.delete(self._start_beats, position)
+            self._num_ticks = np.delete(self._num_ticks, position)
+            self._starts = np.delete(self._starts, position)
+            self._ends = np.delete(self._ends, position)
+            self._reaches = np.delete(self._reaches, position)
+            update_running_maximum(self._reaches, self._ends, position)
+        self._rows[position:] -= 1
+
+    def retime(self, all_nodes: NodeTable, timing_map: TimingMap, rows: np.ndarray) -> None:
+        """Method to follow a change of the timing of the score, which moved the times of the given rows
+        (ascending). The ticks of the holds among them are counted again, a meter change may change them."""
+        self._timing_map = timing_map
+        self._meter_map = timing_map.get_meter_map()
+        positions = np.searchsorted(self._rows, rows)
+        is_hold = positions < len(self._rows)
+        is_hold[is_hold] = self._rows[positions[is_hold]] == rows[is_hold]
+        positions, rows = positions[is_hold], rows[is_hold]
+        if len(rows) == 0:
+            return
+        self._start_beats[positions], self._num_ticks[positions] = self._count_ticks(all_nodes, rows)
+        self._starts[positions] = all_nodes.start_seconds[rows]
+        self._ends[positions] = all_nodes.end_seconds[rows]
+        update_running_maximum(self._reaches, self._ends, int(positions[0]))
+
+    def _count_ticks(self, all_nodes: NodeTable, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """To get the absolute start beat and the number of ticks of the hold nodes of the given rows"""
+        start_beats = self._meter_map.get_beats_of(all_nodes.start_measures[rows]) + all_nodes.start_beats[rows]
+        end_beats = self._meter_map.get_beats_of(all_nodes.end_measures[rows]) + all_nodes.end_beats[rows]
+        return start_beats, count_hold_ticks(start_beats, end_beats, self._ticks_per_beat)
+
+    def _get_beat_at_second(self, num_second: float) -> float:
+        """To get the absolute beat of a time in seconds"""
+        return self._meter_map.get_beat_at_whole_notes(self._timing_map.get_whole_notes_at_second(num_second))
@@ -0,0 +1,319 @@
+# This is the real-time hit judgement of a compiled score
+
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.holdTicks import HOLD_TICKS_PER_BEAT, HoldTicks
+from Game.nodeTable import NODE_KIND_HOLD, NodeTable
+from Util.Metrics import METRICS
+import numpy as np
+
+
+class Judgement(Enum):
+    """How well a node was hit by the player"""
+    PERFECT = 'perfect'
+    GREAT = 'great'
+    GOOD = 'good'
+    MISS = 'miss'
+
+    # Members are singletons compared by identity, hashing them by identity keeps the counting dicts fast
+    __hash__ = object.__hash__
+
+
+
+_JUDGEMENT_COUNTERS = {judgement: METRICS.counter('judgements_total', 'Number of judgements made', \
+    judgement=judgement.value) for judgement in Judgement}
+
+
+
+class JudgementWindows():
+    """The timing windows (in seconds, on each side of the node) used to classify a hit.
+
+    Example:
+            miss   good  great perfect great  good   miss
+        ---|------|-----|-----|--|--|-----|-----|------|---
+                                 ↑ start time of the node
+
+        - A key-down further away than the miss window does not touch the node at all.
+        - A node is missed automatically once the good window after it has passed.
+    """
+
+    # ------------- Fields ---------------
+    _perfect: float
+    _great: float
+    _good: float
+    _miss: float
+
+
+    # ----------- Constructor ------------
+    def __init__(self, perfect: float = 0.025, great: float = 0.05, good: float = 0.1, miss: float = 0.15) -> None:
+        if not 0 <= perfect <= great <= good <= miss:
+            raise ValueError('judgement windows must satisfy 0 <= perfect <= great <= good <= miss')
+        self._perfect = perfect
+        self._great = great
+        self._good = good
+        self._miss = miss
+
+
+    # ------------- Methods --------------
+    def classify(self, offset: float) -> Judgement:
+        """To classify the offset (in seconds) between a key event and the time of a node"""
+        offset = abs(offset)
+        if offset <= self._perfect:
+            return Judgement.PERFECT
+        if offset <= self._great:
+            return Judgement.GREAT
+        if offset <= self._good:
+            return Judgement.GOOD
+        return Judgement.MISS
+
+    def get_good(self) -> float:
+        return self._good
+
+    def get_miss(self) -> float:
+        return self._miss
+
+
+
+class JudgementResult(NamedTuple):
+    """One judgement made by the engine"""
+    row: int
+    """Position of the judged node in the node table of the score"""
+    trail: int
+    judgement: Judgement
+    offset: float
+    """Key event time minus node time, in seconds (0.0 for automatic judgements)"""
+    is_release: bool
+    """Whether this judges the end of a hold node rather than its start"""
+
+
+
+class JudgementEngine():
+    """The judgement engine of one play of a compiled pianoGameMusicScore.
+
+    Every trail keeps the start-sorted nodes on it and a cursor to the first node which may still be judged.
+    The cursor only moves forward, so over a whole play every node is passed once (amortized O(1) per event),
+    and the nearest unjudged node to a key-down is found with one bisect between the cursor and the end.
+
+    Example:
+        trail 1:   x   x   [ ]   [ ]      [ ]
+                           ↑ cursor
+        - `x` are already judged, a key-down at time t looks at the nodes from the cursor on.
+
+    While a hold node is held, every one of its ticks (see Game.holdTicks) adds one to the combo once reached,
+    so a full combo play reaches the total combo of the score. A release too early loses the ticks left,
+    any other release gets them. Ticks are neither counted as judgements nor returned as results.
+    """
+
+    # ------------- Fields ---------------
+    _all_nodes: NodeTable
+    _windows: JudgementWindows
+
+    _starts: Dict[int, List[float]]
+    """Starting time (in seconds) of the nodes on every trail, ascending"""
+
+    _ends: Dict[int, List[float]]
+    """Ending time (in seconds) of the nodes on every trail, in the same order"""
+
+    _rows: Dict[int, List[int]]
+    """Position in the node table of the nodes on every trail, in the same order"""
+
+    _is_hold: Dict[int, List[bool]]
+    """Whether the nodes on every trail are hold nodes, in the same order"""
+
+    _judged: Dict[int, List[bool]]
+    """Whether the start of the nodes on every trail has been judged, in the same order"""
+
+    _cursors: Dict[int, int]
+    """Index (in the lists above) of the first node of every trail which may still be judged"""
+
+    _holding: Dict[int, int]
+    """Index of the hold node which is currently held on every trail, for the trails being held"""
+
+    _hold_ticks: HoldTicks
+
+    _held_ticks: Dict[int, List[float]]
+    """Time (in seconds) of the ticks of the hold node held on every trail, ascending"""
+
+    _tick_cursors: Dict[int, int]
+    """Index (in the list above) of the first tick not reached yet on every trail being held"""
+
+    _combo: int
+    _max_combo: int
+    _counts: Dict[Judgement, int]
+
+    _good: float
+    _miss: float
+    """The good and miss windows, read on every event"""
+
+    _hits: np.ndarray
+    """The hit flags of the node table, written directly as ANode.got_hit / missed would through a NodeView"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, score: pianoGameMusicScore, windows: Optional[JudgementWindows] = None, \
+        ticks_per_beat: int = HOLD_TICKS_PER_BEAT) -> None:
+        self._all_nodes = score.retrieve_all_nodes()
+        self._windows = windows if windows is not None else JudgementWindows()
+        self._hold_ticks = score.retrieve_hold_ticks(ticks_per_beat)
+
+        trails = self._all_nodes.trails.tolist()
+        starts = self._all_nodes.start_seconds.tolist()
+        ends = self._all_nodes.end_seconds.tolist()
+        kinds = self._all_nodes.kinds.tolist()
+
+        self._starts = {trail: [] for trail in range(1, score.get_num_trail() + 1)}
+        self._ends = {trail: [] for trail in self._starts}
+        self._rows = {trail: [] for trail in self._starts}
+        self._is_hold = {trail: [] for trail in self._starts}
+        # The node table is sorted by starting time, so every trail is filled in ascending order
+        for row, trail in enumerate(trails):
+            self._starts[trail].append(starts[row])
+            self._ends[trail].append(ends[row])
+            self._rows[trail].append(row)
+            self._is_hold[trail].append(kinds[row] == NODE_KIND_HOLD)
+
+        self._judged = {trail: [False] * len(self._starts[trail]) for trail in self._starts}
+        self._cursors = {trail: 0 for trail in self._starts}
+        self._holding = {}
+        self._held_ticks = {}
+        self._tick_cursors = {}
+
+        self._combo = 0
+        self._max_combo = 0
+        self._counts = {judgement: 0 for judgement in Judgement}
+        self._hits = self._all_nodes.hits
+        self._good = self._windows.get_good()
+        self._miss = self._windows.get_miss()
+
+
+    # ------------- Methods --------------
+    def key_down(self, trail: int, t: float) -> List[JudgementResult]:
+        """To judge a key-down on a trail at time t (in seconds).
+        Returns the automatic misses it caused followed by the judgement of the node it hit, if any."""
+        results = self._advance(trail, t)
+        if trail in self._holding:
+            return results
+
+        i = self._find_nearest_unjudged(trail, t)
+        if i is None:
+            return results
+
+        offset = t - self._starts[trail][i]
+        if abs(offset) > self._miss:
+            return results
+
+        judgement = self._windows.classify(offset)
+        self._judged[trail][i] = True
+        results.append(self._record(trail, i, judgement, offset, False))
+        if self._is_hold[trail][i] and judgement != Judgement.MISS:
+            self._holding[trail] = i
+            self._held_ticks[trail] = self._hold_ticks.get_tick_seconds(self._rows[trail][i]).tolist()
+            self._tick_cursors[trail] = 0
+        return results
+
+    def key_up(self, trail: int, t: float) -> List[JudgementResult]:
+        """To judge a key-up on a trail at time t (in seconds), which ends the hold node held on that trail"""
+        results = self._advance(trail, t)
+        i = self._holding.pop(trail, None)
+        if i is None:
+            return results
+
+        offset = t - self._ends[trail][i]
+        judgement = Judgement.PERFECT if offset >= 0 else self._windows.classify(offset)
+        if judgement is not Judgement.MISS:
+            self._reach_ticks(trail, float('inf'))
+        del self._held_ticks[trail], self._tick_cursors[trail]
+        results.append(self._record(trail, i, judgement, offset, True))
+        return results
+
+    def update(self, now: float) -> List[JudgementResult]:
+        """To make the automatic judgements of every trail up to the time now (in seconds):
+        nodes whose windows have passed are missed, holds held until their end are completed"""
+        results = []
+        for trail in self._starts:
+            results.extend(self._advance(trail, now))
+        return results
+
+    def get_combo(self) -> int:
+        return self._combo
+
+    def get_max_combo(self) -> int:
+        return self._max_combo
+
+    def get_counts(self) -> Dict[Judgement, int]:
+        """To get how many times every judgement was made so far"""
+        return dict(self._counts)
+
+    def _advance(self, trail: int, now: float) -> List[JudgementResult]:
+        """To move the cursor of a trail past every node which can not be judged any more at the time now"""
+        results = []
+        starts = self._starts[trail]
+        judged = self._judged[trail]
+        good = self._good
+
+        # A held node gets its ticks on the way, and completes by itself once its end has been reached
+        held = self._holding.get(trail)
+        if held is not None:
+            self._reach_ticks(trail, now)
+        if held is not None and self._ends[trail][held] <= now:
+            del self._holding[trail], self._held_ticks[trail], self._tick_cursors[trail]
+            results.append(self._record(trail, held, Judgement.PERFECT, 0.0, True))
+
+        cursor = self._cursors[trail]
+        num_node = len(starts)
+        while cursor < num_node and (judged[cursor] or starts[cursor] + good < now):
+            if not judged[cursor]:
+                judged[cursor] = True
+                results.append(self._record(trail, cursor, Judgement.MISS, 0.0, False))
+            cursor += 1
+        self._cursors[trail] = cursor
+        return results
+
+    def _reach_ticks(self, trail: int, now: float) -> None:
+        """Method to add the ticks reached at the time now by the hold node held on a trail to the combo"""
+        ticks = self._held_ticks[trail]
+        cursor = self._tick_cursors[trail]
+        reached = bisect_right(ticks, now, cursor)
+        if reached > cursor:
+            self._tick_cursors[trail] = reached
+            self._combo += reached - cursor
+            if self._combo > self._max_combo:
+                self._max_combo = self._combo
+
+    def _find_nearest_unjudged(self, trail: int, t: float) -> Optional[int]:
+        """To find the index of the unjudged node on a trail whose start is nearest to t"""
+        starts = self._starts[trail]
+        judged = self._judged[trail]
+        cursor = self._cursors[trail]
+
+        position = bisect_left(starts, t, cursor)
+        after = position
+        while after < len(starts) and judged[after]:
+            after += 1
+        before = position - 1
+        while before >= cursor and judged[before]:
+            before -= 1
+
+        if after >= len(starts):
+            return before if before >= cursor else None
+        if before < cursor:
+            return after
+        return before if abs(starts[before] - t) <= abs(starts[after] - t) else after
+
+    def _record(self, trail: int, i: int, judgement: Judgement, offset: float, is_release: bool) -> JudgementResult:
+        """To count a judgement, update the combo and the hit flag of the node"""
+        row = self._rows[trail][i]
+        if judgement is Judgement.MISS:
+            self._hits[row] = False
+            self._combo = 0
+        else:
+            self._hits[row] = True
+            self._combo += 1
+            if self._combo > self._max_combo:
+                self._max_combo = self._combo
+        self._counts[judgement] += 1
+        if METRICS.enabled:
+            _JUDGEMENT_COUNTERS[judgement].inc()
+        return JudgementResult(row, trail, judgement, offset, is_release)
@@ -57,6 +57,7 @@ class ANode(INode):
             raise ValueError('starting time can not be latter than ending time')
         if init_trail < 1:
             raise ValueError('note init trail number cannot be negative or zero')
+        self._hit = False
         self._start_time = start
         self._end_time = end
         self._init_trail = init_trail
@@ -64,7 +65,7 @@ class ANode(INode):
 
     # ------------ Methods -------------
     def __hash__(self):
-        return hash(self._hit + self._start_time + self._end_time + self._init_trail)
+        return hash((self._start_time, self._end_time, self._init_trail))
 
     def __eq__(self, obj: Any) -> bool:
         if not isinstance(obj, ANode):
@@ -0,0 +1,379 @@
+# This is the columnar (structure-of-arrays) storage for the nodes of a score
+
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+from DataStructure.TimeCode import TimeCodeInMeasures
+from Game.node import ANode
+from Game.sortedNodeList import SortedNodeList
+import numpy as np
+
+
+NODE_KIND_TAP = 0
+"""Kind of a node which starts and ends at the same time, the player only needs to click once"""
+
+NODE_KIND_HOLD = 1
+"""Kind of a node which ends later than it starts, the player needs to hold the key for a while"""
+
+
+_MIN_CAPACITY = 16
+"""Number of rows a column buffer gets at least when it grows"""
+
+
+class NodeTable():
+    """The nodes of a score, stored column by column in contiguous numpy arrays.
+    The i-th element of every column describes the i-th node.
+
+    Example:
+        start_measures  | 0   | 0   | 2   |
+        start_beats     | 1.0 | 3.0 | 0.0 |
+        end_measures    | 0   | 1   | 2   |
+        end_beats       | 1.0 | 1.0 | 0.0 |
+        trails          | 2   | 1   | 4   |
+        kinds           | TAP | HOLD| TAP |
+
+        - This is a NodeTable with 3 nodes.
+        - Code that works with ANode objects gets a NodeView of the row it needs.
+    """
+
+    # ------------- Fields ---------------
+    _start_measures: np.ndarray
+    """Measure of the starting time of every node (int64)"""
+
+    _start_beats: np.ndarray
+    """Beat of the starting time of every node (float64)"""
+
+    _end_measures: np.ndarray
+    """Measure of the ending time of every node (int64)"""
+
+    _end_beats: np.ndarray
+    """Beat of the ending time of every node (float64)"""
+
+    _trails: np.ndarray
+    """Initial trail of every node (int32)"""
+
+    _kinds: np.ndarray
+    """Kind of every node, NODE_KIND_TAP or NODE_KIND_HOLD (int8)"""
+
+    _hits: np.ndarray
+    """Whether every node was hit by the player (bool)"""
+
+    _start_seconds: np.ndarray
+    """Precomputed starting time in seconds of every node (float64), filled by the score"""
+
+    _end_seconds: np.ndarray
+    """Precomputed ending time in seconds of every node (float64), filled by the score"""
+
+    _size: int
+    """Number of nodes. The column buffers may be longer, the rows after the last node are spare capacity
+    so that inserting a node moves the rows after it in place instead of reallocating every column"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, start_measures: np.ndarray, start_beats: np.ndarray, end_measures: np.ndarray, \
+        end_beats: np.ndarray, trails: np.ndarray, kinds: Optional[np.ndarray] = None, \
+        start_seconds: Optional[np.ndarray] = None, end_seconds: Optional[np.ndarray] = None) -> None:
+        """Columns which already have the right dtype are used as they are, without being copied.
+        The kinds and the seconds columns are computed when they are not given."""
+        self._start_measures = np.ascontiguousarray(start_measures, dtype=np.int64)
+        self._start_beats = np.ascontiguousarray(start_beats, dtype=np.float64)
+        self._end_measures = np.ascontiguousarray(end_measures, dtype=np.int64)
+        self._end_beats = np.ascontiguousarray(end_beats, dtype=np.float64)
+        self._trails = np.ascontiguousarray(trails, dtype=np.int32)
+
+        num_node = len(self._start_measures)
+        if not all(len(column) == num_node for column in \
+            (self._start_beats, self._end_measures, self._end_beats, self._trails)):
+            raise ValueError('all columns of a node table must have the same length')
+
+        if kinds is None:
+            kinds = np.where((self._start_measures != self._end_measures) | (self._start_beats != self._end_beats), \
+                NODE_KIND_HOLD, NODE_KIND_TAP)
+        self._kinds = np.ascontiguousarray(kinds, dtype=np.int8)
+        self._hits = np.zeros(num_node, dtype=bool)
+        self._size = num_node
+        self.set_seconds(np.full(num_node, np.nan) if start_seconds is None else start_seconds, \
+            np.full(num_node, np.nan) if end_seconds is None else end_seconds)
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> 'NodeView':
+        num_node = len(self)
+        if index < 0:
+            index += num_node
+        if not 0 <= index < num_node:
+            raise IndexError('node table index out of range')
+        return NodeView(self, index)
+
+    def __iter__(self) -> Iterator['NodeView']:
+        for index in range(len(self)):
+            yield NodeView(self, index)
+
+    def __eq__(self, obj: Any) -> bool:
+        if not isinstance(obj, NodeTable):
+            return False
+        return np.array_equal(self.start_measures, obj.start_measures) \
+            and np.array_equal(self.start_beats, obj.start_beats) \
+            and np.array_equal(self.end_measures, obj.end_measures) \
+            and np.array_equal(self.end_beats, obj.end_beats) \
+            and np.array_equal(self.trails, obj.trails) \
+            and np.array_equal(self.hits, obj.hits)
+
+    __hash__ = None
+
+    def set_seconds(self, start_seconds: np.ndarray, end_seconds: np.ndarray) -> None:
+        """To store the precomputed starting and ending time (in seconds) of every node"""
+        if len(start_seconds) != len(self) or len(end_seconds) != len(self):
+            raise ValueError('seconds columns must have one value per node')
+        self._start_seconds = np.ascontiguousarray(start_seconds, dtype=np.float64)
+        self._end_seconds = np.ascontiguousarray(end_seconds, dtype=np.float64)
+
+    def _get_columns(self) -> Tuple[np.ndarray, ...]:
+        """To get the buffer of every column, in the order of the constructor, then the hits"""
+        return (self._start_measures, self._start_beats, self._end_measures, self._end_beats, self._trails, \
+            self._kinds, self._start_seconds, self._end_seconds, self._hits)
+
+    def _set_columns(self, columns: Tuple[np.ndarray, ...]) -> None:
+        """Method to replace the buffer of every column, in the order of _get_columns"""
+        (self._start_measures, self._start_beats, self._end_measures, self._end_beats, self._trails, \
+            self._kinds, self._start_seconds, self._end_seconds, self._hits) = columns
+
+    def _reserve(self, num_node: int) -> None:
+        """Method to make every column buffer writable and long enough for num_node rows.
+        A buffer which is too short (or read only, such as a memory mapped chart) is replaced by one with
+        twice the rows, so that n insertions reallocate the columns O(log n) times"""
+        columns = []
+        for column in self._get_columns():
+            if len(column) < num_node or not column.flags.writeable:
+                buffer = np.empty(max(num_node, 2 * self._size, _MIN_CAPACITY), dtype=column.dtype)
+                buffer[:self._size] = column[:self._size]
+                column = buffer
+            columns.append(column)
+        self._set_columns(tuple(columns))
+
+    def get_sorted_order(self) -> np.ndarray:
+        """To get the row order which sorts the nodes by their starting time, then their trail (O(n log n))"""
+        return np.lexsort((self.trails, self.start_beats, self.start_measures))
+
+    def is_sorted(self) -> bool:
+        """To check that the rows are sorted by their starting time, then their trail (O(n), vectorized)"""
+        measures, beats, trails = self.start_measures, self.start_beats, self.trails
+        same_measure = measures[1:] == measures[:-1]
+        same_beat = same_measure & (beats[1:] == beats[:-1])
+        ordered = (measures[1:] > measures[:-1]) | (same_measure & (beats[1:] > beats[:-1])) \
+            | (same_beat & (trails[1:] >= trails[:-1]))
+        return bool(ordered.all())
+
+    def take(self, order: np.ndarray) -> 'NodeTable':
+        """To get a new node table holding the rows of this table in the given order"""
+        table = NodeTable(self.start_measures[order], self.start_beats[order], self.end_measures[order], \
+            self.end_beats[order], self.trails[order], self.kinds[order], \
+            self.start_seconds[order], self.end_seconds[order])
+        table.hits[:] = self.hits[order]
+        return table
+
+    def copy(self) -> 'NodeTable':
+        """To get a new node table holding a copy of every column of this table"""
+        table = NodeTable(self.start_measures.copy(), self.start_beats.copy(), self.end_measures.copy(), \
+            self.end_beats.copy(), self.trails.copy(), self.kinds.copy(), \
+            self.start_seconds.copy(), self.end_seconds.copy())
+        table.hits[:] = self.hits
+        return table
+
+    def search_sorted_row(self, num_measure: int, num_beat: float, trail: Optional[int] = None) -> int:
+        """To find, in a table sorted by starting time and then trail, the first row whose node starts after
+        (num_measure, num_beat, trail), or the first row starting at or after (num_measure, num_beat) when
+        trail is None. Three binary searches, O(log n)."""
+        start_measures, start_beats = self.start_measures, self.start_beats
+        low = int(np.searchsorted(start_measures, num_measure, side='left'))
+        high = int(np.searchsorted(start_measures, num_measure, side='right'))
+        if trail is None:
+            return low + int(np.searchsorted(start_beats[low:high], num_beat, side='left'))
+        high = low + int(np.searchsorted(start_beats[low:high], num_beat, side='right'))
+        low += int(np.searchsorted(start_beats[low:high], num_beat, side='left'))
+        return low + int(np.searchsorted(self.trails[low:high], trail, side='right'))
+
+    def insert_row(self, row: int, node: ANode, start_second: float = np.nan, end_second: float = np.nan) -> None:
+        """To insert a node before the given row. The rows after it are moved down in place, into the spare
+        capacity of the columns, so only those rows are copied"""
+        if not 0 <= row <= self._size:
+            raise IndexError('node table index out of range')
+        num_measure, num_beat = node.get_start_time().get_time_in_measure()
+        end_measure, end_beat = node.get_end_time().get_time_in_measure()
+        values = (num_measure, num_beat, end_measure, end_beat, node.get_init_trail(), NODE_KIND_TAP \
+            if (num_measure, num_beat) == (end_measure, end_beat) else NODE_KIND_HOLD, \
+            start_second, end_second, node.get_hit())
+
+        self._reserve(self._size + 1)
+        for column, value in zip(self._get_columns(), values):
+            column[row + 1:self._size + 1] = column[row:self._size]
+            column[row] = value
+        self._size += 1
+
+    def delete_row(self, row: int) -> None:
+        """To remove the node of the given row, the rows after it move one row up in place"""
+        if not 0 <= row < self._size:
+            raise IndexError('node table index out of range')
+        self._reserve(self._size)
+        for column in self._get_columns():
+            column[row:self._size - 1] = column[row + 1:self._size]
+        self._size -= 1
+
+    @property
+    def start_measures(self) -> np.ndarray:
+        return self._start_measures[:self._size]
+
+    @property
+    def start_beats(self) -> np.ndarray:
+        return self._start_beats[:self._size]
+
+    @property
+    def end_measures(self) -> np.ndarray:
+        return self._end_measures[:self._size]
+
+    @property
+    def end_beats(self) -> np.ndarray:
+        return self._end_beats[:self._size]
+
+    @property
+    def trails(self) -> np.ndarray:
+        return self._trails[:self._size]
+
+    @property
+    def kinds(self) -> np.ndarray:
+        return self._kinds[:self._size]
+
+    @property
+    def hits(self) -> np.ndarray:
+        return self._hits[:self._size]
+
+    @property
+    def start_seconds(self) -> np.ndarray:
+        return self._start_seconds[:self._size]
+
+    @property
+    def end_seconds(self) -> np.ndarray:
+        return self._end_seconds[:self._size]
+
+
+
+class NodeView(ANode):
+    """A lightweight ANode which reads and writes one row of a NodeTable, instead of holding its own time codes.
+    Every method of ANode works on it, the fields of ANode are redirected to the columns of the table."""
+
+    # ------------ Fields --------------
+    _table: NodeTable
+    """The node table which holds the data of this node"""
+
+    _index: int
+    """The row of this node in the node table"""
+
+
+    # ---------- Constructor -----------
+    def __init__(self, table: NodeTable, index: int) -> None:
+        self._table = table
+        self._index = index
+
+
+    # ------------ Methods -------------
+    def __repr__(self) -> str:
+        return f'NodeView({self._index}: {self.get_start_time().get_time_in_measure()} -> ' \
+            f'{self.get_end_time().get_time_in_measure()}, trail {self.get_init_trail()})'
+
+    def get_index(self) -> int:
+        """To get the row of this node in its node table"""
+        return self._index
+
+    def get_kind(self) -> int:
+        """To get the kind of this node, NODE_KIND_TAP or NODE_KIND_HOLD"""
+        return int(self._table.kinds[self._index])
+
+    def get_start_time_in_second(self) -> float:
+        """To get the precomputed starting time of this node in seconds"""
+        return float(self._table.start_seconds[self._index])
+
+    def get_end_time_in_second(self) -> float:
+        """To get the precomputed ending time of this node in seconds"""
+        return float(self._table.end_seconds[self._index])
+
+    @property
+    def _hit(self) -> bool:
+        return bool(self._table.hits[self._index])
+
+    @_hit.setter
+    def _hit(self, hit: bool) -> None:
+        self._table.hits[self._index] = hit
+
+    @property
+    def _start_time(self) -> TimeCodeInMeasures:
+        return TimeCodeInMeasures(int(self._table.start_measures[self._index]), \
+            float(self._table.start_beats[self._index]))
+
+    @property
+    def _end_time(self) -> TimeCodeInMeasures:
+        return TimeCodeInMeasures(int(self._table.end_measures[self._index]), \
+            float(self._table.end_beats[self._index]))
+
+    @property
+    def _init_trail(self) -> int:
+        return int(self._table.trails[self._index])
+
+
+
+def build_node_table(all_nodes: Union[NodeTable, Iterable[ANode]]) -> NodeTable:
+    """To build a new node table holding the given nodes, in the same order.
+    A node table is copied, so the new table can be edited without changing the given one."""
+    if isinstance(all_nodes, NodeTable):
+        return all_nodes.copy()
+
+    start_measures = []
+    start_beats = []
+    end_measures = []
+    end_beats = []
+    trails = []
+    hits = []
+    for node in all_nodes:
+        if not isinstance(node, ANode):
+            raise TypeError('a node table can only hold ANode')
+        num_measure, num_beat = node.get_start_time().get_time_in_measure()
+        start_measures.append(num_measure)
+        start_beats.append(num_beat)
+        num_measure, num_beat = node.get_end_time().get_time_in_measure()
+        end_measures.append(num_measure)
+        end_beats.append(num_beat)
+        trails.append(node.get_init_trail())
+        hits.append(node.get_hit())
+
+    table = NodeTable(start_measures, start_beats, end_measures, end_beats, trails)
+    table.hits[:] = hits
+    return table
+
+
+def build_sorted_node_table(all_nodes: Union[NodeTable, Iterable[ANode]]) -> NodeTable:
+    """To build a new node table holding the given nodes, sorted by starting time and then trail (O(n log n)).
+    A node table is sorted by its columns, without creating any node object, and is never returned itself."""
+    if isinstance(all_nodes, NodeTable):
+        if all_nodes.is_sorted():
+            return all_nodes.copy()
+        return all_nodes.take(all_nodes.get_sorted_order())
+    return build_node_table(SortedNodeList(all_nodes))
+
+
+def argsort_by_trail(trails: np.ndarray) -> np.ndarray:
+    """To get the order of the rows grouped by trail, the rows of every trail keeping their order
+    (the starting order, for a sorted node table). Trails which fit 16 bits are radix sorted by numpy."""
+    trails = np.asarray(trails)
+    if len(trails) > 0 and 0 <= trails.min() and trails.max() <= np.iinfo(np.int16).max:
+        trails = trails.astype(np.int16)
+    return np.argsort(trails, kind='stable')
+
+
+def update_running_maximum(maxima: np.ndarray, values: np.ndarray, first: int) -> None:
+    """To compute again, in place, the running maximum of values from position first to the end,
+    after the values from that position changed (O(n - first))"""
+    if first >= len(values):
+        return
+    maxima[first:] = np.maximum.accumulate(values[first:])
+    if first > 0:
+        np.maximum(maxima[first:], maxima[first - 1], out=maxima[first:])
@@ -0,0 +1,188 @@
+# This is the headless replay simulator, which judges recorded inputs against a compiled score without any clock
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+from Game.binaryChart import open_binary_chart, write_binary_chart
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.judgement import Judgement, JudgementEngine, JudgementWindows
+import numpy as np
+
+
+JUDGEMENT_CODES = (Judgement.PERFECT, Judgement.GREAT, Judgement.GOOD, Judgement.MISS)
+"""The judgement stored in the result arrays of a replay, by its position in this tuple (-1 for none)"""
+
+ACCURACY_WEIGHTS: Dict[Judgement, float] = {
+    Judgement.PERFECT: 1.0,
+    Judgement.GREAT: 0.75,
+    Judgement.GOOD: 0.5,
+    Judgement.MISS: 0.0,
+}
+"""The part of a judgement counted by the accuracy of a replay"""
+
+_NOT_JUDGED = -1
+_JUDGEMENT_CODE = {judgement: code for code, judgement in enumerate(JUDGEMENT_CODES)}
+
+
+class InputEvent(NamedTuple):
+    """One recorded input of a player"""
+    trail: int
+    time: float
+    """Time of the input in seconds, on the clock of the score"""
+    is_press: bool
+    """Whether the key went down (press) or up (release)"""
+
+
+
+class Replay():
+    """The recorded inputs of one play, kept as three columns sorted by time.
+
+    Replays only hold numpy arrays, so they are cheap to send to the processes of a batch run.
+    """
+
+    # ------------- Fields ---------------
+    _trails: np.ndarray
+    """Trail of every input, int32"""
+
+    _times: np.ndarray
+    """Time (in seconds) of every input, float64, ascending"""
+
+    _presses: np.ndarray
+    """Whether every input is a press, bool"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, trails: np.ndarray, times: np.ndarray, presses: np.ndarray) -> None:
+        trails = np.asarray(trails, dtype=np.int32)
+        times = np.asarray(times, dtype=np.float64)
+        presses = np.asarray(presses, dtype=bool)
+        if not len(trails) == len(times) == len(presses):
+            raise ValueError('every column of a replay must have the same length')
+
+        # Inputs of the same time keep their recorded order
+        if np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            trails, times, presses = trails[order], times[order], presses[order]
+        self._trails = trails
+        self._times = times
+        self._presses = presses
+
+    @classmethod
+    def from_events(cls, events: Iterable[InputEvent]) -> "Replay":
+        """To build a replay from input events"""
+        events = list(events)
+        return cls([event.trail for event in events], [event.time for event in events], \
+            [event.is_press for event in events])
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def __iter__(self):
+        for trail, time, is_press in zip(self._trails.tolist(), self._times.tolist(), self._presses.tolist()):
+            yield InputEvent(trail, time, is_press)
+
+    @property
+    def trails(self) -> np.ndarray:
+        return self._trails
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times
+
+    @property
+    def presses(self) -> np.ndarray:
+        return self._presses
+
+
+
+class ReplayResult(NamedTuple):
+    """The outcome of a replay, with one entry per node in the order of the node table of the score"""
+    judgements: np.ndarray
+    """Code (see JUDGEMENT_CODES) of the judgement of the start of every node, int8"""
+    offsets: np.ndarray
+    """Input time minus node time of the judgement of every node, in seconds (0.0 for automatic judgements)"""
+    release_judgements: np.ndarray
+    """Code of the judgement of the end of every hold node, -1 for taps, int8"""
+    counts: Dict[Judgement, int]
+    max_combo: int
+    final_combo: int
+    accuracy: float
+    """Weighted (see ACCURACY_WEIGHTS) share of the judgements, from 0.0 to 1.0"""
+
+
+
+def simulate_replay(score: pianoGameMusicScore, replay: Replay, \
+    windows: Optional[JudgementWindows] = None) -> ReplayResult:
+    """To judge every input of a replay against a score, as fast as possible and without any clock.
+
+    The judgements go through a JudgementEngine, so the hit flags of the nodes of the score
+    (ANode.got_hit / missed) hold the outcome of this replay afterwards."""
+    engine = JudgementEngine(score, windows)
+    num_node = len(score.retrieve_all_nodes())
+    judgements = np.full(num_node, _NOT_JUDGED, dtype=np.int8)
+    offsets = np.zeros(num_node, dtype=np.float64)
+    release_judgements = np.full(num_node, _NOT_JUDGED, dtype=np.int8)
+
+    score.retrieve_all_nodes().hits[:] = False
+    key_down = engine.key_down
+    key_up = engine.key_up
+    results = []
+    for trail, time, is_press in zip(replay.trails.tolist(), replay.times.tolist(), replay.presses.tolist()):
+        results.extend(key_down(trail, time) if is_press else key_up(trail, time))
+    # Every node left is missed, and holds still held are completed
+    results.extend(engine.update(float('inf')))
+
+    for result in results:
+        if result.is_release:
+            release_judgements[result.row] = _JUDGEMENT_CODE[result.judgement]
+        else:
+            judgements[result.row] = _JUDGEMENT_CODE[result.judgement]
+            offsets[result.row] = result.offset
+
+    counts = engine.get_counts()
+    num_judgement = sum(counts.values())
+    accuracy = sum(ACCURACY_WEIGHTS[judgement] * count for judgement, count in counts.items()) / num_judgement \
+        if num_judgement > 0 else 1.0
+    return ReplayResult(judgements, offsets, release_judgements, counts, engine.get_max_combo(), \
+        engine.get_combo(), accuracy)
+
+
+def run_replays(chart_path: str, replays: Sequence[Replay], windows: Optional[JudgementWindows] = None, \
+    max_workers: Optional[int] = None, chunksize: int = 16) -> List[ReplayResult]:
+    """To simulate many replays of one compiled chart (see Game.binaryChart) over a process pool.
+
+    Every process maps the chart file once, so the node columns are shared through the page cache
+    instead of being copied into every process. The results are in the order of the replays."""
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_open_worker_score, \
+        initargs=(chart_path, windows)) as executor:
+        return list(executor.map(_simulate_in_worker, replays, chunksize=chunksize))
+
+
+def run_score_replays(score: pianoGameMusicScore, replays: Sequence[Replay], \
+    windows: Optional[JudgementWindows] = None, max_workers: Optional[int] = None, \
+    chunksize: int = 16) -> List[ReplayResult]:
+    """The version of run_replays for a score in memory, which is written to a temporary binary chart first"""
+    with tempfile.TemporaryDirectory() as directory:
+        chart_path = os.path.join(directory, 'score.rgcb')
+        write_binary_chart(score, chart_path)
+        return run_replays(chart_path, replays, windows, max_workers, chunksize)
+
+
+
+_worker_score: Optional[pianoGameMusicScore] = None
+"""The score of the current worker process of a batch run"""
+
+_worker_windows: Optional[JudgementWindows] = None
+
+
+def _open_worker_score(chart_path: str, windows: Optional[JudgementWindows]) -> None:
+    global _worker_score, _worker_windows
+    _worker_score = open_binary_chart(chart_path)
+    _worker_windows = windows
+
+
+def _simulate_in_worker(replay: Replay) -> ReplayResult:
+    return simulate_replay(_worker_score, replay, _worker_windows)
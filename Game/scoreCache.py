@@ -0,0 +1,197 @@
+# This is the on-disk cache of compiled scores, keyed by the content of their chart
+
+import hashlib
+import io
+import os
+import tempfile
+import time
+from typing import Any, Callable, List, Optional, Tuple, Type
+from Game.binaryChart import BINARY_CHART_VERSION, BinaryChartError, open_binary_chart, write_binary_chart_to
+from Game.chartParser import load_chart
+from Game.gameMusicScore import pianoGameMusicScore
+
+
+SCORE_COMPILER_VERSION = 1
+"""Version of the score compilation (sorting, seconds conversion, timing map).
+Increase it whenever compiled scores change, so that old cache entries are never used again."""
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'RythmGameProject', 'scores')
+
+_ENTRY_SUFFIX = '.rgcb'
+
+_TEMPORARY_SUFFIX = '.tmp'
+
+_STALE_TEMPORARY_SECONDS = 3600.0
+"""The age after which a temporary file is left from an interrupted write, rather than being written by a process"""
+
+_HASH_CHUNK_SIZE = 1 << 20
+"""The number of bytes of a chart file hashed at a time"""
+
+
+class CompiledScoreCache():
+    """A directory of compiled scores in the binary chart format, one file per chart.
+
+    - The name of an entry is the hash of the chart source, the compiler version and the binary format version,
+      so a changed chart or a new compiler never reads a stale entry.
+    - Entries are written to a temporary file first and renamed into place, so a reader never sees half an entry.
+      The temporary files left by interrupted writes are removed when a cache is opened.
+    - The modification time of an entry is its last use; once the directory is larger than max_bytes,
+      the least recently used entries are removed first.
+
+    Example:
+        cache = CompiledScoreCache()
+        score = cache.load_chart_file('songs/marathon.chart')   # compiled and stored the first time
+        score = cache.load_chart_file('songs/marathon.chart')   # memory-mapped from the cache afterwards
+    """
+
+    # ------------- Fields ---------------
+    _directory: str
+    """The directory holding the entries"""
+
+    _max_bytes: int
+    """The total size of the entries above which the least recently used ones are removed"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY, max_bytes: int = 512 * 1024 * 1024) -> None:
+        if max_bytes < 0:
+            raise ValueError('max_bytes can not be negative')
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._remove_stale_temporary_files()
+
+
+    # ------------- Methods --------------
+    def get_key(self, source: bytes) -> str:
+        """To get the key of a chart from its source"""
+        digest = _new_digest()
+        digest.update(source)
+        return digest.hexdigest()
+
+    def load(self, key: str, score_class: Optional[Type[pianoGameMusicScore]] = None) -> Optional[pianoGameMusicScore]:
+        """To open the cached score with the given key, or None if there is no usable entry.
+        Raises the ValueError of a score_class which can not hold the score of a sound entry, which is kept."""
+        path = self._get_path(key)
+        try:
+            score = open_binary_chart(path, score_class)
+        except FileNotFoundError:
+            return None
+        except BinaryChartError:
+            # A damaged entry (a bad header or bad values, such as a meter which can not exist) is dropped,
+            # it will be compiled again
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return score
+
+    def store(self, key: str, score: pianoGameMusicScore) -> None:
+        """To store a compiled score under the given key, then to evict entries if the cache is too large"""
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self._directory, suffix=_TEMPORARY_SUFFIX)
+        try:
+            with os.fdopen(file_descriptor, 'wb') as entry_file:
+                write_binary_chart_to(score, entry_file)
+            os.replace(temporary_path, self._get_path(key))
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+        self.evict()
+
+    def get_or_compile(self, source: bytes, compile_score: Callable[[], pianoGameMusicScore], \
+        score_class: Optional[Type[pianoGameMusicScore]] = None) -> pianoGameMusicScore:
+        """To get the score of a chart source from the cache, compiling and storing it on a miss"""
+        key = self.get_key(source)
+        score = self.load(key, score_class)
+        if score is not None:
+            return score
+
+        score = compile_score()
+        self.store(key, score)
+        return score
+
+    def load_chart_file(self, path: str, score_class: Optional[Type[pianoGameMusicScore]] = None, \
+        encoding: str = 'utf-8') -> pianoGameMusicScore:
+        """To get the score of a text chart file (see Game.chartParser), through the cache.
+        The file is hashed in chunks and, on a miss, parsed line by line from the same opened file,
+        so the text of the chart is never held in memory as a whole."""
+        with open(path, 'rb') as chart_file:
+            digest = _new_digest()
+            for chunk in iter(lambda: chart_file.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+            key = digest.hexdigest()
+            score = self.load(key, score_class)
+            if score is not None:
+                return score
+
+            chart_file.seek(0)
+            with io.TextIOWrapper(chart_file, encoding=encoding) as chart_lines:
+                score = load_chart(chart_lines)
+        self.store(key, score)
+        return score
+
+    def evict(self) -> None:
+        """To remove the least recently used entries until the cache fits in max_bytes"""
+        entries = self._list_entries()
+        total_bytes = sum(size for _, _, size in entries)
+        for path, _, size in sorted(entries, key=lambda entry: entry[1]):
+            if total_bytes <= self._max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """To remove every entry"""
+        for path, _, _ in self._list_entries():
+            self._remove(path)
+
+    def get_size(self) -> int:
+        """To get the total size of the entries, in bytes"""
+        return sum(size for _, _, size in self._list_entries())
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._directory, key + _ENTRY_SUFFIX)
+
+    def _list_entries(self) -> List[Tuple[str, float, int]]:
+        """To list the entries as (path, last use, size)"""
+        entries = []
+        with os.scandir(self._directory) as scanned:
+            for entry in scanned:
+                if not entry.name.endswith(_ENTRY_SUFFIX):
+                    continue
+                try:
+                    status = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, status.st_mtime, status.st_size))
+        return entries
+
+    def _remove_stale_temporary_files(self) -> None:
+        """Method to remove the temporary files of the writes which never finished"""
+        stale_before = time.time() - _STALE_TEMPORARY_SECONDS
+        with os.scandir(self._directory) as scanned:
+            for entry in scanned:
+                if not entry.name.endswith(_TEMPORARY_SUFFIX):
+                    continue
+                try:
+                    if entry.stat().st_mtime < stale_before:
+                        self._remove(entry.path)
+                except FileNotFoundError:
+                    continue
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+
+def _new_digest() -> Any:
+    """To start the hash of a chart source, salted with the compiler version and the binary format version"""
+    digest = hashlib.sha256()
+    digest.update(f'compiler {SCORE_COMPILER_VERSION} format {BINARY_CHART_VERSION}\n'.encode())
+    return digest
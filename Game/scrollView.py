@@ -0,0 +1,171 @@
+# This is the scroll view of a score, which places the visible nodes of every trail on the screen for a frame
+
+from typing import List, NamedTuple, Optional, Tuple
+from DataStructure.TimingMap import TimingMap
+from Game.nodeTable import NodeTable, argsort_by_trail, update_running_maximum
+import numpy as np
+
+
+class VisibleNodes(NamedTuple):
+    """The nodes of one trail which are on the screen during a frame, in the order of their starting time"""
+    rows: np.ndarray
+    """Positions of the nodes in the node table of the score"""
+    y_starts: np.ndarray
+    """Height (in pixels, above the judgement line) of the start of every node, clipped to the viewport"""
+    y_ends: np.ndarray
+    """Height of the end of every node, clipped to the viewport (the same as y_starts for a tap)"""
+
+
+
+class ScrollView():
+    """The scroll positions of the nodes of a score, grouped by trail, and the scroll position of the song time.
+
+    The judgement line is at y = 0 and the nodes fall from y = viewport height. A node is drawn at
+        y = (position of the node - position of the song time) * scroll speed
+    where the position is either:
+        - the time in seconds (constant scrolling), or
+        - the position in whole notes, times 240 / base bpm (bpm-relative scrolling): the scrolling follows
+          the bpm changes of the score, and goes at the scroll speed while the bpm is the base bpm.
+    The position of the song time is a piecewise-linear function over the bpm segments of the timing map.
+
+    The positions of every trail are sorted, together with a running maximum of the end positions,
+    so the nodes on the screen (holds which started below the judgement line included) are one slice found
+    by two binary searches: from the first node whose running maximum end reaches the judgement line,
+    to the last node starting under the top of the viewport.
+
+    An edit of the score patches the view: only the arrays of the edited trail change, from the edited node on,
+    and a change of the timing only places the nodes whose times moved again.
+    """
+
+    # ------------- Fields ---------------
+    _timing_map: TimingMap
+    _bpm_relative: bool
+    _scale: float
+    """Scroll positions per whole note in bpm-relative scrolling (240 / base bpm)"""
+
+    _follows_first_bpm: bool
+    """Whether the base bpm is the first bpm of the score, which a change of the timing may change"""
+
+    _rows: List[np.ndarray]
+    """Rows of the nodes of every trail (trail 1 first), in the order of their starting time"""
+
+    _starts: List[np.ndarray]
+    """Scroll position of the start of the nodes of every trail, ascending"""
+
+    _ends: List[np.ndarray]
+    """Scroll position of the end of the nodes of every trail"""
+
+    _reaches: List[np.ndarray]
+    """Running maximum of _ends of every trail, ascending"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, all_nodes: NodeTable, num_trail: int, timing_map: TimingMap, bpm_relative: bool = False, \
+        base_bpm: Optional[float] = None) -> None:
+        """The node table must be sorted by starting time and hold its seconds columns.
+        The base bpm of bpm-relative scrolling is the first bpm of the score by default."""
+        self._follows_first_bpm = base_bpm is None
+        if base_bpm is None:
+            base_bpm = timing_map.get_bpm_changes()[0][1]
+        if base_bpm <= 0:
+            raise ValueError('the base bpm must be positive')
+        self._timing_map = timing_map
+        self._bpm_relative = bpm_relative
+        self._scale = 240 / base_bpm
+
+        starts, ends = self._get_positions(all_nodes, slice(None))
+
+        order = argsort_by_trail(all_nodes.trails)
+        bounds = np.searchsorted(all_nodes.trails[order], np.arange(1, num_trail + 2), side='left')
+        self._rows = []
+        self._starts = []
+        self._ends = []
+        self._reaches = []
+        for trail in range(num_trail):
+            rows = order[bounds[trail]:bounds[trail + 1]]
+            self._rows.append(rows)
+            self._starts.append(np.ascontiguousarray(starts[rows]))
+            self._ends.append(np.ascontiguousarray(ends[rows]))
+            self._reaches.append(np.maximum.accumulate(self._ends[-1]) if len(rows) > 0 else self._ends[-1])
+
+
+    # ------------- Methods --------------
+    def get_position(self, num_second: float) -> float:
+        """To get the scroll position of a song time in seconds"""
+        if not self._bpm_relative:
+            return num_second
+        return self._timing_map.get_whole_notes_at_second(num_second) * self._scale
+
+    def get_visible_nodes(self, num_second: float, scroll_speed: float, viewport_height: float) -> List[VisibleNodes]:
+        """To get the nodes of every trail (trail 1 first) which are on the screen at a song time,
+        given the scroll speed (pixels per second, at the base bpm) and the height of the viewport (pixels)"""
+        if scroll_speed <= 0 or viewport_height <= 0:
+            raise ValueError('the scroll speed and the viewport height must be positive')
+        bottom = self.get_position(num_second)
+        top = bottom + viewport_height / scroll_speed
+
+        visible = []
+        for rows, starts, ends, reaches in zip(self._rows, self._starts, self._ends, self._reaches):
+            low = int(np.searchsorted(reaches, bottom, side='left'))
+            high = int(np.searchsorted(starts, top, side='right'))
+            # Taps between two holds which are still held are already below the judgement line
+            on_screen = np.flatnonzero(ends[low:high] >= bottom) + low
+            visible.append(VisibleNodes(rows[on_screen], \
+                np.maximum((starts[on_screen] - bottom) * scroll_speed, 0.0), \
+                np.minimum((ends[on_screen] - bottom) * scroll_speed, viewport_height)))
+        return visible
+
+    def insert_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the insertion of a row into the node table, the table already holds its seconds"""
+        self._shift_rows(row, 1)
+        trail = int(all_nodes.trails[row]) - 1
+        starts, ends = self._get_positions(all_nodes, np.array([row]))
+        position = int(np.searchsorted(self._rows[trail], row))
+        self._rows[trail] = np.insert(self._rows[trail], position, row)
+        self._starts[trail] = np.insert(self._starts[trail], position, starts)
+        self._ends[trail] = np.insert(self._ends[trail], position, ends)
+        self._reaches[trail] = np.insert(self._reaches[trail], position, ends)
+        update_running_maximum(self._reaches[trail], self._ends[trail], position)
+
+    def delete_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the removal of a row from the node table, before the table removes it"""
+        trail = int(all_nodes.trails[row]) - 1
+        position = int(np.searchsorted(self._rows[trail], row))
+        self._rows[trail] = np.delete(self._rows[trail], position)
+        self._starts[trail] = np.delete(self._starts[trail], position)
+        self._ends[trail] = np.delete(self._ends[trail], position)
+        self._reaches[trail] = np.delete(self._reaches[trail], position)
+        update_running_maximum(self._reaches[trail], self._ends[trail], position)
+        self._shift_rows(row, -1)
+
+    def retime(self, all_nodes: NodeTable, timing_map: TimingMap, rows: np.ndarray) -> None:
+        """Method to follow a change of the timing of the score, which moved the times of the given rows (ascending).
+        Every node is placed again when the change moved the first bpm a bpm-relative view scrolls with."""
+        self._timing_map = timing_map
+        if self._follows_first_bpm:
+            scale = 240 / timing_map.get_bpm_changes()[0][1]
+            if self._bpm_relative and scale != self._scale:
+                rows = np.arange(len(all_nodes))
+            self._scale = scale
+
+        trails = all_nodes.trails[rows]
+        starts, ends = self._get_positions(all_nodes, rows)
+        for trail in np.unique(trails).tolist():
+            in_trail = trails == trail
+            positions = np.searchsorted(self._rows[trail - 1], rows[in_trail])
+            self._starts[trail - 1][positions] = starts[in_trail]
+            self._ends[trail - 1][positions] = ends[in_trail]
+            update_running_maximum(self._reaches[trail - 1], self._ends[trail - 1], int(positions[0]))
+
+    def _get_positions(self, all_nodes: NodeTable, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """To get the scroll positions of the start and of the end of the nodes of the given rows"""
+        if not self._bpm_relative:
+            return all_nodes.start_seconds[rows], all_nodes.end_seconds[rows]
+        starts = self._timing_map.get_whole_notes_of(all_nodes.start_measures[rows], all_nodes.start_beats[rows])
+        ends = self._timing_map.get_whole_notes_of(all_nodes.end_measures[rows], all_nodes.end_beats[rows])
+        return starts * self._scale, ends * self._scale
+
+    def _shift_rows(self, row: int, offset: int) -> None:
+        """Method to add offset to every stored row at or after the given row"""
+        for rows in self._rows:
+            rows[np.searchsorted(rows, row):] += offset
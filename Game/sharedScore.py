@@ -0,0 +1,235 @@
+# This is the sharing of compiled scores between the processes of a host, through shared memory segments
+
+"""A compiled score is published once into a shared memory segment, in the binary chart format
+(see Game.binaryChart), and every worker process attaches to that segment by its name:
+the node columns, the seconds columns and the timing changes of the score are views of the segment,
+read-only and never copied. The memory of a host then grows with the number of distinct charts,
+not with the number of charts times the number of workers.
+
+    # In the process which owns the charts (e.g. the parent of the workers)
+    publisher = SharedScorePublisher()
+    name = publisher.acquire(chart_key, lambda: read_chart_file(path))
+    ...                                          # send name to the workers
+    publisher.release(chart_key)                 # the segment is removed with its last reference
+
+    # In a worker
+    attachments = SharedScoreAttachments()
+    score = attachments.acquire(name)            # attached once per process, however many games use it
+    ...
+    del score
+    attachments.release(name)                    # detached with its last reference
+
+Only the hit flags of the nodes belong to every attached score, they are not shared.
+Editing an attached score copies the columns it changes (see pianoGameMusicScore._retime_from),
+the segment itself is never written to by a worker.
+"""
+
+import io
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Type
+from Game.binaryChart import load_binary_chart, write_binary_chart_to
+from Game.gameMusicScore import pianoGameMusicScore
+
+
+class SharedScoreError(ValueError):
+    """Raised when a shared score can not be published, attached or released"""
+
+
+
+class SharedScorePublisher():
+    """The owner of the shared memory segments of the compiled scores of a host, one segment per chart key.
+
+    Every acquire of a key counts as one reference to its segment. The score is only compiled and written
+    by the first acquire, and the segment is unlinked by the release of its last reference.
+    Processes still attached to an unlinked segment keep reading it until they detach.
+
+    Example:
+        with SharedScorePublisher() as publisher:
+            name = publisher.acquire('marathon', lambda: read_chart_file('songs/marathon.chart'))
+            executor.map(play, [name] * 8)
+    """
+
+    # ------------- Fields ---------------
+    _segments: Dict[str, SharedMemory]
+    """The segment of every published chart key"""
+
+    _references: Dict[str, int]
+    """The number of references to the segment of every published chart key"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self) -> None:
+        self._segments = {}
+        self._references = {}
+
+
+    # ------------- Methods --------------
+    def __enter__(self) -> "SharedScorePublisher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """The number of segments published at the moment"""
+        return len(self._segments)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._segments
+
+    def acquire(self, key: str, compile_score: Callable[[], pianoGameMusicScore]) -> str:
+        """To take one more reference to the segment of a chart key, published from compile_score()
+        if it is not published yet. Returns the name of the segment, which workers attach to."""
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = _publish_score(compile_score())
+            self._segments[key] = segment
+            self._references[key] = 0
+        self._references[key] += 1
+        return segment.name
+
+    def release(self, key: str) -> None:
+        """To drop one reference to the segment of a chart key, the segment is unlinked with the last one"""
+        if key not in self._segments:
+            raise SharedScoreError(f'no score is published under the key {key!r}')
+        self._references[key] -= 1
+        if self._references[key] == 0:
+            del self._references[key]
+            segment = self._segments.pop(key)
+            segment.close()
+            # A worker sharing the resource tracker of this process unregistered the segment when it attached,
+            # registering it again (a set of names) keeps the unregistering of unlink balanced
+            if os.name == 'posix':
+                resource_tracker.register(segment._name, 'shared_memory')
+            segment.unlink()
+
+    def get_name(self, key: str) -> Optional[str]:
+        """To get the name of the segment of a chart key, None if it is not published"""
+        segment = self._segments.get(key)
+        return None if segment is None else segment.name
+
+    def get_references(self, key: str) -> int:
+        """To get the number of references to the segment of a chart key, 0 if it is not published"""
+        return self._references.get(key, 0)
+
+    def close(self) -> None:
+        """Method to unlink every segment, whatever the number of references left"""
+        for key in list(self._segments):
+            self._references[key] = 1
+            self.release(key)
+
+
+
+class SharedScoreAttachments():
+    """The shared scores attached by one process, one attachment per segment however many users it has.
+
+    Every acquire of a segment name counts as one reference, the segment is attached by the first one
+    and detached by the release of the last one. The score of a segment must not be used after that.
+    A segment whose columns are still referenced somewhere can not be detached yet: it is detached
+    by a later release or by close, once they are dropped.
+    """
+
+    # ------------- Fields ---------------
+    _segments: Dict[str, SharedMemory]
+    """The segment of every attached segment name"""
+
+    _scores: Dict[str, pianoGameMusicScore]
+    """The score built on top of every attached segment"""
+
+    _references: Dict[str, int]
+    """The number of references to every attached segment name"""
+
+    _detaching: List[SharedMemory]
+    """The released segments which could not be detached yet"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self) -> None:
+        self._segments = {}
+        self._scores = {}
+        self._references = {}
+        self._detaching = []
+
+
+    # ------------- Methods --------------
+    def __enter__(self) -> "SharedScoreAttachments":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """The number of segments attached at the moment"""
+        return len(self._segments)
+
+    def acquire(self, name: str, score_class: Optional[Type[pianoGameMusicScore]] = None) -> pianoGameMusicScore:
+        """To take one more reference to a shared score, attached to its segment if it is not attached yet.
+        The score is of the class it was published with, unless another score class is asked for."""
+        if name not in self._segments:
+            segment = _attach_segment(name)
+            try:
+                self._scores[name] = load_binary_chart(segment.buf.toreadonly(), score_class)
+            except ValueError:
+                segment.close()
+                raise
+            self._segments[name] = segment
+            self._references[name] = 0
+        self._references[name] += 1
+        return self._scores[name]
+
+    def release(self, name: str) -> None:
+        """To drop one reference to a shared score, the segment is detached with the last one"""
+        if name not in self._segments:
+            raise SharedScoreError(f'the segment {name!r} is not attached')
+        self._references[name] -= 1
+        if self._references[name] == 0:
+            del self._references[name]
+            del self._scores[name]
+            self._detaching.append(self._segments.pop(name))
+        self._detach()
+
+    def close(self) -> None:
+        """Method to detach every segment, whatever the number of references left.
+        Raises a SharedScoreError if the columns of some scores are still referenced."""
+        for name in list(self._segments):
+            self._references[name] = 1
+            self.release(name)
+        self._detach()
+        if self._detaching:
+            raise SharedScoreError(f'{len(self._detaching)} shared score(s) are still in use')
+
+    def _detach(self) -> None:
+        """Method to detach the released segments whose columns are not referenced any more"""
+        still_used = []
+        for segment in self._detaching:
+            try:
+                segment.close()
+            except BufferError:
+                still_used.append(segment)
+        self._detaching = still_used
+
+
+
+def _publish_score(score: pianoGameMusicScore) -> SharedMemory:
+    """To write a compiled score into a new shared memory segment"""
+    chart = io.BytesIO()
+    write_binary_chart_to(score, chart)
+    data = chart.getbuffer()
+    segment = SharedMemory(create=True, size=max(len(data), 1))
+    segment.buf[:len(data)] = data
+    return segment
+
+
+def _attach_segment(name: str) -> SharedMemory:
+    """To attach to an existing segment, which this process must not unlink when it ends"""
+    try:
+        segment = SharedMemory(name=name)
+    except FileNotFoundError:
+        raise SharedScoreError(f'there is no shared score segment {name!r}') from None
+    # The resource tracker unlinks the segments still registered to it when it stops,
+    # only the publisher may unlink a segment (Python 3.13 adds track=False for this)
+    if os.name == 'posix':
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
@@ -0,0 +1,279 @@
+# This is the persistent index of a library of chart files, which song select reads instead of the charts
+
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from Game.chartAnalytics import DENSITY_WINDOW, get_peak_density
+from Game.chartParser import load_chart
+from Game.nodeTable import NODE_KIND_HOLD
+import numpy as np
+
+
+LIBRARY_SCHEMA_VERSION = 1
+"""Version of the tables of the index (stored as the user_version of the database).
+Increase it whenever the tables or the extracted metadata change, an index of another version is built again."""
+
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'RythmGameProject', 'library.sqlite')
+
+CHART_SUFFIX = '.chart'
+"""The suffix of the chart files found by a scan"""
+
+ORDER_COLUMNS = ('path', 'num_trail', 'num_node', 'num_hold', 'duration', 'min_bpm', 'max_bpm', \
+    'mean_density', 'peak_density')
+"""The columns a query can be sorted by"""
+
+_METADATA_COLUMNS = ('path', 'size', 'mtime_ns', 'content_hash', 'error', 'num_trail', 'num_node', 'num_hold', \
+    'duration', 'min_bpm', 'max_bpm', 'num_bpm_change', 'meters', 'mean_density', 'peak_density')
+
+_SCHEMA = f"""
+CREATE TABLE charts (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    error TEXT,
+    num_trail INTEGER,
+    num_node INTEGER,
+    num_hold INTEGER,
+    duration REAL,
+    min_bpm REAL,
+    max_bpm REAL,
+    num_bpm_change INTEGER,
+    meters TEXT,
+    mean_density REAL,
+    peak_density REAL
+);
+CREATE INDEX charts_by_duration ON charts (duration);
+CREATE INDEX charts_by_trail ON charts (num_trail, duration);
+CREATE INDEX charts_by_bpm ON charts (max_bpm);
+CREATE INDEX charts_by_density ON charts (peak_density);
+PRAGMA user_version = {LIBRARY_SCHEMA_VERSION};
+"""
+
+
+class ChartMetadata(NamedTuple):
+    """What the index knows about one chart file, every field after error is None for a chart that can not be read"""
+    path: str
+    """Absolute path of the chart file"""
+    size: int
+    mtime_ns: int
+    content_hash: str
+    """sha256 of the content of the file"""
+    error: Optional[str]
+    """Why the chart could not be read, None for a readable chart"""
+    num_trail: Optional[int]
+    num_node: Optional[int]
+    num_hold: Optional[int]
+    duration: Optional[float]
+    """Time (in seconds) at which the last node ends"""
+    min_bpm: Optional[float]
+    max_bpm: Optional[float]
+    num_bpm_change: Optional[int]
+    meters: Optional[str]
+    """Every meter change, as 'measure:num_beats/beat_unit' separated by spaces"""
+    mean_density: Optional[float]
+    """Nodes per second over the whole chart"""
+    peak_density: Optional[float]
+    """Largest number of nodes starting in a window of DENSITY_WINDOW seconds, per second"""
+
+
+
+class ScanReport(NamedTuple):
+    """The number of chart files of every outcome of a scan"""
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    """Files with the same size and modification time, or with the same content as when they were indexed"""
+    failed: int
+    """Files added or updated which can not be read as a chart, they are indexed with their error"""
+
+
+
+class SongLibrary():
+    """An SQLite index of the chart files under some directories, one row of metadata per chart.
+
+    A scan only reads the files which changed since the last scan:
+        - same size and modification time: skipped without being opened
+        - otherwise the content is hashed, and a file with the same content as before is only stamped again
+        - every other file is parsed, on a pool of processes, and its metadata written in one transaction
+    Files which disappeared from a scanned directory are removed from the index.
+
+    Example:
+        with SongLibrary() as library:
+            library.scan('songs')
+            for chart in library.query(num_trail=4, max_duration=180.0, order_by='peak_density'):
+                ...
+    """
+
+    # ------------- Fields ---------------
+    _connection: sqlite3.Connection
+
+
+    # ----------- Constructor ------------
+    def __init__(self, database_path: str = DEFAULT_LIBRARY_PATH) -> None:
+        if database_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+        self._connection = sqlite3.connect(database_path)
+        version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+        if version != LIBRARY_SCHEMA_VERSION:
+            # An index of another version is only a cache of the charts, it is built again
+            with self._connection:
+                self._connection.execute('DROP TABLE IF EXISTS charts')
+            self._connection.executescript(_SCHEMA)
+
+
+    # ------------- Methods --------------
+    def __enter__(self) -> "SongLibrary":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM charts').fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def scan(self, root: str, max_workers: Optional[int] = None, chunksize: int = 8) -> ScanReport:
+        """To bring the index of the chart files under a directory up to date, see the class description.
+        The charts are parsed over max_workers processes (all cores by default, 1 parses in this process)."""
+        root = os.path.abspath(root)
+        known = {row[0]: row[1:] for row in self._connection.execute( \
+            'SELECT path, size, mtime_ns, content_hash FROM charts WHERE substr(path, 1, ?) = ?', \
+            (len(root) + 1, os.path.join(root, '')))}
+
+        tasks: List[Tuple[str, int, int, Optional[str]]] = []
+        unchanged = 0
+        found = set()
+        for path, size, mtime_ns in find_chart_files(root):
+            found.add(path)
+            previous = known.get(path)
+            if previous is not None and previous[0] == size and previous[1] == mtime_ns:
+                unchanged += 1
+                continue
+            tasks.append((path, size, mtime_ns, None if previous is None else previous[2]))
+
+        added = updated = failed = 0
+        removed = [(path,) for path in known if path not in found]
+        with self._connection:
+            for task, metadata in zip(tasks, _map_tasks(tasks, max_workers, chunksize)):
+                if metadata is None:
+                    # Same content, only the size and modification time are stamped again
+                    unchanged += 1
+                    self._connection.execute('UPDATE charts SET size = ?, mtime_ns = ? WHERE path = ?', \
+                        (task[1], task[2], task[0]))
+                    continue
+                if task[3] is None:
+                    added += 1
+                else:
+                    updated += 1
+                if metadata.error is not None:
+                    failed += 1
+                self._connection.execute(f'INSERT OR REPLACE INTO charts ({", ".join(_METADATA_COLUMNS)}) ' \
+                    f'VALUES ({", ".join("?" * len(_METADATA_COLUMNS))})', metadata)
+            self._connection.executemany('DELETE FROM charts WHERE path = ?', removed)
+        return ScanReport(added, updated, len(removed), unchanged, failed)
+
+    def get(self, path: str) -> Optional[ChartMetadata]:
+        """To get the metadata of a chart file, None if it is not indexed"""
+        row = self._connection.execute(f'SELECT {", ".join(_METADATA_COLUMNS)} FROM charts WHERE path = ?', \
+            (os.path.abspath(path),)).fetchone()
+        return None if row is None else ChartMetadata(*row)
+
+    def query(self, num_trail: Optional[int] = None, min_duration: Optional[float] = None, \
+        max_duration: Optional[float] = None, min_bpm: Optional[float] = None, max_bpm: Optional[float] = None, \
+        max_peak_density: Optional[float] = None, order_by: str = 'path', descending: bool = False, \
+        limit: Optional[int] = None) -> List[ChartMetadata]:
+        """To find the readable charts matching every given filter, sorted by one of ORDER_COLUMNS.
+        The bpm filters keep the charts whose whole bpm range is inside [min_bpm, max_bpm]."""
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f'charts can only be sorted by one of {", ".join(ORDER_COLUMNS)}')
+        conditions = ['error IS NULL']
+        parameters: list = []
+        for condition, value in (('num_trail = ?', num_trail), ('duration >= ?', min_duration), \
+            ('duration <= ?', max_duration), ('min_bpm >= ?', min_bpm), ('max_bpm <= ?', max_bpm), \
+            ('peak_density <= ?', max_peak_density)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        statement = f'SELECT {", ".join(_METADATA_COLUMNS)} FROM charts WHERE {" AND ".join(conditions)} ' \
+            f'ORDER BY {order_by} {"DESC" if descending else "ASC"}, path'
+        if limit is not None:
+            statement += ' LIMIT ?'
+            parameters.append(limit)
+        return [ChartMetadata(*row) for row in self._connection.execute(statement, parameters)]
+
+    def get_failed(self) -> List[ChartMetadata]:
+        """To get the indexed chart files which can not be read, with their error"""
+        return [ChartMetadata(*row) for row in self._connection.execute( \
+            f'SELECT {", ".join(_METADATA_COLUMNS)} FROM charts WHERE error IS NOT NULL ORDER BY path')]
+
+
+
+def extract_metadata(path: str, size: int, mtime_ns: int, source: bytes) -> ChartMetadata:
+    """To read the metadata of a chart from its content.
+    Only the timing map and the seconds columns of the score are compiled, nothing else.
+    Whatever goes wrong is indexed as the error of the chart, it never stops a scan."""
+    content_hash = hashlib.sha256(source).hexdigest()
+    try:
+        score = load_chart(source.decode('utf-8').splitlines())
+        timing_map = score.retrieve_timing_map()
+        all_nodes = score.retrieve_all_nodes()
+        num_node = len(all_nodes)
+        duration = score.get_duration()
+        bpms = [bpm for _, bpm in timing_map.get_bpm_changes()]
+        meters = ' '.join(f'{num_measure}:{mt.get_num_beats()}/{mt.get_beat_unit()}' \
+            for num_measure, mt in timing_map.get_meter_changes())
+        return ChartMetadata(path, size, mtime_ns, content_hash, None, score.get_num_trail(), num_node, \
+            int(np.count_nonzero(all_nodes.kinds == NODE_KIND_HOLD)), duration, min(bpms), max(bpms), len(bpms), \
+            meters, num_node / duration if duration > 0 else 0.0, get_peak_density(all_nodes.start_seconds))
+    except Exception as error:
+        return ChartMetadata(path, size, mtime_ns, content_hash, str(error), *([None] * 10))
+
+
+
+def find_chart_files(root: str) -> Iterator[Tuple[str, int, int]]:
+    """To find every chart file under a directory, with its size and modification time"""
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if not file_name.endswith(CHART_SUFFIX):
+                continue
+            path = os.path.join(directory, file_name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            yield path, status.st_size, status.st_mtime_ns
+
+
+def _map_tasks(tasks: List[Tuple[str, int, int, Optional[str]]], max_workers: Optional[int], \
+    chunksize: int) -> Iterator[Optional[ChartMetadata]]:
+    """To index the files of a scan, in order, in this process or over a process pool"""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers <= 1 or len(tasks) <= 1:
+        return map(_index_chart, tasks)
+    return _map_in_pool(tasks, max_workers, chunksize)
+
+
+def _map_in_pool(tasks: List[Tuple[str, int, int, Optional[str]]], max_workers: int, \
+    chunksize: int) -> Iterator[Optional[ChartMetadata]]:
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        yield from executor.map(_index_chart, tasks, chunksize=chunksize)
+
+
+def _index_chart(task: Tuple[str, int, int, Optional[str]]) -> Optional[ChartMetadata]:
+    """To read the metadata of a changed file, None when its content is the same as when it was indexed"""
+    path, size, mtime_ns, previous_hash = task
+    try:
+        with open(path, 'rb') as chart_file:
+            source = chart_file.read()
+    except OSError as error:
+        return ChartMetadata(path, size, mtime_ns, '', str(error), *([None] * 10))
+    if previous_hash is not None and hashlib.sha256(source).hexdigest() == previous_hash:
+        return None
+    return extract_metadata(path, size, mtime_ns, source)
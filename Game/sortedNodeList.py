@@ -0,0 +1,189 @@
+# This is the sorted container for nodes, ordered by their starting time and then their trail
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from Game.node import ANode
+
+
+NodeSortKey = Tuple[int, float, int]
+"""Represents the sort key of a node: (measure of the starting time, beat of the starting time, initial trail)"""
+
+
+def node_sort_key(node: ANode) -> NodeSortKey:
+    """To get the sort key of a node, nodes starting at the same time are ordered by their trail"""
+    num_measure, num_beat = node.get_start_time().get_time_in_measure()
+    return (num_measure, num_beat, node.get_init_trail())
+
+
+class SortedNodeList():
+    """A list of nodes which is always sorted by node_sort_key.
+
+    Scores use it to sort the nodes given to them in bulk (see build_sorted_node_table), then edit their sorted
+    nodes through their node table (see NodeTable.insert_row), whose columns every other part of the game reads.
+    Code which keeps ANode objects, e.g. while a chart is being built, adds and removes them one at a time.
+
+    The nodes are kept in a list of small sorted chunks, together with the largest key of every chunk:
+        - bulk construction sorts once, O(n log n)
+        - add / remove find the chunk with a binary search over the chunk maxima, O(log n),
+          then insert into or delete from a chunk of at most 2 * LOAD nodes
+        - iteration walks the chunks in order, O(n)
+
+    Example:
+        maxes:  (3, 0.0, 2)          (7, 2.0, 1)
+        chunks: [n1, n2, n3, n4]     [n5, n6, n7]
+    """
+
+    LOAD: int = 512
+    """The usual size of a chunk, a chunk is split in two once it reaches twice this size"""
+
+    # ------------- Fields ---------------
+    _keys: List[List[NodeSortKey]]
+    """The sort keys of every chunk"""
+
+    _nodes: List[List[ANode]]
+    """The nodes of every chunk, in the same order as their keys"""
+
+    _maxes: List[NodeSortKey]
+    """The largest key of every chunk"""
+
+    _len: int
+    """The total number of nodes"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, all_nodes: Iterable[ANode] = ()) -> None:
+        self._keys = []
+        self._nodes = []
+        self._maxes = []
+        self._len = 0
+        self.update(all_nodes)
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[ANode]:
+        for chunk in self._nodes:
+            yield from chunk
+
+    def __getitem__(self, index: int) -> ANode:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('sorted node list index out of range')
+        for chunk in self._nodes:
+            if index < len(chunk):
+                return chunk[index]
+            index -= len(chunk)
+
+    def __contains__(self, node: Any) -> bool:
+        if not isinstance(node, ANode):
+            return False
+        return self._locate(node) is not None
+
+    def update(self, all_nodes: Iterable[ANode]) -> None:
+        """To add many nodes at once, by sorting everything again in O(n log n)"""
+        new_pairs = [(node_sort_key(node), node) for node in all_nodes]
+        if len(new_pairs) == 0:
+            return
+        pairs = list(zip((key for chunk in self._keys for key in chunk), self))
+        pairs.extend(new_pairs)
+        pairs.sort(key=lambda pair: pair[0])
+
+        self._keys = [[key for key, _ in pairs[i:i + self.LOAD]] for i in range(0, len(pairs), self.LOAD)]
+        self._nodes = [[node for _, node in pairs[i:i + self.LOAD]] for i in range(0, len(pairs), self.LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._keys]
+        self._len = len(pairs)
+
+    def add(self, node: ANode) -> None:
+        """To insert a node at its sorted position, after the nodes with the same key"""
+        key = node_sort_key(node)
+        if len(self._maxes) == 0:
+            self._keys.append([key])
+            self._nodes.append([node])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        keys = self._keys[i]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        self._nodes[i].insert(position, node)
+        self._maxes[i] = keys[-1]
+        self._len += 1
+
+        if len(keys) >= 2 * self.LOAD:
+            self._split(i)
+
+    def remove(self, node: ANode) -> None:
+        """To remove a node, raises ValueError if it is not in this list"""
+        location = self._locate(node)
+        if location is None:
+            raise ValueError('node is not in the sorted node list')
+        i, position = location
+
+        del self._keys[i][position]
+        del self._nodes[i][position]
+        self._len -= 1
+        if len(self._keys[i]) == 0:
+            del self._keys[i]
+            del self._nodes[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = self._keys[i][-1]
+
+    def index(self, node: ANode) -> int:
+        """To get the position of a node in this list, raises ValueError if it is not in this list"""
+        location = self._locate(node)
+        if location is None:
+            raise ValueError('node is not in the sorted node list')
+        i, position = location
+        return sum(len(chunk) for chunk in self._keys[:i]) + position
+
+    def irange(self, min_key: NodeSortKey) -> Iterator[ANode]:
+        """To iterate, in order, over the nodes whose key is not smaller than the given key"""
+        i = bisect_left(self._maxes, min_key)
+        if i == len(self._maxes):
+            return
+        yield from self._nodes[i][bisect_left(self._keys[i], min_key):]
+        for chunk in self._nodes[i + 1:]:
+            yield from chunk
+
+    def _locate(self, node: ANode) -> Optional[Tuple[int, int]]:
+        """To find the (chunk, position) of a node, or None if it is not in this list.
+        The same object is preferred, a different object describing the same node is accepted otherwise."""
+        key = node_sort_key(node)
+        location = self._scan(key, lambda candidate: candidate is node)
+        if location is None:
+            location = self._scan(key, lambda candidate: candidate == node)
+        return location
+
+    def _scan(self, key: NodeSortKey, matches: Callable[[ANode], bool]) -> Optional[Tuple[int, int]]:
+        """To find the (chunk, position) of the first node with the given key that matches"""
+        i = bisect_left(self._maxes, key)
+        while i < len(self._maxes):
+            keys = self._keys[i]
+            position = bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key:
+                if matches(self._nodes[i][position]):
+                    return (i, position)
+                position += 1
+            # Nodes with the same key may continue in the next chunk
+            if position < len(keys):
+                return None
+            i += 1
+        return None
+
+    def _split(self, i: int) -> None:
+        """To split the i-th chunk into two halves"""
+        half = len(self._keys[i]) // 2
+        self._keys.insert(i + 1, self._keys[i][half:])
+        self._nodes.insert(i + 1, self._nodes[i][half:])
+        del self._keys[i][half:]
+        del self._nodes[i][half:]
+        self._maxes[i] = self._keys[i][-1]
+        self._maxes.insert(i + 1, self._keys[i + 1][-1])
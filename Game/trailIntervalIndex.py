@@ -0,0 +1,394 @@
+# This is the per-trail interval index of a score, used to find the nodes which are active in a time window
+
+from typing import Dict, List
+from Game.nodeTable import NODE_KIND_HOLD, NodeTable
+import numpy as np
+
+
+class NodeIntervalTree():
+    """A static centered interval tree over the [start, end] seconds of the nodes of one trail.
+
+    Every tree node has a center point and stores the intervals which contain that center,
+    sorted once by their start (ascending) and once by their end (descending).
+    Intervals completely before the center go to the left subtree, completely after it to the right subtree.
+
+    A stabbing query at t walks one path from the root (O(log n)) and, at every tree node on the path,
+    reports a prefix of one of the two sorted lists (O(k)), so it costs O(log n + k).
+    Long hold nodes are stored once, in the highest tree node whose center they contain,
+    so a hold that started long ago is still found by a query made now.
+    Subtrees of at most LEAF_SIZE intervals are kept as leaves and checked with one vectorized comparison.
+
+    Every interval has an id, given by the user of the tree, which is what a stabbing query reports.
+    An interval is inserted or removed by walking the same path (O(log n) tree nodes), only the tree node
+    which stores it is changed. A leaf which grows past twice LEAF_SIZE intervals is built again as a subtree.
+    A change of the times from some time on, which keeps their order, only builds again the subtree
+    of the first tree node of the right path whose center is not before that time.
+    The tree nodes left unreachable by these edits are dropped once they outnumber the others.
+    """
+
+    LEAF_SIZE: int = 32
+    """The largest number of intervals kept in a leaf"""
+
+    # ------------- Fields ---------------
+    _root: int
+    """Position of the root tree node, -1 when the tree is empty"""
+
+    _centers: List[float]
+    """Center point of every tree node"""
+
+    _lefts: List[int]
+    """Position of the left child of every tree node, -1 if there is none"""
+
+    _rights: List[int]
+    """Position of the right child of every tree node, -1 if there is none"""
+
+    _starts_ascending: List[np.ndarray]
+    """Starts of the intervals stored in every tree node, ascending"""
+
+    _ids_by_start: List[np.ndarray]
+    """Ids of the intervals stored in every tree node, in the order of _starts_ascending"""
+
+    _negative_ends_ascending: List[np.ndarray]
+    """Negated ends of the intervals stored in every tree node, ascending (i.e. the ends descending)"""
+
+    _ids_by_end: List[np.ndarray]
+    """Ids of the intervals stored in every tree node, in the order of _negative_ends_ascending"""
+
+    _is_leaf: List[bool]
+    """Whether every tree node is a leaf, a leaf stores all intervals of its subtree"""
+
+    _num_interval: int
+    """Number of intervals stored in the tree"""
+
+    _num_unreachable: int
+    """Number of tree nodes left unreachable by the edits of the tree"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray) -> None:
+        self._num_interval = len(ids)
+        self._build_tree(np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64), \
+            np.asarray(ids, dtype=np.int64))
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        return self._num_interval
+
+    def stab(self, t: float) -> np.ndarray:
+        """To get the ids of all intervals with start <= t <= end, in no particular order"""
+        found = []
+        i = self._root
+        while i != -1:
+            if self._is_leaf[i]:
+                starts = self._starts_ascending[i]
+                found.append(self._ids_by_start[i][(starts <= t) & (-self._negative_ends_ascending[i] >= t)])
+                break
+            center = self._centers[i]
+            if t < center:
+                num_found = np.searchsorted(self._starts_ascending[i], t, side='right')
+                found.append(self._ids_by_start[i][:num_found])
+                i = self._lefts[i]
+            elif t > center:
+                num_found = np.searchsorted(self._negative_ends_ascending[i], -t, side='right')
+                found.append(self._ids_by_end[i][:num_found])
+                i = self._rights[i]
+            else:
+                found.append(self._ids_by_start[i])
+                break
+
+        if len(found) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def insert(self, start: float, end: float, interval_id: int) -> None:
+        """Method to add the interval [start, end] with the given id to the tree"""
+        parent, is_left, i = -1, False, self._root
+        while i != -1 and not self._is_leaf[i]:
+            center = self._centers[i]
+            if end < center:
+                parent, is_left, i = i, True, self._lefts[i]
+            elif start > center:
+                parent, is_left, i = i, False, self._rights[i]
+            else:
+                position = np.searchsorted(self._starts_ascending[i], start, side='right')
+                self._starts_ascending[i] = np.insert(self._starts_ascending[i], position, start)
+                self._ids_by_start[i] = np.insert(self._ids_by_start[i], position, interval_id)
+                position = np.searchsorted(self._negative_ends_ascending[i], -end, side='right')
+                self._negative_ends_ascending[i] = np.insert(self._negative_ends_ascending[i], position, -end)
+                self._ids_by_end[i] = np.insert(self._ids_by_end[i], position, interval_id)
+                self._num_interval += 1
+                return
+
+        self._num_interval += 1
+        if i == -1:
+            self._link(parent, is_left, \
+                self._build(np.array([start]), np.array([end]), np.array([interval_id], dtype=np.int64)))
+            return
+        starts = np.append(self._starts_ascending[i], start)
+        ends = np.append(-self._negative_ends_ascending[i], end)
+        ids = np.append(self._ids_by_start[i], interval_id)
+        if len(ids) <= 2 * self.LEAF_SIZE:
+            self._starts_ascending[i] = starts
+            self._negative_ends_ascending[i] = -ends
+            self._ids_by_start[i] = self._ids_by_end[i] = ids
+            return
+        self._num_unreachable += 1
+        self._link(parent, is_left, self._build(starts, ends, ids))
+
+    def remove(self, start: float, end: float, interval_id: int) -> None:
+        """Method to remove the interval with the given id, which must be the [start, end] it was inserted with"""
+        i = self._root
+        while i != -1:
+            if self._is_leaf[i]:
+                kept = self._ids_by_start[i] != interval_id
+                if kept.all():
+                    break
+                self._starts_ascending[i] = self._starts_ascending[i][kept]
+                self._negative_ends_ascending[i] = self._negative_ends_ascending[i][kept]
+                self._ids_by_start[i] = self._ids_by_end[i] = self._ids_by_start[i][kept]
+                self._num_interval -= 1
+                return
+            center = self._centers[i]
+            if end < center:
+                i = self._lefts[i]
+            elif start > center:
+                i = self._rights[i]
+            else:
+                position = self._find_id(self._starts_ascending[i], self._ids_by_start[i], start, interval_id)
+                self._starts_ascending[i] = np.delete(self._starts_ascending[i], position)
+                self._ids_by_start[i] = np.delete(self._ids_by_start[i], position)
+                position = self._find_id(self._negative_ends_ascending[i], self._ids_by_end[i], -end, interval_id)
+                self._negative_ends_ascending[i] = np.delete(self._negative_ends_ascending[i], position)
+                self._ids_by_end[i] = np.delete(self._ids_by_end[i], position)
+                self._num_interval -= 1
+                return
+        raise ValueError(f'interval {interval_id} is not in the interval tree')
+
+    def retime(self, from_second: float, starts: np.ndarray, ends: np.ndarray) -> None:
+        """Method to follow a change of the times of the intervals from from_second on, the times before it
+        staying the same and the order of the times being kept (such as a bpm change).
+        starts and ends are the new times of every interval id."""
+        parent, i = -1, self._root
+        # The intervals of a tree node whose center is before the change start before it, and so does
+        # its whole left subtree: only their ends are written again, which keeps them sorted
+        while i != -1 and not self._is_leaf[i] and self._centers[i] < from_second:
+            self._negative_ends_ascending[i] = -ends[self._ids_by_end[i]]
+            parent, i = i, self._rights[i]
+        if i == -1:
+            return
+
+        ids = self._collect(i)
+        if self._num_unreachable > len(self._centers) // 2:
+            ids = self._collect(self._root)
+            self._build_tree(starts[ids], ends[ids], ids)
+            return
+        self._link(parent, False, self._build(starts[ids], ends[ids], ids))
+
+    def _collect(self, i: int) -> np.ndarray:
+        """To get the ids of the intervals of the subtree of a tree node, which is left unreachable"""
+        found = []
+        pending = [i]
+        while len(pending) > 0:
+            i = pending.pop()
+            self._num_unreachable += 1
+            found.append(self._ids_by_start[i])
+            pending.extend(child for child in (self._lefts[i], self._rights[i]) if child != -1)
+        return np.concatenate(found)
+
+    def _build_tree(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray) -> None:
+        """Method to drop every tree node and build the tree holding the given intervals"""
+        self._centers = []
+        self._lefts = []
+        self._rights = []
+        self._starts_ascending = []
+        self._ids_by_start = []
+        self._negative_ends_ascending = []
+        self._ids_by_end = []
+        self._is_leaf = []
+        self._num_unreachable = 0
+        self._root = self._build(starts, ends, ids)
+
+    @staticmethod
+    def _find_id(keys: np.ndarray, ids: np.ndarray, key: float, interval_id: int) -> int:
+        """To find the position of an id among the ones stored with the given key, keys being ascending"""
+        low = int(np.searchsorted(keys, key, side='left'))
+        high = int(np.searchsorted(keys, key, side='right'))
+        found = np.flatnonzero(ids[low:high] == interval_id)
+        if len(found) == 0:
+            raise ValueError(f'interval {interval_id} is not in the interval tree')
+        return low + int(found[0])
+
+    def _link(self, parent: int, is_left: bool, child: int) -> None:
+        """Method to make child the left or right child of parent, or the root when parent is -1"""
+        if parent == -1:
+            self._root = child
+        elif is_left:
+            self._lefts[parent] = child
+        else:
+            self._rights[parent] = child
+
+    def _build(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray) -> int:
+        """To build the subtree holding the given intervals, returns the position of its root"""
+        if len(ids) == 0:
+            return -1
+
+        i = len(self._centers)
+        if len(ids) <= self.LEAF_SIZE:
+            # A leaf keeps its intervals in one order, starts and ends side by side
+            self._centers.append(np.nan)
+            self._lefts.append(-1)
+            self._rights.append(-1)
+            self._starts_ascending.append(starts)
+            self._ids_by_start.append(ids)
+            self._negative_ends_ascending.append(-ends)
+            self._ids_by_end.append(ids)
+            self._is_leaf.append(True)
+            return i
+
+        # The median midpoint is always contained by the interval it comes from, so every level makes progress
+        midpoints = (starts + ends) / 2
+        center = float(np.partition(midpoints, len(midpoints) // 2)[len(midpoints) // 2])
+
+        before = ends < center
+        after = starts > center
+        containing = ~(before | after)
+
+        self._centers.append(center)
+        self._lefts.append(-1)
+        self._rights.append(-1)
+        self._is_leaf.append(False)
+
+        by_start = np.argsort(starts[containing], kind='stable')
+        self._starts_ascending.append(starts[containing][by_start])
+        self._ids_by_start.append(ids[containing][by_start])
+        by_end = np.argsort(-ends[containing], kind='stable')
+        self._negative_ends_ascending.append(-ends[containing][by_end])
+        self._ids_by_end.append(ids[containing][by_end])
+
+        self._lefts[i] = self._build(starts[before], ends[before], ids[before])
+        self._rights[i] = self._build(starts[after], ends[after], ids[after])
+        return i
+
+
+
+class TrailIntervalIndex():
+    """The interval index of a compiled score: one NodeIntervalTree per trail holding its hold nodes,
+    plus the start-sorted nodes (taps and holds) of every trail.
+
+    Example:
+        trail 1:  [==========]      [=]
+        trail 2:        [=]    [=========]
+                     t0 |---------| t1
+
+        - query_window(1, t0, t1) finds the first hold (started before t0) and nothing else.
+        - query_window(2, t0, t1) finds the tap and the second hold.
+
+    An edit of the score patches the index instead of building it again: inserting or removing a node
+    changes the arrays of its own trail and the tree node which stores it. The trees store an id for every hold,
+    so the rows after the edit, which move by one, are only shifted in the sorted rows and in _hold_rows.
+    """
+
+    # ------------- Fields ---------------
+    _trees: Dict[int, NodeIntervalTree]
+    """The interval tree of the hold nodes of every trail, taps are found by their start alone"""
+
+    _hold_rows: np.ndarray
+    """Row (in the node table) of the hold of every interval id of the trees, -1 for a removed hold"""
+
+    _sorted_starts: Dict[int, np.ndarray]
+    """Starts (in seconds) of the nodes of every trail, ascending"""
+
+    _sorted_rows: Dict[int, np.ndarray]
+    """Rows (in the node table) of the nodes of every trail, in the order of _sorted_starts"""
+
+
+    # ----------- Constructor ------------
+    def __init__(self, all_nodes: NodeTable, num_trail: int) -> None:
+        self._trees = {}
+        self._sorted_starts = {}
+        self._sorted_rows = {}
+
+        starts = all_nodes.start_seconds
+        ends = all_nodes.end_seconds
+        self._hold_rows = np.flatnonzero(all_nodes.kinds == NODE_KIND_HOLD)
+        hold_trails = all_nodes.trails[self._hold_rows]
+        for trail in range(1, num_trail + 1):
+            rows = np.flatnonzero(all_nodes.trails == trail)
+            by_start = np.argsort(starts[rows], kind='stable')
+            self._sorted_rows[trail] = rows[by_start]
+            self._sorted_starts[trail] = starts[rows][by_start]
+            ids = np.flatnonzero(hold_trails == trail)
+            self._trees[trail] = NodeIntervalTree(starts[self._hold_rows[ids]], ends[self._hold_rows[ids]], ids)
+
+
+    # ------------- Methods --------------
+    def query_point(self, trail: int, t: float) -> np.ndarray:
+        """To get the rows of the nodes on the given trail which are active at time t (in seconds), ascending"""
+        return self.query_window(trail, t, t)
+
+    def query_window(self, trail: int, t0: float, t1: float) -> np.ndarray:
+        """To get the rows of the nodes on the given trail which overlap [t0, t1] (in seconds), ascending"""
+        if trail not in self._trees or t1 < t0:
+            return np.empty(0, dtype=np.int64)
+
+        # Holds already active at t0, plus every node starting inside [t0, t1]
+        active_at_t0 = self._hold_rows[self._trees[trail].stab(t0)]
+        sorted_starts = self._sorted_starts[trail]
+        first = np.searchsorted(sorted_starts, t0, side='left')
+        last = np.searchsorted(sorted_starts, t1, side='right')
+        return np.union1d(active_at_t0, self._sorted_rows[trail][first:last])
+
+    def query_window_all_trails(self, t0: float, t1: float) -> Dict[int, np.ndarray]:
+        """To get, for every trail, the rows of the nodes which overlap [t0, t1] (in seconds)"""
+        return {trail: self.query_window(trail, t0, t1) for trail in self._trees}
+
+    def insert_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the insertion of a row into the node table, the table already holds its seconds"""
+        self._shift_rows(row, 1)
+        trail = int(all_nodes.trails[row])
+        start, end = float(all_nodes.start_seconds[row]), float(all_nodes.end_seconds[row])
+        # The rows of a trail are ascending, and so are their starts in a sorted table
+        position = np.searchsorted(self._sorted_rows[trail], row)
+        self._sorted_rows[trail] = np.insert(self._sorted_rows[trail], position, row)
+        self._sorted_starts[trail] = np.insert(self._sorted_starts[trail], position, start)
+        if all_nodes.kinds[row] == NODE_KIND_HOLD:
+            self._trees[trail].insert(start, end, len(self._hold_rows))
+            self._hold_rows = np.append(self._hold_rows, row)
+
+    def delete_row(self, all_nodes: NodeTable, row: int) -> None:
+        """Method to follow the removal of a row from the node table, before the table removes it"""
+        trail = int(all_nodes.trails[row])
+        position = np.searchsorted(self._sorted_rows[trail], row)
+        self._sorted_rows[trail] = np.delete(self._sorted_rows[trail], position)
+        self._sorted_starts[trail] = np.delete(self._sorted_starts[trail], position)
+        if all_nodes.kinds[row] == NODE_KIND_HOLD:
+            interval_id = int(np.flatnonzero(self._hold_rows == row)[0])
+            self._trees[trail].remove(float(all_nodes.start_seconds[row]), float(all_nodes.end_seconds[row]), \
+                interval_id)
+            self._hold_rows[interval_id] = -1
+        self._shift_rows(row, -1)
+
+    def retime(self, all_nodes: NodeTable, rows: np.ndarray, from_second: float) -> None:
+        """Method to follow a change of the timing from from_second on, which moved the seconds of the given rows.
+        The order of the nodes does not change: their starts are written over, and the trees of their holds
+        only build again the subtrees after from_second."""
+        start_seconds, end_seconds = all_nodes.start_seconds, all_nodes.end_seconds
+        trails = all_nodes.trails[rows]
+        for trail in np.unique(trails).tolist():
+            moved = rows[trails == trail]
+            self._sorted_starts[trail][np.searchsorted(self._sorted_rows[trail], moved)] = start_seconds[moved]
+
+        hold_trails = np.unique(trails[all_nodes.kinds[rows] == NODE_KIND_HOLD])
+        if len(hold_trails) == 0:
+            return
+        # The seconds of every interval id, those of the removed holds are never read
+        hold_starts, hold_ends = start_seconds[self._hold_rows], end_seconds[self._hold_rows]
+        for trail in hold_trails.tolist():
+            self._trees[trail].retime(from_second, hold_starts, hold_ends)
+
+    def _shift_rows(self, row: int, offset: int) -> None:
+        """Method to add offset to every stored row at or after the given row"""
+        for rows in self._sorted_rows.values():
+            rows[np.searchsorted(rows, row):] += offset
+        self._hold_rows[self._hold_rows >= row] += offset
@@ -0,0 +1,78 @@
+from contextlib import redirect_stderr
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import TestCase, main, mock
+from Game.batchCompiler import compile_charts, find_jobs, main as compiler_main
+from Game.binaryChart import open_binary_chart
+from Game.chartParser import read_chart_file
+
+chart_text = """trails 3
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 0 0 1
+1 2 3 0 2
+4 1 4 1 3
+"""
+
+
+class TestBatchCompiler(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.songs = os.path.join(self.directory.name, 'songs')
+        self.output = os.path.join(self.directory.name, 'build')
+        os.makedirs(os.path.join(self.songs, 'pack'))
+        self.write(os.path.join('pack', 'song.chart'), chart_text)
+        # A node on beat 4.5 of a 4/4 measure, and a chart which can not be parsed
+        self.write('outside.chart', chart_text + '5 4.5 5 4.5 1\n')
+        self.write('broken.chart', 'trails 2\nbpm 0 0 -1\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.songs, name), 'w') as chart_file:
+            chart_file.write(text)
+
+    def test_compile_directory(self):
+        jobs = find_jobs(self.songs, self.output)
+        progress = []
+        results = compile_charts(jobs, max_workers=1, progress=lambda done, total, result: progress.append(done))
+        self.assertEqual(progress, [1, 2, 3])
+        errors = {os.path.basename(result.source): result.error for result in results}
+        self.assertIn('bpm must be positive', errors['broken.chart'])
+        self.assertIn('line 9: beat 4.5 is past the end of measure 5', errors['outside.chart'])
+        self.assertIsNone(errors['song.chart'])
+
+        compiled = open_binary_chart(os.path.join(self.output, 'pack', 'song.rgcb'))
+        self.assertEqual(compiled, read_chart_file(os.path.join(self.songs, 'pack', 'song.chart')))
+        self.assertFalse(os.path.exists(os.path.join(self.output, 'outside.rgcb')))
+
+    def test_unexpected_error(self):
+        jobs = find_jobs(self.songs, self.output)
+        with mock.patch('Game.batchCompiler.validate_compiled_score', side_effect=RuntimeError('boom')):
+            results = compile_charts(jobs, max_workers=1)
+        errors = {os.path.basename(result.source): result.error for result in results}
+        self.assertEqual(errors['song.chart'], 'RuntimeError: boom')
+        self.assertIn('bpm must be positive', errors['broken.chart'])
+
+    def test_manifest_and_report(self):
+        manifest = os.path.join(self.songs, 'manifest.txt')
+        self.write('manifest.txt', '# release charts\npack/song.chart\n\nbroken.chart\n')
+        report = os.path.join(self.directory.name, 'report.json')
+        errors = StringIO()
+        with redirect_stderr(errors):
+            status = compiler_main([manifest, '--output', self.output, '--workers', '2', '--report', report, '--quiet'])
+        self.assertIn('compiled 1 of 2 charts', errors.getvalue())
+        self.assertEqual(status, 1)
+        with open(report) as report_file:
+            results = json.load(report_file)
+        self.assertEqual([result['error'] is None for result in results], [True, False])
+        self.assertEqual(results[0]['num_node'], 3)
+
+
+if __name__ == "__main__":
+    main()
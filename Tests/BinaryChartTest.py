@@ -0,0 +1,60 @@
+import os
+import struct
+import tempfile
+from io import StringIO
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.binaryChart import BinaryChartError, open_binary_chart, write_binary_chart
+from Game.chartParser import load_chart
+from Game.gameMusicScore import VBPMPianoGameMusicScore
+
+chart_text = """trails 3
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 0 0 1
+1 2 3 0 2
+4 1 4 1 3
+"""
+
+
+class TestBinaryChart(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'chart.rgcb')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        score = load_chart(StringIO(chart_text))
+        write_binary_chart(score, self.path)
+        opened = VBPMPianoGameMusicScore.from_binary_chart(self.path)
+        self.assertEqual(opened, score)
+        self.assertEqual(opened.node_end_seconds.tolist(), score.node_end_seconds.tolist())
+        self.assertEqual(opened.get_nodes_at(2, 5.0).tolist(), [1])
+
+    def test_not_a_chart(self):
+        with open(self.path, 'wb') as chart_file:
+            chart_file.write(b'\0' * 64)
+        self.assertRaises(BinaryChartError, open_binary_chart, self.path)
+
+    def test_unsorted_nodes(self):
+        score = load_chart(StringIO(chart_text))
+        reversed_nodes = score.retrieve_all_nodes().take([2, 1, 0])
+        var_meter = {TimeCodeInMeasures(0, 0.0): meter(4, 4)}
+        var_bpm = {TimeCodeInMeasures(0, 0.0): 120.0, TimeCodeInMeasures(2, 0.0): 60.0}
+        self.assertRaises(ValueError, VBPMPianoGameMusicScore.from_compiled_nodes, reversed_nodes, 3, var_meter, var_bpm)
+
+        # The start measures (header, one meter and two bpm records before them) become 4, 1, 0
+        write_binary_chart(score, self.path)
+        with open(self.path, 'r+b') as chart_file:
+            chart_file.seek(32 + 16 + 2 * 24)
+            chart_file.write(struct.pack('<3q', 4, 1, 0))
+        self.assertRaises(BinaryChartError, open_binary_chart, self.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from unittest import TestCase, main
+from Game.chartAnalytics import analyze_score, get_chord_sizes, get_density_curve, get_hold_coverage, get_jacks, \
+    get_longest_stream, get_peak_density
+from Game.chartParser import load_chart
+import numpy as np
+
+# 120 bpm in 4/4: one beat lasts 0.5 seconds
+chart_text = """trails 4
+meter 0 4/4
+bpm 0 0 120
+nodes
+0 0 0 0 1
+0 0 0 0 2
+0 0.25 0 0.25 3
+0 0.5 0 0.5 4
+0 0.75 0 0.75 1
+1 0 1 0 4
+1 0.25 1 0.25 4
+1 0.5 1 0.5 4
+2 0 3 0 2
+2 2 2 2 3
+"""
+
+
+class TestChartAnalytics(TestCase):
+    def test_density(self):
+        starts = np.array([0.0, 0.1, 0.2, 0.9, 2.0, 5.0])
+        self.assertEqual(get_peak_density(starts), 4.0)
+        self.assertEqual(get_peak_density(starts, 0.5), 6.0)
+        times, densities = get_density_curve(starts, step=1.0)
+        self.assertEqual(times.tolist(), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(densities.tolist(), [4.0, 0.0, 1.0, 0.0, 0.0, 1.0])
+
+    def test_patterns(self):
+        starts = np.array([0.0, 0.0, 0.0, 0.1, 0.2, 0.3, 1.0, 1.1])
+        trails = np.array([1, 2, 3, 4, 1, 2, 2, 2])
+        self.assertEqual(get_chord_sizes(starts).tolist(), [3, 1, 1, 1, 1, 1])
+        self.assertEqual(get_jacks(starts, trails), (2, 2))
+        self.assertEqual(get_longest_stream(starts, trails), 4)
+        # Trail 65537 is not trail 1 (as it is in 16 bits), only the two nodes of trail 1 make a jack
+        self.assertEqual(get_jacks(np.array([0.0, 0.1, 0.2]), np.array([1, 65537, 1])), (1, 2))
+
+    def test_hold_coverage(self):
+        starts = np.array([0.0, 1.0, 1.5, 6.0])
+        ends = np.array([2.0, 3.0, 2.5, 7.0])
+        self.assertEqual(get_hold_coverage(starts, ends, 10.0), 0.4)
+
+    def test_analyze_score(self):
+        analytics = analyze_score(load_chart(chart_text.splitlines()))
+        self.assertEqual((analytics.num_node, analytics.duration), (10, 6.0))
+        self.assertEqual(analytics.trail_loads.tolist(), [0.2, 0.2, 0.2, 0.4])
+        self.assertEqual((analytics.num_chord, analytics.max_chord), (1, 2))
+        self.assertEqual((analytics.num_jack, analytics.max_jack), (2, 3))
+        self.assertEqual(analytics.max_stream, 4)
+        self.assertEqual(analytics.peak_density, 5.0)
+        self.assertAlmostEqual(analytics.hold_coverage, 2.0 / 6.0)
+
+
+if __name__ == "__main__":
+    main()
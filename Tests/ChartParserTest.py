@@ -0,0 +1,75 @@
+from io import StringIO
+from unittest import TestCase, main
+from Game.chartParser import ChartParseError, load_chart, write_chart
+from Game.gameMusicScore import VMVBPianoGameMusicScore
+
+chart_text = """# 4/4 at 120 bpm, then 3/4 from measure 2, bpm drops to 60 at measure 1 beat 2
+trails 4
+meter 0 4/4
+meter 2 3/4
+bpm 0 0 120
+bpm 1 2 60
+nodes
+2 0 2 1 1
+0 1 0 1 2
+"""
+
+
+class TestChartParser(TestCase):
+    def test_load_chart(self):
+        score = load_chart(StringIO(chart_text))
+        self.assertIsInstance(score, VMVBPianoGameMusicScore)
+        self.assertEqual(score.node_start_seconds.tolist(), [0.5, 5.0])
+        self.assertEqual(score.node_end_seconds.tolist(), [0.5, 6.0])
+
+    def test_round_trip(self):
+        score = load_chart(StringIO(chart_text))
+        written = StringIO()
+        write_chart(score, written)
+        self.assertEqual(load_chart(StringIO(written.getvalue())).retrieve_all_nodes(), score.retrieve_all_nodes())
+
+    def test_error_line_number(self):
+        with self.assertRaises(ChartParseError) as raised:
+            load_chart(StringIO(chart_text + "3 0 3 0 5\n"))
+        self.assertEqual(raised.exception.line_number, 10)
+
+    def test_numbers_out_of_range(self):
+        for line in ('99999999999999999999 0 99999999999999999999 0 1', '0 nan 0 nan 1', '0 inf 1 0 1', \
+            '0 0 0 -inf 1'):
+            with self.assertRaises(ChartParseError) as raised:
+                load_chart(StringIO(chart_text + line + '\n'))
+            self.assertEqual(raised.exception.line_number, 10, line)
+        for header in ('trails 99999999999\n', 'trails 4\nbpm 0 nan 120\n', 'trails 4\nbpm 0 0 inf\n', \
+            'trails 4\nmeter 99999999999999999999 4/4\n'):
+            with self.assertRaises(ChartParseError) as raised:
+                load_chart(StringIO(header))
+            self.assertEqual(raised.exception.line_number, header.count('\n'), header)
+
+    def test_beats_off_ticks(self):
+        for line in ('0 0.142857 0 1 1', '0 1 1 0.0001 1'):
+            with self.assertRaises(ChartParseError) as raised:
+                load_chart(StringIO(chart_text + line + '\n'))
+            self.assertEqual(raised.exception.line_number, 10, line)
+        with self.assertRaises(ChartParseError) as raised:
+            load_chart(StringIO('trails 4\nbpm 0 0.3333 120\n'))
+        self.assertEqual(raised.exception.line_number, 2)
+
+    def test_beats_past_their_measure(self):
+        # Beat 6 of a 4/4 measure would start after measure 1 while being written before it
+        for line in ('0 6 0 6 1', '0 1 1 4 1', '2 3 2 3 1'):
+            with self.assertRaises(ChartParseError) as raised:
+                load_chart(StringIO(chart_text + line + '\n'))
+            self.assertEqual(raised.exception.line_number, 10, line)
+        self.assertEqual(len(load_chart(StringIO(chart_text + '1 3.5 2 2.5 1\n')).retrieve_all_nodes()), 3)
+
+        # The meters of the whole header decide, whatever the order of the statements
+        with self.assertRaises(ChartParseError) as raised:
+            load_chart(StringIO('trails 4\nbpm 0 0 120\nbpm 3 3 60\nmeter 0 4/4\nmeter 3 3/4\n'))
+        self.assertEqual(raised.exception.line_number, 3)
+        with self.assertRaises(ChartParseError) as raised:
+            load_chart(StringIO('trails 4\nmeter 0 4/4\nmeter -3 3/4\n'))
+        self.assertEqual(raised.exception.line_number, 3)
+
+
+if __name__ == "__main__":
+    main()
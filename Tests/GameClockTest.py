@@ -0,0 +1,48 @@
+import asyncio
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+from Game.gameClock import EventKind, GameClockScheduler
+from Game.judgement import JudgementWindows
+
+# 120 bpm 4/4: a tap at 2.0 s on trail 1, a hold from 2.0 s to 3.0 s on trail 2
+chart_text = """trails 2
+meter 0 4/4
+bpm 0 0 120
+nodes
+1 0 1 0 1
+1 0 1 2 2
+"""
+
+
+class TestGameClockScheduler(TestCase):
+    def setUp(self):
+        self.score = load_chart(chart_text.splitlines())
+
+    def test_poll_batches_events_of_a_frame(self):
+        scheduler = GameClockScheduler(self.score, lambda now, events: None, lookahead=1.0, \
+            windows=JudgementWindows(good=0.1, miss=0.15))
+        self.assertEqual(len(scheduler), 7)
+        self.assertEqual([(event.kind, event.row) for event in scheduler.poll(1.01)], \
+            [(EventKind.SPAWN, 0), (EventKind.SPAWN, 1)])
+        self.assertEqual(scheduler.poll(1.5), [])
+        self.assertEqual([event.kind for event in scheduler.poll(2.15)], \
+            [EventKind.REACH_LINE, EventKind.REACH_LINE, EventKind.JUDGE_WINDOW_CLOSE, EventKind.JUDGE_WINDOW_CLOSE])
+        self.assertEqual([(event.kind, event.trail) for event in scheduler.poll(10.0)], [(EventKind.HOLD_END, 2)])
+
+    def test_run_follows_audio_clock(self):
+        frames = []
+
+        async def dispatch(now, events):
+            frames.append(events)
+            scheduler.stop()
+
+        # The audio is ahead of the requested start, the clock snaps to it and only the hold end is left
+        scheduler = GameClockScheduler(self.score, dispatch, lookahead=1.0, audio_clock=lambda: 2.9)
+        asyncio.run(asyncio.wait_for(scheduler.run(start_second=1.5), timeout=2.0))
+        self.assertEqual([[event.kind for event in events] for events in frames], \
+            [[EventKind.REACH_LINE, EventKind.REACH_LINE, EventKind.JUDGE_WINDOW_CLOSE, EventKind.JUDGE_WINDOW_CLOSE]])
+        self.assertEqual(scheduler.get_num_pending(), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Benchmarks.SyntheticChart import generate_chart
+from Game.gameMusicScore import VMVBPianoGameMusicScore
+from Game.node import ANode
+import numpy as np
+
+
+def build_score() -> VMVBPianoGameMusicScore:
+    all_nodes = [
+        ANode(TimeCodeInMeasures(2, 0.0), TimeCodeInMeasures(3, 1.0), 2),
+        ANode(TimeCodeInMeasures(0, 1.0), TimeCodeInMeasures(0, 1.0), 1),
+        ANode(TimeCodeInMeasures(1, 2.0), TimeCodeInMeasures(1, 2.0), 1),
+    ]
+    return VMVBPianoGameMusicScore(all_nodes, 2, {TimeCodeInMeasures(0, 0.0): meter(4, 4), \
+        TimeCodeInMeasures(2, 0.0): meter(3, 4)}, {TimeCodeInMeasures(0, 0.0): 120.0})
+
+
+class TestLazyCompilation(TestCase):
+    def test_metadata_compiles_nothing(self):
+        score = build_score()
+        self.assertEqual(score.get_compiled_products(), frozenset())
+        self.assertEqual((score.get_num_trail(), score.get_num_node()), (2, 3))
+        # 4 + 4 + 3 beats, then one beat, at two seconds per measure of 4/4
+        self.assertAlmostEqual(score.get_duration(), 6.0)
+        self.assertEqual(score.get_compiled_products(), frozenset({'timing_map'}))
+
+    def test_products_on_first_use(self):
+        score = build_score()
+        all_nodes = score.retrieve_all_nodes()
+        self.assertEqual(score.get_compiled_products(), frozenset({'sorted_nodes', 'timing_map', 'seconds'}))
+        self.assertEqual(all_nodes.start_measures.tolist(), [0, 1, 2])
+        self.assertEqual(all_nodes.start_seconds.tolist(), [0.5, 3.0, 4.0])
+        self.assertAlmostEqual(score.get_duration(), 6.0)
+
+        self.assertEqual(len(score.retrieve_meter_map()), 2)
+        self.assertEqual(score.retrieve_meter_map().get_beat_at(3), 11)
+
+    def test_timing_change_keeps_sorted_nodes(self):
+        score = build_score()
+        score.compile_all()
+        score.set_timing_changes({TimeCodeInMeasures(0, 0.0): meter(4, 4)}, {TimeCodeInMeasures(0, 0.0): 60.0})
+        self.assertEqual(score.get_compiled_products(), frozenset({'sorted_nodes'}))
+        self.assertEqual(score.node_start_seconds.tolist(), [1.0, 6.0, 8.0])
+        self.assertEqual(score.get_nodes_at(2, 9.0).tolist(), [2])
+
+
+
+class TestEditing(TestCase):
+    def setUp(self):
+        chart = generate_chart(500, seed=3)
+        self.score = VMVBPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.var_meter, chart.var_bpm)
+        self.score.compile_all()
+
+    def assertMatchesRebuild(self, score):
+        rebuilt = VMVBPianoGameMusicScore(list(score.retrieve_all_nodes()), score.get_num_trail(), \
+            score._var_meter, score._var_bpm)
+        self.assertEqual(score, rebuilt)
+        np.testing.assert_allclose(score.node_start_seconds, rebuilt.node_start_seconds)
+        np.testing.assert_allclose(score.node_end_seconds, rebuilt.node_end_seconds)
+
+        # The patched indexes answer like the ones of the rebuilt score
+        rebuilt.compile_all()
+        for t0 in np.linspace(0.0, rebuilt.get_duration(), 23):
+            for trail in range(1, score.get_num_trail() + 1):
+                self.assertEqual(score.get_nodes_in_window(trail, t0, t0 + 0.7).tolist(), \
+                    rebuilt.get_nodes_in_window(trail, t0, t0 + 0.7).tolist())
+            for bpm_relative in (False, True):
+                for visible, expected in zip(score.get_visible_nodes(t0, 300.0, 600.0, bpm_relative), \
+                    rebuilt.get_visible_nodes(t0, 300.0, 600.0, bpm_relative)):
+                    self.assertEqual(visible.rows.tolist(), expected.rows.tolist())
+                    np.testing.assert_allclose(visible.y_starts, expected.y_starts)
+            ticks, expected = score.retrieve_hold_ticks().get_ticks(t0, t0 + 1.0), \
+                rebuilt.retrieve_hold_ticks().get_ticks(t0, t0 + 1.0)
+            self.assertEqual(ticks.rows.tolist(), expected.rows.tolist())
+            np.testing.assert_allclose(ticks.seconds, expected.seconds)
+        self.assertEqual(score.retrieve_hold_ticks().get_num_tick(), rebuilt.retrieve_hold_ticks().get_num_tick())
+
+    def test_node_edits(self):
+        row = self.score.insert_node(ANode(TimeCodeInMeasures(10, 1.5), TimeCodeInMeasures(12, 0.0), 3))
+        self.assertEqual(self.score.retrieve_all_nodes()[row].get_start_time(), TimeCodeInMeasures(10, 1.5))
+        self.assertMatchesRebuild(self.score)
+        self.score.remove_node(0)
+        row = self.score.move_node(5, ANode(TimeCodeInMeasures(30, 0.0), TimeCodeInMeasures(30, 0.0), 1))
+        self.assertEqual(self.score.node_start_seconds[row], self.score.get_time_in_second(TimeCodeInMeasures(30, 0.0)))
+        self.assertEqual(len(self.score.retrieve_all_nodes()), 500)
+        self.assertMatchesRebuild(self.score)
+        self.assertRaises(ValueError, self.score.insert_node, ANode(TimeCodeInMeasures(1, 0.0), TimeCodeInMeasures(1, 0.0), 9))
+
+    def test_edits_patch_the_indexes(self):
+        products = {name: self.score._products[name] for name in self.score.get_compiled_products()}
+        self.score.insert_node(ANode(TimeCodeInMeasures(10, 1.5), TimeCodeInMeasures(12, 0.0), 3))
+        # The first insertion gives the columns spare rows, the next edits move the rows inside them
+        start_seconds = self.score.node_start_seconds
+        self.score.insert_node(ANode(TimeCodeInMeasures(1, 0.5), TimeCodeInMeasures(1, 0.5), 4))
+        self.score.move_node(7, ANode(TimeCodeInMeasures(3, 0.0), TimeCodeInMeasures(4, 2.0), 2))
+        self.score.set_bpm_change(TimeCodeInMeasures(20, 1.0), 200.0)
+        self.score.set_meter_change(15, meter(5, 8))
+        # Only the timing map (one segment per timing change) was built again
+        self.assertEqual(self.score.get_compiled_products(), frozenset(products))
+        for name in ('interval_index', 'scroll_view', 'bpm_scroll_view', 'hold_ticks'):
+            self.assertIs(self.score._products[name], products[name])
+        self.assertTrue(np.shares_memory(start_seconds, self.score.node_start_seconds))
+        self.assertMatchesRebuild(self.score)
+
+    def test_timing_edits_only_move_later_nodes(self):
+        before = self.score.node_start_seconds.copy()
+        self.score.set_bpm_change(TimeCodeInMeasures(20, 1.0), 200.0)
+        row = self.score.retrieve_all_nodes().search_sorted_row(20, 1.0)
+        self.assertEqual(self.score.node_start_seconds[:row].tolist(), before[:row].tolist())
+        self.assertMatchesRebuild(self.score)
+
+        self.score.set_meter_change(15, meter(5, 8))
+        self.score.remove_bpm_change(TimeCodeInMeasures(20, 1.0))
+        self.assertMatchesRebuild(self.score)
+        self.score.remove_meter_change(15)
+        self.assertMatchesRebuild(self.score)
+        self.assertRaises(ValueError, self.score.remove_bpm_change, TimeCodeInMeasures(0, 0.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+import numpy as np
+
+# 120 bpm for two measures (4 seconds), then 60 bpm
+chart_text = """trails 2
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 2 0 1
+0 2 0 2 2
+1 0 3 0 2
+"""
+
+# Measure 1 is in 3/8, so the beats of the hold over it last half as long
+meter_chart_text = """trails 1
+meter 0 4/4
+meter 1 3/8
+meter 2 4/4
+bpm 0 0 60
+nodes
+0 3 2 1 1
+"""
+
+
+class TestHoldTicks(TestCase):
+    def setUp(self):
+        self.score = load_chart(chart_text.splitlines())
+
+    def test_num_ticks(self):
+        hold_ticks = self.score.retrieve_hold_ticks()
+        # 8 beats at 2 ticks per beat, the end of the hold is not a tick
+        self.assertEqual(hold_ticks.get_num_ticks().tolist(), [15, 15])
+        self.assertEqual(hold_ticks.get_num_tick(), 30)
+        self.assertEqual(self.score.retrieve_hold_ticks(4).get_num_tick(), 62)
+
+    def test_ticks_follow_bpm_changes(self):
+        window = self.score.retrieve_hold_ticks().get_ticks(3.5, 6.0)
+        # Both holds tick every 0.25 s until 4 s, then the second one every 0.5 s
+        self.assertEqual(window.seconds.tolist(), [3.5, 3.5, 3.75, 3.75, 4.0, 4.5, 5.0, 5.5])
+        self.assertEqual(window.rows.tolist(), [0, 2, 0, 2, 2, 2, 2, 2])
+        self.assertEqual(window.trails.tolist(), [1, 2, 1, 2, 2, 2, 2, 2])
+
+    def test_windows_cover_every_tick_once(self):
+        hold_ticks = self.score.retrieve_hold_ticks()
+        windows = list(hold_ticks.iter_ticks(window=0.3))
+        self.assertEqual(len(windows), 27)
+        seconds = np.concatenate([window.seconds for window in windows])
+        self.assertEqual(len(seconds), 30)
+        self.assertTrue((np.diff(seconds) >= 0).all())
+        self.assertEqual(len(hold_ticks.get_ticks(8.0, 9.0).rows), 0)
+        self.assertRaises(ValueError, next, hold_ticks.iter_ticks(window=0.0))
+
+    def test_ticks_follow_meter_changes(self):
+        score = load_chart(meter_chart_text.splitlines())
+        window = score.retrieve_hold_ticks().get_ticks(0.0, 10.0)
+        # From beat 3 to beat 8 (measure 2 beat 1), beats last 1 s in 4/4 and 0.5 s in 3/8
+        self.assertEqual(window.seconds.tolist(), [3.5, 4.0, 4.25, 4.5, 4.75, 5.0, 5.25, 5.5, 6.0])
+
+    def test_total_combo(self):
+        # 3 nodes, 2 hold ends and 30 ticks, computed without the seconds columns
+        self.assertEqual(self.score.get_total_combo(), 35)
+        self.assertNotIn('seconds', self.score.get_compiled_products())
+        self.assertEqual(self.score.get_total_combo(1), 5 + 14)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.node import ANode
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.judgement import Judgement, JudgementEngine
+
+meter44 = meter(num_beats=4, beat_unit=4)
+
+# At 120 bpm in 4/4, one beat lasts 0.5 seconds
+tap_nodes = [ANode(TimeCodeInMeasures(0, beat), TimeCodeInMeasures(0, beat), 1) for beat in (0.0, 1.0, 2.0)]
+hold_node = ANode(TimeCodeInMeasures(1, 0.0), TimeCodeInMeasures(2, 0.0), 2)
+
+
+def new_engine() -> JudgementEngine:
+    return JudgementEngine(pianoGameMusicScore(tap_nodes + [hold_node], 2, meter44, 120.0))
+
+
+class TestJudgementEngine(TestCase):
+    def test_timing_windows(self):
+        engine = new_engine()
+        self.assertEqual(engine.key_down(1, 0.01)[0].judgement, Judgement.PERFECT)
+        self.assertEqual(engine.key_down(1, 0.54)[0].judgement, Judgement.GREAT)
+        self.assertEqual(engine.key_down(1, 0.92)[0].judgement, Judgement.GOOD)
+        self.assertEqual(engine.get_combo(), 3)
+
+    def test_auto_miss(self):
+        engine = new_engine()
+        results = engine.key_down(1, 1.0)
+        self.assertEqual([result.judgement for result in results], [Judgement.MISS, Judgement.MISS, Judgement.PERFECT])
+        self.assertEqual(engine.get_combo(), 1)
+
+    def test_hold_release(self):
+        engine = new_engine()
+        engine.key_down(2, 2.0)
+        early = engine.key_up(2, 3.0)
+        self.assertEqual((early[-1].judgement, early[-1].is_release), (Judgement.MISS, True))
+
+        engine = new_engine()
+        engine.key_down(2, 2.0)
+        completed = engine.update(4.0)
+        self.assertEqual([result.judgement for result in completed if result.trail == 2], [Judgement.PERFECT])
+
+    def test_hold_ticks(self):
+        # The hold lasts 4 beats, so it has 7 ticks every 0.25 s from 2.25 s
+        engine = new_engine()
+        engine.key_down(2, 2.0)
+        self.assertEqual(engine.key_up(2, 3.0)[-1].judgement, Judgement.MISS)
+        # The ticks up to 3.0 s were reached before the release, the ones left are lost
+        self.assertEqual((engine.get_combo(), engine.get_max_combo()), (0, 1 + 4))
+
+        # A release inside the windows gets the ticks left
+        engine = new_engine()
+        engine.key_down(2, 2.0)
+        self.assertEqual(engine.key_up(2, 3.95)[-1].judgement, Judgement.GREAT)
+        self.assertEqual(engine.get_combo(), 1 + 7 + 1)
+        self.assertEqual(sum(engine.get_counts().values()), 2)
+
+
+if __name__ == "__main__":
+    main()
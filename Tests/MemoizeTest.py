@@ -0,0 +1,67 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.Util.UtilityFunctions import differenceBetweenTimeInMeasure
+from Util.Memoize import LRUCache, memoize
+
+
+class Clock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(TestCase):
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b', None), None)
+        self.assertEqual(cache.get('a'), 1)
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.evictions, info.size), (2, 1, 1, 2))
+
+    def test_ttl(self):
+        clock = Clock()
+        cache = LRUCache(maxsize=4, ttl=1.0, clock=clock)
+        cache.put('a', 1)
+        clock.now = 0.5
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 1.5
+        self.assertEqual(cache.get('a', None), None)
+        self.assertEqual(cache.info().expirations, 1)
+
+
+class TestMemoize(TestCase):
+    def test_function(self):
+        calls = []
+
+        @memoize(maxsize=8)
+        def double(x):
+            calls.append(x)
+            return 2 * x
+
+        self.assertEqual([double(1), double(1), double(2)], [2, 2, 4])
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(double.cache_info().hits, 1)
+
+    def test_unhashable_arguments_are_not_cached(self):
+        @memoize
+        def total(values):
+            return sum(values)
+
+        self.assertEqual(total([1, 2]), 3)
+        self.assertEqual(total.cache_info().uncacheable, 1)
+
+    def test_difference_between_time_in_measure(self):
+        difference = differenceBetweenTimeInMeasure(TimeCodeInMeasures(1, 3.0), TimeCodeInMeasures(3, 1.0), meter(4, 4))
+        self.assertEqual(difference, TimeCodeInMeasures(1, 2.0))
+        self.assertEqual(hash(meter(3, 4)), hash(meter(3, 4)))
+
+
+if __name__ == "__main__":
+    main()
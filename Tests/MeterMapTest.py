@@ -0,0 +1,40 @@
+from unittest import TestCase, main
+from DataStructure.MeterMap import MeterMap
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+import numpy as np
+
+var_meter = {
+    TimeCodeInMeasures(0, 0.0): meter(4, 4),
+    TimeCodeInMeasures(4, 0.0): meter(2, 4),
+    TimeCodeInMeasures(6, 0.0): meter(3, 4),
+    TimeCodeInMeasures(9, 0.0): meter(4, 4),
+}
+
+
+class TestMeterMap(TestCase):
+    def test_lookups(self):
+        meter_map = MeterMap(var_meter)
+        self.assertEqual(len(meter_map), 4)
+        self.assertEqual(meter_map.get_meter_at(5), meter(2, 4))
+        self.assertEqual(meter_map.get_meter_at(100), meter(4, 4))
+        self.assertEqual([meter_map.get_beat_at(m) for m in (0, 4, 6, 7, 9, 10)], [0, 16, 20, 23, 29, 33])
+        self.assertEqual(meter_map.get_beats_of(np.array([0, 7, 10])).tolist(), [0, 23, 33])
+        self.assertEqual(meter_map.get_measure_at_beat(24.5), (7, 1.5))
+
+    def test_marathon_chart_stays_small(self):
+        meter_map = MeterMap({TimeCodeInMeasures(0, 0.0): meter(4, 4), TimeCodeInMeasures(2, 0.0): meter(4, 4), \
+            TimeCodeInMeasures(1_000_000, 0.0): meter(3, 4)})
+        self.assertEqual(len(meter_map), 2)
+        self.assertEqual(meter_map.get_beat_at(1_000_005), 4_000_015)
+        self.assertEqual(meter_map, MeterMap({TimeCodeInMeasures(0, 0.0): meter(4, 4), \
+            TimeCodeInMeasures(1_000_000, 0.0): meter(3, 4)}))
+
+    def test_illegal_changes(self):
+        self.assertRaises(ValueError, MeterMap, {TimeCodeInMeasures(1, 0.0): meter(4, 4)})
+        self.assertRaises(ValueError, MeterMap, {TimeCodeInMeasures(0, 0.0): meter(4, 4), \
+            TimeCodeInMeasures(2, 1.0): meter(3, 4)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+from Util.Metrics import METRICS, MetricsRegistry
+
+chart_text = """trails 2
+meter 0 4/4
+meter 1 3/4
+bpm 0 0 120
+nodes
+0 1 0 1 1
+1 0 1 2 2
+"""
+
+
+class TestMetricsRegistry(TestCase):
+    def test_counter_and_histogram(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.counter('events_total', 'Events', kind='a').inc(3)
+        histogram = registry.histogram('latency_seconds', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+        self.assertEqual(registry.get('events_total', kind='a'), 3)
+        self.assertEqual(registry.get('latency_seconds')['buckets'], [(0.1, 1), (1.0, 2), (float('inf'), 3)])
+
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE events_total counter', text)
+        self.assertIn('events_total{kind="a"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+        self.assertEqual(json.loads(registry.to_json())['latency_seconds']['values'][0]['value']['count'], 3)
+
+    def test_disabled_records_nothing(self):
+        registry = MetricsRegistry()
+        with registry.time('phase_seconds'):
+            pass
+        self.assertIsNone(registry.get('phase_seconds'))
+
+
+class TestScoreInstrumentation(TestCase):
+    def setUp(self):
+        METRICS.reset()
+        METRICS.enable()
+
+    def tearDown(self):
+        METRICS.disable()
+        METRICS.reset()
+
+    def test_construction_phases(self):
+        score = load_chart(chart_text.splitlines())
+        self.assertEqual(METRICS.get('score_construction_seconds', phase='validation')['count'], 1)
+        self.assertIsNone(METRICS.get('score_construction_seconds', phase='seconds'))
+
+        score.compile_all()
+        for phase in ('sorted_nodes', 'timing_map', 'seconds', 'interval_index'):
+            self.assertEqual(METRICS.get('score_construction_seconds', phase=phase)['count'], 1, phase)
+        score.get_nodes_in_window(1, 0.0, 1.0)
+        self.assertEqual(METRICS.get('window_query_seconds')['count'], 1)
+        self.assertEqual(METRICS.get('time_conversions_total'), 4)
+
+
+if __name__ == "__main__":
+    main()
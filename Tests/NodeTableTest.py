@@ -0,0 +1,73 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.node import ANode
+from Game.nodeTable import NODE_KIND_HOLD, NODE_KIND_TAP, build_node_table
+from Game.gameMusicScore import pianoGameMusicScore
+import numpy as np
+
+meter44 = meter(num_beats=4, beat_unit=4)
+
+tap_node = ANode(TimeCodeInMeasures(0, 1.0), TimeCodeInMeasures(0, 1.0), 2)
+hold_node = ANode(TimeCodeInMeasures(1, 0.0), TimeCodeInMeasures(2, 0.0), 1)
+
+
+class TestNodeTable(TestCase):
+    def test_columns(self):
+        table = build_node_table([tap_node, hold_node])
+        self.assertEqual(table.start_measures.tolist(), [0, 1])
+        self.assertEqual(table.end_beats.tolist(), [1.0, 0.0])
+        self.assertEqual(table.trails.tolist(), [2, 1])
+        self.assertEqual(table.kinds.tolist(), [NODE_KIND_TAP, NODE_KIND_HOLD])
+
+    def test_view_behaves_like_node(self):
+        table = build_node_table([tap_node, hold_node])
+        view = table[1]
+        self.assertIsInstance(view, ANode)
+        self.assertEqual(view, hold_node)
+        self.assertEqual(view.get_start_time(), TimeCodeInMeasures(1, 0.0))
+        view.got_hit()
+        self.assertEqual(table.hits.tolist(), [False, True])
+
+    def test_score_seconds_columns(self):
+        score = pianoGameMusicScore([hold_node, tap_node], 4, meter44, 120.0)
+        self.assertEqual(score.node_start_seconds.tolist(), [0.5, 2.0])
+        self.assertEqual(score.node_end_seconds.tolist(), [0.5, 4.0])
+        self.assertEqual(score.retrieve_all_node_end_time()[hold_node], 4.0)
+
+    def test_scores_do_not_share_a_table(self):
+        table = build_node_table([hold_node])
+        first = pianoGameMusicScore(table, 4, meter44, 120.0)
+        second = pianoGameMusicScore(table, 4, meter44, 60.0)
+        second.compile_all()
+        first.compile_all()
+        second.compile_all()
+        self.assertEqual(first.node_start_seconds.tolist(), [2.0])
+        self.assertEqual(first.get_nodes_at(1, 2.0).tolist(), [0])
+        first.insert_node(tap_node)
+        self.assertEqual((len(table), len(first.retrieve_all_nodes()), len(second.retrieve_all_nodes())), (1, 2, 1))
+        self.assertTrue(second.retrieve_all_nodes() is not table)
+
+    def test_insert_and_delete_rows(self):
+        table = build_node_table([tap_node, hold_node])
+        num_reallocation = 0
+        for i in range(100):
+            start_seconds = table.start_seconds
+            table.insert_row(1, ANode(TimeCodeInMeasures(0, 2.0), TimeCodeInMeasures(0, 2.0), 3), float(i), float(i))
+            num_reallocation += not np.shares_memory(start_seconds, table.start_seconds)
+        # The columns grow by doubling, the other insertions move the rows inside their spare capacity
+        self.assertLessEqual(num_reallocation, 4)
+        self.assertEqual(len(table), 102)
+        self.assertEqual(table.start_seconds[1:4].tolist(), [99.0, 98.0, 97.0])
+        self.assertEqual(table[101], hold_node)
+
+        table.delete_row(1)
+        table.delete_row(100)
+        self.assertEqual(len(table), 100)
+        self.assertEqual((table.start_seconds[1], table.trails[-1]), (98.0, 3))
+        self.assertRaises(IndexError, table.delete_row, 100)
+        self.assertRaises(IndexError, table.insert_row, 101, tap_node)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+from Game.judgement import Judgement
+from Game.replay import JUDGEMENT_CODES, InputEvent, Replay, run_score_replays, simulate_replay
+
+# 120 bpm 4/4: taps at 0.5 s (trail 1) and 1.0 s (trail 2), a hold from 2.0 s to 3.0 s with 3 ticks (trail 1)
+chart_text = """trails 2
+meter 0 4/4
+bpm 0 0 120
+nodes
+0 1 0 1 1
+0 2 0 2 2
+1 0 1 2 1
+"""
+
+perfect_play = Replay.from_events([
+    InputEvent(1, 0.5, True), InputEvent(1, 0.55, False),
+    InputEvent(2, 1.04, True), InputEvent(2, 1.1, False),
+    InputEvent(1, 2.0, True), InputEvent(1, 3.0, False),
+])
+
+# Misses the second tap and releases the hold too early
+sloppy_play = Replay.from_events([
+    InputEvent(1, 2.0, True), InputEvent(1, 2.5, False),
+    InputEvent(1, 0.52, True), InputEvent(1, 0.6, False),
+])
+
+
+class TestReplay(TestCase):
+    def setUp(self):
+        self.score = load_chart(chart_text.splitlines())
+
+    def test_perfect_play(self):
+        result = simulate_replay(self.score, perfect_play)
+        self.assertEqual([JUDGEMENT_CODES[code] for code in result.judgements], \
+            [Judgement.PERFECT, Judgement.GREAT, Judgement.PERFECT])
+        self.assertEqual(result.release_judgements.tolist(), [-1, -1, 0])
+        self.assertEqual(result.max_combo, 4 + 3)
+        self.assertAlmostEqual(result.accuracy, 3.75 / 4)
+        self.assertTrue(self.score.retrieve_all_nodes().hits.all())
+
+    def test_inputs_are_sorted_and_misses_flushed(self):
+        result = simulate_replay(self.score, sloppy_play)
+        self.assertEqual([JUDGEMENT_CODES[code] for code in result.judgements], \
+            [Judgement.PERFECT, Judgement.MISS, Judgement.PERFECT])
+        self.assertEqual(JUDGEMENT_CODES[result.release_judgements[2]], Judgement.MISS)
+        # The ticks at 2.25 s and 2.5 s were reached before the early release
+        self.assertEqual((result.max_combo, result.final_combo), (4, 0))
+
+    def test_full_combo_reaches_total_combo(self):
+        result = simulate_replay(self.score, perfect_play)
+        self.assertEqual(result.max_combo, self.score.get_total_combo())
+        self.assertEqual(result.final_combo, self.score.get_total_combo())
+
+    def test_batch_matches_single_runs(self):
+        replays = [perfect_play, sloppy_play] * 3
+        results = run_score_replays(self.score, replays, max_workers=2, chunksize=1)
+        for replay, result in zip(replays, results):
+            expected = simulate_replay(self.score, replay)
+            self.assertEqual(result.judgements.tolist(), expected.judgements.tolist())
+            self.assertEqual(result.counts, expected.counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import struct
+import tempfile
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+from Game.gameMusicScore import VBPMPianoGameMusicScore, pianoGameMusicScore
+from Game.scoreCache import CompiledScoreCache
+
+chart_text = """trails 3
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 0 0 1
+1 2 3 0 2
+4 1 4 1 3
+"""
+
+
+class TestScoreCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_directory = os.path.join(self.directory.name, 'cache')
+        self.chart_path = os.path.join(self.directory.name, 'song.chart')
+        with open(self.chart_path, 'w') as chart_file:
+            chart_file.write(chart_text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit_skips_compilation(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        compiled = []
+        def compile_score():
+            compiled.append(True)
+            return load_chart(chart_text.splitlines())
+
+        first = cache.get_or_compile(chart_text.encode(), compile_score)
+        second = cache.get_or_compile(chart_text.encode(), compile_score)
+        self.assertEqual(len(compiled), 1)
+        self.assertIsInstance(second, VBPMPianoGameMusicScore)
+        self.assertEqual(second, first)
+        self.assertEqual(second.node_end_seconds.tolist(), first.node_end_seconds.tolist())
+
+    def test_changed_source_misses(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        self.assertNotEqual(cache.get_key(chart_text.encode()), cache.get_key(chart_text.encode() + b'\n'))
+        cache.load_chart_file(self.chart_path)
+        self.assertIsNone(cache.load(cache.get_key(b'another chart')))
+
+    def test_damaged_entry_is_recompiled(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        key = cache.get_key(chart_text.encode())
+        with open(os.path.join(self.cache_directory, key + '.rgcb'), 'wb') as entry_file:
+            entry_file.write(b'\0' * 64)
+        self.assertIsNone(cache.load(key))
+        self.assertEqual(len(cache.load_chart_file(self.chart_path).retrieve_all_nodes()), 3)
+
+    def test_entry_with_bad_values_is_recompiled(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        first = cache.load_chart_file(self.chart_path)
+        key = cache.get_key(chart_text.encode())
+        self.assertEqual(cache.load(key), first)
+        # The beat unit of the first meter record becomes 3, which no meter can have
+        with open(os.path.join(self.cache_directory, key + '.rgcb'), 'r+b') as entry_file:
+            entry_file.seek(44)
+            entry_file.write(struct.pack('<i', 3))
+        self.assertIsNone(cache.load(key))
+        self.assertEqual(cache.load_chart_file(self.chart_path), first)
+        self.assertEqual(cache.load(key), first)
+
+    def test_score_class_which_does_not_fit_keeps_entry(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        first = cache.load_chart_file(self.chart_path)
+        key = cache.get_key(chart_text.encode())
+        # The chart changes its bpm, a score of fixed bpm can not hold it
+        self.assertRaises(ValueError, cache.load, key, pianoGameMusicScore)
+        self.assertEqual(cache.load(key), first)
+
+    def test_stale_temporary_files_are_removed(self):
+        CompiledScoreCache(self.cache_directory)
+        stale = os.path.join(self.cache_directory, 'interrupted.tmp')
+        fresh = os.path.join(self.cache_directory, 'writing.tmp')
+        for path in (stale, fresh):
+            with open(path, 'wb') as temporary_file:
+                temporary_file.write(b'RGCB')
+        os.utime(stale, (0, 0))
+        CompiledScoreCache(self.cache_directory)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = CompiledScoreCache(self.cache_directory)
+        score = load_chart(chart_text.splitlines())
+        cache.store('old', score)
+        cache.store('new', score)
+        os.utime(os.path.join(self.cache_directory, 'old.rgcb'), (0, 0))
+        entry_size = cache.get_size() // 2
+
+        small_cache = CompiledScoreCache(self.cache_directory, max_bytes=entry_size)
+        small_cache.evict()
+        self.assertIsNone(small_cache.load('old'))
+        self.assertIsNotNone(small_cache.load('new'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from unittest import TestCase, main
+from Game.chartParser import load_chart
+
+# 120 bpm for two measures (4 seconds), then 60 bpm
+chart_text = """trails 2
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 2 0 1
+1 0 1 0 1
+2 2 2 2 1
+0 2 0 2 2
+3 0 3 0 2
+"""
+
+
+class TestScrollView(TestCase):
+    def setUp(self):
+        self.score = load_chart(chart_text.splitlines())
+
+    def test_constant_scrolling(self):
+        first, second = self.score.get_visible_nodes(2.5, 100.0, 400.0)
+        # The hold is clipped at the judgement line, the tap it covers is already passed
+        self.assertEqual(first.rows.tolist(), [0, 3])
+        self.assertEqual(first.y_starts.tolist(), [0.0, 350.0])
+        self.assertEqual(first.y_ends.tolist(), [150.0, 350.0])
+        self.assertEqual(len(second.rows), 0)
+
+        first, _ = self.score.get_visible_nodes(-1.0, 100.0, 150.0)
+        self.assertEqual(first.y_ends.tolist(), [150.0])
+
+    def test_bpm_relative_scrolling(self):
+        scroll_view = self.score.retrieve_scroll_view(bpm_relative=True)
+        # At half the base bpm, the scrolling is twice slower
+        self.assertAlmostEqual(scroll_view.get_position(4.5), 4.25)
+        first, second = self.score.get_visible_nodes(4.5, 100.0, 400.0, bpm_relative=True)
+        self.assertEqual(first.rows.tolist(), [3])
+        self.assertEqual(first.y_starts.tolist(), [75.0])
+        self.assertEqual(second.rows.tolist(), [4])
+        self.assertEqual(second.y_starts.tolist(), [175.0])
+
+    def test_trails_past_16_bits(self):
+        score = load_chart(('trails 40000\nmeter 0 4/4\nbpm 0 0 120\nnodes\n0 1 0 1 1\n0 2 0 2 40000\n').splitlines())
+        visible = score.get_visible_nodes(0.0, 100.0, 400.0)
+        self.assertEqual((visible[0].rows.tolist(), visible[-1].rows.tolist()), ([0], [1]))
+
+    def test_illegal_viewport(self):
+        self.assertRaises(ValueError, self.score.get_visible_nodes, 0.0, 100.0, 0.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from Game.chartParser import load_chart
+from Game.gameMusicScore import VBPMPianoGameMusicScore
+from Game.sharedScore import SharedScoreAttachments, SharedScoreError, SharedScorePublisher
+
+chart_text = """trails 3
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 0 0 1
+1 2 3 0 2
+4 1 4 1 3
+"""
+
+
+def read_shared_score(name):
+    """What a worker process sees of a shared score"""
+    with SharedScoreAttachments() as attachments:
+        score = attachments.acquire(name)
+        result = (type(score).__name__, score.node_end_seconds.tolist(), score.node_end_seconds.flags.writeable)
+        del score
+        attachments.release(name)
+    return result
+
+
+class TestSharedScore(TestCase):
+    def setUp(self):
+        self.publisher = SharedScorePublisher()
+        self.compiled = []
+
+    def tearDown(self):
+        self.publisher.close()
+
+    def compile_score(self):
+        self.compiled.append(1)
+        return load_chart(chart_text.splitlines())
+
+    def test_attach_in_other_processes(self):
+        name = self.publisher.acquire('chart', self.compile_score)
+        expected = load_chart(chart_text.splitlines()).node_end_seconds.tolist()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(read_shared_score, [name] * 4))
+        self.assertEqual(results, [('VBPMPianoGameMusicScore', expected, False)] * 4)
+        # The workers do not unlink the segment when they end
+        self.assertEqual(read_shared_score(name)[1], expected)
+
+    def test_read_only_without_copy(self):
+        name = self.publisher.acquire('chart', self.compile_score)
+        with SharedScoreAttachments() as attachments:
+            score = attachments.acquire(name)
+            self.assertIs(attachments.acquire(name), score)
+            self.assertEqual(len(attachments), 1)
+            self.assertEqual(score, load_chart(chart_text.splitlines()))
+            with self.assertRaises(ValueError):
+                score.node_start_seconds[0] = 1.0
+            # Only the hit flags belong to the process
+            score.retrieve_all_nodes().hits[0] = True
+            # Editing the timing copies the columns it changes
+            score.set_bpm_change(TimeCodeInMeasures(1, 0.0), 240.0)
+            self.assertTrue(score.node_end_seconds.flags.writeable)
+            self.assertIsInstance(attachments.acquire(name, VBPMPianoGameMusicScore), VBPMPianoGameMusicScore)
+            del score
+            for _ in range(3):
+                attachments.release(name)
+            self.assertEqual(len(attachments), 0)
+            self.assertRaises(SharedScoreError, attachments.release, name)
+
+    def test_reference_counting(self):
+        name = self.publisher.acquire('chart', self.compile_score)
+        self.assertEqual(self.publisher.acquire('chart', self.compile_score), name)
+        self.assertEqual(len(self.compiled), 1)
+        self.assertEqual(self.publisher.get_references('chart'), 2)
+
+        self.publisher.release('chart')
+        self.assertEqual(self.publisher.get_name('chart'), name)
+        self.publisher.release('chart')
+        self.assertNotIn('chart', self.publisher)
+        self.assertRaises(SharedScoreError, self.publisher.release, 'chart')
+        self.assertRaises(SharedScoreError, SharedScoreAttachments().acquire, name)
+
+    def test_score_still_in_use(self):
+        name = self.publisher.acquire('chart', self.compile_score)
+        attachments = SharedScoreAttachments()
+        score = attachments.acquire(name)
+        attachments.release(name)
+        self.assertRaises(SharedScoreError, attachments.close)
+        # Detached by the next release or close once the score is dropped
+        del score
+        attachments.close()
+
+
+if __name__ == "__main__":
+    main()
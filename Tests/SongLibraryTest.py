@@ -0,0 +1,88 @@
+import os
+import tempfile
+from unittest import TestCase, main, mock
+from Game.songLibrary import ScanReport, SongLibrary
+
+chart_text = """trails 3
+meter 0 4/4
+bpm 0 0 120
+bpm 2 0 60
+nodes
+0 0 0 0 1
+1 2 3 0 2
+4 1 4 1 3
+"""
+
+short_chart_text = """trails 4
+meter 0 4/4
+meter 1 3/4
+bpm 0 0 150
+nodes
+0 0 0 0 1
+0 0.5 0 0.5 2
+"""
+
+
+class TestSongLibrary(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.songs = os.path.join(self.directory.name, 'songs')
+        os.makedirs(os.path.join(self.songs, 'pack'))
+        self.write('song.chart', chart_text)
+        self.write(os.path.join('pack', 'short.chart'), short_chart_text)
+        self.write('broken.chart', 'nodes\n')
+        self.write('notes.txt', 'not a chart')
+        self.library = SongLibrary(os.path.join(self.directory.name, 'library.sqlite'))
+
+    def tearDown(self):
+        self.library.close()
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.songs, name), 'w') as chart_file:
+            chart_file.write(text)
+
+    def test_metadata(self):
+        self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(3, 0, 0, 0, 1))
+        chart = self.library.get(os.path.join(self.songs, 'song.chart'))
+        self.assertEqual((chart.num_trail, chart.num_node, chart.num_hold), (3, 3, 1))
+        self.assertAlmostEqual(chart.duration, 13.0)
+        self.assertEqual((chart.min_bpm, chart.max_bpm, chart.num_bpm_change), (60.0, 120.0, 2))
+        self.assertEqual(self.library.get(os.path.join(self.songs, 'pack', 'short.chart')).meters, '0:4/4 1:3/4')
+        self.assertEqual(self.library.get(os.path.join(self.songs, 'pack', 'short.chart')).peak_density, 2.0)
+        self.assertIn('line 1', self.library.get_failed()[0].error)
+
+    def test_query(self):
+        self.library.scan(self.songs, max_workers=1)
+        self.assertEqual([os.path.basename(chart.path) for chart in self.library.query(order_by='duration')], \
+            ['short.chart', 'song.chart'])
+        self.assertEqual([chart.num_trail for chart in self.library.query(min_bpm=100.0)], [4])
+        self.assertEqual(self.library.query(max_duration=0.1), [])
+        self.assertRaises(ValueError, self.library.query, order_by='error; DROP TABLE charts')
+
+    def test_incremental_rescan(self):
+        self.library.scan(self.songs, max_workers=1)
+        self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(0, 0, 0, 3, 0))
+
+        # Touched without being changed, then changed, then removed
+        path = os.path.join(self.songs, 'song.chart')
+        os.utime(path, ns=(0, 10 ** 9))
+        self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(0, 0, 0, 3, 0))
+        self.write('song.chart', chart_text + '5 0 5 0 1\n')
+        self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(0, 1, 0, 2, 0))
+        self.assertEqual(self.library.get(path).num_node, 4)
+        os.remove(path)
+        self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(0, 0, 1, 2, 0))
+        self.assertEqual(len(self.library), 2)
+
+    def test_unexpected_error(self):
+        with mock.patch('Game.songLibrary.get_peak_density', side_effect=RuntimeError('boom')):
+            self.assertEqual(self.library.scan(self.songs, max_workers=1), ScanReport(3, 0, 0, 0, 3))
+        self.assertEqual(self.library.get(os.path.join(self.songs, 'song.chart')).error, 'boom')
+
+    def test_process_pool(self):
+        self.assertEqual(self.library.scan(self.songs, max_workers=2), ScanReport(3, 0, 0, 0, 1))
+
+
+if __name__ == "__main__":
+    main()
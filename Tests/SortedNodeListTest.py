@@ -0,0 +1,58 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from Game.node import ANode
+from Game.sortedNodeList import SortedNodeList, node_sort_key
+from Game.Util.UtilityFunctions import sort_node_list_by_start_time
+
+all_nodes = [ANode(TimeCodeInMeasures(measure % 7, float(measure % 4)), TimeCodeInMeasures(measure % 7 + 1, 0.0), \
+    measure % 3 + 1) for measure in range(50)]
+
+
+class TestSortedNodeList(TestCase):
+    def test_bulk_construction(self):
+        sorted_nodes = SortedNodeList(all_nodes)
+        self.assertEqual([node_sort_key(node) for node in sorted_nodes], sorted(map(node_sort_key, all_nodes)))
+
+    def test_update(self):
+        sorted_nodes = SortedNodeList(all_nodes[20:])
+        sorted_nodes.update(all_nodes[:20])
+        self.assertEqual(len(sorted_nodes), 50)
+        self.assertEqual([node_sort_key(node) for node in sorted_nodes], sorted(map(node_sort_key, all_nodes)))
+
+    def test_add_and_remove(self):
+        SortedNodeList.LOAD = 4
+        try:
+            sorted_nodes = SortedNodeList()
+            for node in all_nodes:
+                sorted_nodes.add(node)
+            for node in all_nodes[:20]:
+                sorted_nodes.remove(node)
+        finally:
+            SortedNodeList.LOAD = 512
+        self.assertEqual(len(sorted_nodes), 30)
+        self.assertEqual([node_sort_key(node) for node in sorted_nodes], sorted(map(node_sort_key, all_nodes[20:])))
+        self.assertRaises(ValueError, sorted_nodes.remove, all_nodes[0])
+
+    def test_lookups(self):
+        SortedNodeList.LOAD = 4
+        try:
+            sorted_nodes = SortedNodeList(all_nodes)
+        finally:
+            SortedNodeList.LOAD = 512
+        expected = sorted(all_nodes, key=node_sort_key)
+        self.assertEqual([sorted_nodes[i] for i in range(50)], expected)
+        self.assertIs(sorted_nodes[-1], expected[-1])
+        self.assertEqual(sorted_nodes.index(all_nodes[7]), expected.index(all_nodes[7]))
+        self.assertIn(all_nodes[7], sorted_nodes)
+        self.assertNotIn(ANode(TimeCodeInMeasures(9, 0.0), TimeCodeInMeasures(9, 0.0), 1), sorted_nodes)
+        self.assertEqual(list(sorted_nodes.irange((5, 0.0, 0))), \
+            [node for node in expected if node_sort_key(node) >= (5, 0.0, 0)])
+
+    def test_sort_node_list_keeps_input(self):
+        copied_nodes = list(all_nodes)
+        sort_node_list_by_start_time(copied_nodes)
+        self.assertEqual(copied_nodes, all_nodes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from unittest import TestCase, main
+from Benchmarks.RunBenchmarks import run_benchmarks
+from Benchmarks.SyntheticChart import generate_chart
+from Game.gameMusicScore import VMVBPianoGameMusicScore
+from Game.nodeTable import NODE_KIND_HOLD
+
+
+class TestSyntheticChart(TestCase):
+    def test_same_seed_same_chart(self):
+        first = generate_chart(500, num_trail=6, seed=3)
+        self.assertEqual(first.all_nodes, generate_chart(500, num_trail=6, seed=3).all_nodes)
+        self.assertEqual(first.var_bpm, generate_chart(500, num_trail=6, seed=3).var_bpm)
+        self.assertNotEqual(first.all_nodes, generate_chart(500, num_trail=6, seed=4).all_nodes)
+
+    def test_parameters(self):
+        chart = generate_chart(2000, num_trail=7, hold_ratio=0.5, bpm_changes_per_measure=0.5, seed=1)
+        self.assertEqual(len(chart.all_nodes), 2000)
+        self.assertEqual(int(chart.all_nodes.trails.max()), 7)
+        self.assertAlmostEqual(float((chart.all_nodes.kinds == NODE_KIND_HOLD).mean()), 0.5, delta=0.05)
+        self.assertGreater(len(chart.var_bpm), 50)
+        score = VMVBPianoGameMusicScore(chart.all_nodes, chart.num_trail, chart.var_meter, chart.var_bpm)
+        self.assertTrue((score.node_end_seconds >= score.node_start_seconds).all())
+
+    def test_report(self):
+        report = run_benchmarks(['1k'], ['construct_vbpm', 'window_query'], repeat=1)
+        self.assertEqual([result['benchmark'] for result in report['results']], ['construct_vbpm', 'window_query'])
+        self.assertGreater(report['results'][0]['seconds_min'], 0)
+
+
+if __name__ == "__main__":
+    main()
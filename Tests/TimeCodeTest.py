@@ -1,5 +1,6 @@
 from unittest import TestCase, main
-from DataStructure.TimeCode import TimeCodeInMeasures, TimeCodeInSeconds
+from DataStructure.TimeCode import TimeCodeInMeasures, TimeCodeInSeconds, TimeCodeInTicks
+from DataStructure.TimingMap import TimingMap
 from DataStructure.util.UtilityClass import meter
 
 meter44 = meter(num_beats=4, beat_unit=4)
@@ -12,6 +13,39 @@ class TestTimeCode(TestCase):
     def test_get_time_in_measure(self):
         self.assertEqual(timecode1.get_time_in_measure(num_second=5, bpm=120, mt = meter44), (2, 2))
 
+    def test_hash_does_not_collide(self):
+        self.assertNotEqual(hash(TimeCodeInMeasures(1, 2.0)), hash(TimeCodeInMeasures(2, 1.0)))
+        self.assertEqual(TimeCodeInMeasures(2, 3), TimeCodeInMeasures(2, 3.0))
+        self.assertLess(TimeCodeInMeasures(1, 3.5), TimeCodeInMeasures(2, 0.0))
+
+    def test_beats_on_ticks_only(self):
+        # 1920 ticks per beat hold decimals, triplets and quintuplets exactly, but not septuplets
+        self.assertEqual(TimeCodeInMeasures(0, 0.1).get_beat_tick(), 192)
+        self.assertEqual(TimeCodeInMeasures(0, 2 / 3).get_beat_tick(), 1280)
+        self.assertEqual(TimeCodeInMeasures(0, 0.2).get_num_beat(), 0.2)
+        self.assertRaises(ValueError, TimeCodeInMeasures, 0, 1 / 7)
+        self.assertRaises(ValueError, TimeCodeInMeasures, 0, 0.0001)
+
+
+class TestTimeCodeInTicks(TestCase):
+    def setUp(self):
+        # 4/4 for two measures, then 6/8
+        self.timing_map = TimingMap({TimeCodeInMeasures(0, 0.0): 120}, \
+            {TimeCodeInMeasures(0, 0.0): meter44, TimeCodeInMeasures(2, 0.0): meter(6, 8)})
+
+    def test_integer_arithmetic(self):
+        self.assertEqual(TimeCodeInTicks(4000) - TimeCodeInTicks(1000), 3000)
+        self.assertEqual(TimeCodeInTicks(1000) + 960, TimeCodeInTicks(1960))
+        self.assertRaises(ValueError, lambda: TimeCodeInTicks(1, 480) < TimeCodeInTicks(1, 960))
+
+    def test_measure_round_trip(self):
+        timecode = TimeCodeInMeasures(2, 1.5)
+        ticks = timecode.to_ticks(self.timing_map)
+        # two measures of 1920 ticks, then 1.5 eighth notes of 240 ticks
+        self.assertEqual(ticks, TimeCodeInTicks(2 * 1920 + 360))
+        self.assertEqual(ticks.get_time_in_measure(self.timing_map), timecode)
+        self.assertAlmostEqual(ticks.get_time_in_seconds(self.timing_map), self.timing_map.get_second_at(2, 1.5))
+
 
 if __name__ == "__main__":
     #unittest_expect_error()
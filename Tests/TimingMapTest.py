@@ -0,0 +1,44 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures, TimeCodeInSeconds
+from DataStructure.TimingMap import TimingMap
+from DataStructure.util.UtilityClass import meter
+import numpy as np
+
+meter44 = meter(num_beats=4, beat_unit=4)
+meter34 = meter(num_beats=3, beat_unit=4)
+
+fix_map = TimingMap({TimeCodeInMeasures(0, 0.0): 120.0}, {TimeCodeInMeasures(0, 0.0): meter44})
+
+# 4/4 at 120 for measure 0, 3/4 from measure 1, bpm drops to 60 at the third beat of measure 2
+var_map = TimingMap({TimeCodeInMeasures(0, 0.0): 120.0, TimeCodeInMeasures(2, 2.0): 60.0},
+                    {TimeCodeInMeasures(0, 0.0): meter44, TimeCodeInMeasures(1, 0.0): meter34})
+
+
+class TestTimingMap(TestCase):
+    def test_get_time_in_second_fix(self):
+        self.assertEqual(fix_map.get_time_in_second(TimeCodeInMeasures(2, 2.0)), 5.0)
+
+    def test_get_time_in_second_var(self):
+        self.assertEqual(var_map.get_time_in_second(TimeCodeInMeasures(1, 0.0)), 2.0)
+        self.assertEqual(var_map.get_time_in_second(TimeCodeInMeasures(2, 2.0)), 4.5)
+        self.assertEqual(var_map.get_time_in_second(TimeCodeInMeasures(3, 0.0)), 5.5)
+
+    def test_get_time_in_measure_var(self):
+        self.assertEqual(var_map.get_time_in_measure(4.5), (2, 2.0))
+        self.assertEqual(var_map.get_time_in_measure(13.0), (5, 1.5))
+
+    def test_timecode_in_seconds_with_timing_map(self):
+        self.assertEqual(TimeCodeInSeconds(5.5).get_time_in_measure(num_second=5.5, timing_map=var_map), (3, 0.0))
+
+    def test_get_seconds_of(self):
+        seconds = var_map.get_seconds_of(np.array([0, 1, 2, 3, 5]), np.array([0.0, 0.0, 2.0, 0.0, 1.5]))
+        self.assertEqual(seconds.dtype, np.float64)
+        self.assertEqual(seconds.tolist(), [0.0, 2.0, 4.5, 5.5, 13.0])
+
+    def test_meter_at_measure(self):
+        self.assertEqual(var_map.get_meter_at_measure(0), meter44)
+        self.assertEqual(var_map.get_meter_at_measure(7), meter34)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from unittest import TestCase, main
+from DataStructure.TimeCode import TimeCodeInMeasures
+from DataStructure.util.UtilityClass import meter
+from Game.node import ANode
+from Game.gameMusicScore import pianoGameMusicScore
+from Game.trailIntervalIndex import NodeIntervalTree
+import numpy as np
+
+meter44 = meter(num_beats=4, beat_unit=4)
+
+# At 120 bpm in 4/4, one measure lasts 2 seconds
+long_hold = ANode(TimeCodeInMeasures(0, 0.0), TimeCodeInMeasures(10, 0.0), 1)
+tap_1 = ANode(TimeCodeInMeasures(4, 0.0), TimeCodeInMeasures(4, 0.0), 1)
+tap_2 = ANode(TimeCodeInMeasures(4, 2.0), TimeCodeInMeasures(4, 2.0), 2)
+short_hold = ANode(TimeCodeInMeasures(5, 0.0), TimeCodeInMeasures(6, 0.0), 2)
+
+score = pianoGameMusicScore([long_hold, tap_1, tap_2, short_hold], 2, meter44, 120.0)
+
+
+class TestTrailIntervalIndex(TestCase):
+    def test_long_hold_is_still_active(self):
+        self.assertEqual(score.get_nodes_at(1, 15.0).tolist(), [0])
+        self.assertEqual(score.get_nodes_at(1, 20.5).tolist(), [])
+
+    def test_window(self):
+        self.assertEqual(score.get_nodes_in_window(1, 7.0, 8.0).tolist(), [0, 1])
+        self.assertEqual(score.get_nodes_in_window(2, 9.0, 10.0).tolist(), [2, 3])
+        self.assertEqual(score.get_nodes_in_window(2, 12.5, 13.0).tolist(), [])
+
+    def test_tree_insert_and_remove(self):
+        rng = np.random.default_rng(5)
+        starts = rng.uniform(0, 100, 300)
+        ends = starts + rng.exponential(5, 300)
+        tree = NodeIntervalTree(starts[:100], ends[:100], np.arange(100))
+        stored = set(range(100))
+        # Enough insertions around the same time to split the leaves, then removals
+        for row in range(100, 300):
+            tree.insert(starts[row], ends[row], row)
+            stored.add(row)
+        for row in rng.permutation(300)[:150].tolist():
+            tree.remove(starts[row], ends[row], row)
+            stored.remove(row)
+        self.assertEqual(len(tree), 150)
+        for t in np.linspace(0, 120, 61):
+            expected = [row for row in sorted(stored) if starts[row] <= t <= ends[row]]
+            self.assertEqual(sorted(tree.stab(t).tolist()), expected)
+        self.assertRaises(ValueError, tree.remove, 0.0, 1.0, 1000)
+
+    def test_tree_retime(self):
+        rng = np.random.default_rng(6)
+        starts = rng.uniform(0, 100, 400)
+        ends = starts + rng.exponential(5, 400)
+        tree = NodeIntervalTree(starts, ends, np.arange(400))
+        # Everything after the change plays twice slower, again and again
+        for from_second in (90.0, 50.0, 95.0, 10.0, 70.0):
+            starts = np.where(starts < from_second, starts, from_second + (starts - from_second) * 2)
+            ends = np.where(ends < from_second, ends, from_second + (ends - from_second) * 2)
+            tree.retime(from_second, starts, ends)
+            for t in np.linspace(0, 400, 101):
+                expected = np.flatnonzero((starts <= t) & (t <= ends)).tolist()
+                self.assertEqual(sorted(tree.stab(t).tolist()), expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+from unittest import TestCase, main, mock
+from Util.ContractCompiler import SAMPLE_SIZE, compile_validator
+from Util.TypeConstract import VALIDATION_MODE_VARIABLE, ValidationMode, is_dict_of, is_int, is_list_of, is_one_of, is_optional, is_str, \
+    is_tuple_of, read_validation_mode, set_validation_mode, type_contract
+
+nested = is_dict_of(is_str, is_list_of(is_one_of(is_int, is_tuple_of(is_int, is_optional(is_str)))))
+
+values = [
+    {'a': [1, (2, None), (3, 'x')], 'b': []},
+    {'a': [1, (2, 3)]},
+    {'a': [True]},
+    {1: []},
+    [],
+]
+
+
+class TestCompiledContracts(TestCase):
+    def tearDown(self):
+        set_validation_mode(ValidationMode.FULL)
+
+    def test_compiled_matches_validator(self):
+        for value in values:
+            self.assertEqual(compile_validator(nested)(value), nested(value))
+
+    def test_same_structure_shares_compiled_check(self):
+        self.assertIs(compile_validator(is_list_of(is_int)), compile_validator(is_list_of(is_int)))
+
+    def test_type_contract(self):
+        type_contract(values[0], nested)
+        self.assertRaises(TypeError, type_contract, values[1], nested)
+        self.assertRaises(TypeError, type_contract, 1, 5)
+        self.assertRaises(TypeError, type_contract, 1, lambda x: 1)
+
+    def test_sampled_mode(self):
+        set_validation_mode(ValidationMode.SAMPLED)
+        self.assertRaises(TypeError, type_contract, ['a'] * (SAMPLE_SIZE * 4), is_list_of(is_int))
+        type_contract(list(range(SAMPLE_SIZE * 4)), is_list_of(is_int))
+
+    def test_off_mode(self):
+        set_validation_mode(ValidationMode.OFF)
+        type_contract('a', is_int)
+        type_contract('a', 5)
+
+    def test_mode_from_environment(self):
+        with mock.patch.dict(os.environ, {VALIDATION_MODE_VARIABLE: 'Sampled'}):
+            self.assertIs(read_validation_mode(), ValidationMode.SAMPLED)
+        with mock.patch.dict(os.environ, {VALIDATION_MODE_VARIABLE: 'fast'}):
+            with self.assertWarnsRegex(RuntimeWarning, f'{VALIDATION_MODE_VARIABLE}=\'fast\' is not one of full'):
+                self.assertIs(read_validation_mode(), ValidationMode.FULL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Compilation of type validators (see Util.TypeConstract) into one flat checking function.
+
+The validators built by the combinators of Util.TypeConstract (is_list_of, is_dict_of, ...) describe themselves
+with a contract spec, a nested tuple such as ('list', ('int',)). A spec is compiled once into the source of a
+single Python function, where the leaves are inlined and the containers become plain loops:
+
+    is_dict_of(is_str, is_list_of(is_int))
+        ↓
+    def check(value):
+        if not isinstance(value, dict): return False
+        for key_1, value_1 in value.items():
+            if not isinstance(key_1, str): return False
+            if not isinstance(value_1, list): return False
+            for item_2 in value_1:
+                if not (isinstance(item_2, int) and type(item_2) is not bool): return False
+        return True
+
+In sampled mode, containers larger than SAMPLE_SIZE only have SAMPLE_SIZE of their items checked:
+random positions for lists, the first items in iteration order for sets, dicts and other sized iterables.
+"""
+
+from collections.abc import Iterable
+from itertools import islice
+import random
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from Util.Memoize import memoize
+
+SAMPLE_SIZE = 32
+"""The number of items checked in a large container, in sampled mode"""
+
+CONTRACT_SPEC_ATTRIBUTE = '__contract_spec__'
+"""The attribute under which a validator stores its contract spec"""
+
+_LEAF_EXPRESSIONS: Dict[str, str] = {
+    'int': '(isinstance({0}, int) and type({0}) is not bool)',
+    'float': 'isinstance({0}, float)',
+    'str': 'isinstance({0}, str)',
+    'bool': 'isinstance({0}, bool)',
+    'none': '{0} is None',
+    'any': 'True',
+    'function': 'callable({0})',
+}
+"""The inlined expression of every leaf spec, formatted with the name of the checked variable"""
+
+
+def describe(validator: Callable, *spec: Any) -> Callable:
+    """To attach a contract spec to a validator, returns the validator"""
+    setattr(validator, CONTRACT_SPEC_ATTRIBUTE, spec)
+    return validator
+
+
+def get_spec_key(validator: Callable) -> Hashable:
+    """To get the structural key of a validator: its spec with every child validator replaced by its own key.
+    Validators without a spec are opaque and are their own key."""
+    spec = getattr(validator, CONTRACT_SPEC_ATTRIBUTE, None)
+    if spec is None:
+        return ('opaque', validator)
+    kind = spec[0]
+    if kind in ('list', 'set', 'iterable', 'optional'):
+        return (kind, get_spec_key(spec[1]))
+    if kind == 'dict':
+        return (kind, get_spec_key(spec[1]), get_spec_key(spec[2]))
+    if kind in ('tuple', 'one_of'):
+        return (kind,) + tuple(get_spec_key(child) for child in spec[1:])
+    return spec
+
+
+def compile_validator(validator: Callable, sampled: bool = False) -> Callable[[Any], bool]:
+    """To get the compiled checking function of a validator, which always returns a bool.
+    Validators with the same structure share one compiled function."""
+    return compile_spec_key(get_spec_key(validator), sampled)
+
+
+@memoize(maxsize=512)
+def compile_spec_key(spec_key: Hashable, sampled: bool = False) -> Callable[[Any], bool]:
+    """To compile a structural key (see get_spec_key) into a checking function"""
+    emitter = _Emitter(sampled)
+    emitter.emit_function('check', spec_key)
+    namespace = dict(emitter.namespace)
+    exec('\n'.join(emitter.lines), namespace)
+    return namespace['check']
+
+
+
+def _sample_sequence(sequence: Any) -> List[Any]:
+    """To pick SAMPLE_SIZE random items of a sequence, in O(SAMPLE_SIZE)"""
+    return [sequence[i] for i in random.sample(range(len(sequence)), SAMPLE_SIZE)]
+
+
+def _sample_iterable(iterable: Any) -> Any:
+    """To pick the first SAMPLE_SIZE items of a sized iterable, other iterables are checked in full"""
+    try:
+        size = len(iterable)
+    except TypeError:
+        return iterable
+    return iterable if size <= SAMPLE_SIZE else islice(iterable, SAMPLE_SIZE)
+
+
+
+class _Emitter():
+    """Writes the source of the checking functions of one spec key"""
+
+    # ------------- Fields ---------------
+    lines: List[str]
+    """The source lines written so far"""
+
+    namespace: Dict[str, Any]
+    """The objects referenced by the source (opaque validators, types, helpers)"""
+
+    _sampled: bool
+    _num_name: int
+
+
+    # ----------- Constructor ------------
+    def __init__(self, sampled: bool) -> None:
+        self.lines = []
+        self.namespace = {'_Iterable': Iterable, '_sample_sequence': _sample_sequence, \
+            '_sample_iterable': _sample_iterable, '_SAMPLE_SIZE': SAMPLE_SIZE}
+        self._sampled = sampled
+        self._num_name = 0
+
+
+    # ------------- Methods --------------
+    def emit_function(self, name: str, spec_key: Hashable) -> None:
+        """To write a function named name which checks its argument against spec_key"""
+        body = []
+        self._emit_check(spec_key, 'value', body, 1)
+        self.lines.append(f'def {name}(value):')
+        self.lines.extend(body)
+        self.lines.append('    return True')
+
+    def _new_name(self, prefix: str) -> str:
+        self._num_name += 1
+        return f'{prefix}_{self._num_name}'
+
+    def _reference(self, value: Any, prefix: str) -> str:
+        """To get the name under which an object is reachable from the source"""
+        name = self._new_name('_' + prefix)
+        self.namespace[name] = value
+        return name
+
+    def _expression(self, spec_key: Hashable, var: str) -> Optional[str]:
+        """To get a single expression checking var, or None if spec_key needs statements"""
+        kind = spec_key[0]
+        if kind in _LEAF_EXPRESSIONS:
+            return _LEAF_EXPRESSIONS[kind].format(var)
+        if kind == 'instance':
+            return f'isinstance({var}, {self._reference(spec_key[1], "type")})'
+        if kind == 'opaque':
+            return f'{self._reference(spec_key[1], "validator")}({var})'
+        if kind in ('one_of', 'optional'):
+            alternatives = list(spec_key[1:])
+            if kind == 'optional':
+                alternatives.insert(0, ('none',))
+            return '(' + ' or '.join(self._alternative(alternative, var) for alternative in alternatives) + ')'
+        return None
+
+    def _alternative(self, spec_key: Hashable, var: str) -> str:
+        """To get an expression for one alternative of a disjunction, containers become helper functions"""
+        expression = self._expression(spec_key, var)
+        if expression is not None:
+            return expression
+        name = self._new_name('_check')
+        self.emit_function(name, spec_key)
+        return f'{name}({var})'
+
+    def _emit_check(self, spec_key: Hashable, var: str, body: List[str], depth: int) -> None:
+        """To write the statements returning False when var does not satisfy spec_key"""
+        indent = '    ' * depth
+        expression = self._expression(spec_key, var)
+        if expression is not None:
+            if expression != 'True':
+                body.append(f'{indent}if not {expression}: return False')
+            return
+
+        kind = spec_key[0]
+        if kind == 'tuple':
+            items = spec_key[1:]
+            body.append(f'{indent}if not isinstance({var}, tuple) or len({var}) != {len(items)}: return False')
+            for i, item in enumerate(items):
+                item_var = self._new_name('item')
+                body.append(f'{indent}{item_var} = {var}[{i}]')
+                self._emit_check(item, item_var, body, depth)
+            return
+
+        if kind == 'dict':
+            body.append(f'{indent}if not isinstance({var}, dict): return False')
+            key_var = self._new_name('key')
+            value_var = self._new_name('value')
+            items = f'{var}.items()'
+            if self._sampled:
+                items = f'_sample_iterable({items})'
+            body.append(f'{indent}for {key_var}, {value_var} in {items}:')
+            self._emit_loop_body(body, depth + 1, (spec_key[1], key_var), (spec_key[2], value_var))
+            return
+
+        container_type = {'list': 'list', 'set': 'set', 'iterable': '_Iterable'}[kind]
+        body.append(f'{indent}if not isinstance({var}, {container_type}): return False')
+        items = var
+        if self._sampled:
+            items = f'({var} if len({var}) <= _SAMPLE_SIZE else _sample_sequence({var}))' if kind == 'list' \
+                else f'_sample_iterable({var})'
+        item_var = self._new_name('item')
+        body.append(f'{indent}for {item_var} in {items}:')
+        self._emit_loop_body(body, depth + 1, (spec_key[1], item_var))
+
+    def _emit_loop_body(self, body: List[str], depth: int, *checks) -> None:
+        """To write the checks of the items of a container, a loop over items of any type keeps a pass"""
+        num_line = len(body)
+        for spec_key, var in checks:
+            self._emit_check(spec_key, var, body, depth)
+        if len(body) == num_line:
+            body.append('    ' * depth + 'pass')
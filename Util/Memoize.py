@@ -0,0 +1,193 @@
+"""Bounded, instrumented memoization for functions and methods.
+
+Every cache is a least recently used (LRU) map with a maximum number of entries, an optional time to live
+per entry, and counters of hits, misses, evictions and expirations, so that long-running processes
+(game servers) can memoize without their memory growing forever. It holds the compiled contract validators
+(see Util.ContractCompiler) and the time code differences of Game.Util.UtilityFunctions.
+"""
+
+from collections import OrderedDict
+from functools import update_wrapper
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Tuple
+
+DEFAULT_MAXSIZE = 1024
+"""The number of entries kept by a memoized function when no maxsize is given"""
+
+_MISSING = object()
+"""Sentinel returned by LRUCache.get when a key has no (live) entry"""
+
+_KWARGS_MARK = object()
+"""Separates the positional from the keyword arguments inside a cache key"""
+
+
+class CacheInfo(NamedTuple):
+    """The counters of a cache"""
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    uncacheable: int
+    size: int
+    maxsize: int
+
+
+class LRUCache():
+    """A thread-safe least recently used cache holding at most maxsize entries.
+
+    With a ttl (in seconds), an entry older than ttl is dropped the next time it is looked up
+    and counted as an expiration, its lookup is then a miss.
+
+    Examples: ::
+
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1); cache.put('b', 2); cache.put('c', 3)  # 'a' is evicted
+        cache.get('a', None) # -> None
+    """
+
+    # ------------- Fields ---------------
+    _entries: "OrderedDict[Hashable, Tuple[Any, float]]"
+    """The value and the time of insertion of every key, from the least to the most recently used"""
+
+    _maxsize: int
+    """The largest number of entries"""
+
+    _ttl: Optional[float]
+    """The number of seconds an entry stays valid, None for no limit"""
+
+    _clock: Callable[[], float]
+    """The clock used for the ttl"""
+
+    _lock: Lock
+    """Guards the entries and the counters"""
+
+    _hits: int
+    _misses: int
+    _evictions: int
+    _expirations: int
+    _uncacheable: int
+
+
+    # ----------- Constructor ------------
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: Optional[float] = None, \
+        clock: Callable[[], float] = monotonic) -> None:
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError('maxsize must be a non-negative integer')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be positive')
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._uncacheable = 0
+
+
+    # ------------- Methods --------------
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        """To get the value of a key and mark it as most recently used, counted as a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, inserted_at = entry
+                if self._ttl is None or self._clock() - inserted_at < self._ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """To store the value of a key, evicting the least recently used entries beyond maxsize"""
+        with self._lock:
+            if self._maxsize == 0:
+                return
+            self._entries[key] = (value, self._clock() if self._ttl is not None else 0.0)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def count_uncacheable(self) -> None:
+        """To count a call whose arguments could not be used as a key"""
+        with self._lock:
+            self._uncacheable += 1
+
+    def clear(self) -> None:
+        """To remove every entry, the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        """To get the counters of this cache"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._expirations, self._uncacheable, \
+                len(self._entries), self._maxsize)
+
+
+
+def make_key(args: tuple, kwargs: dict, typed: bool = False) -> Hashable:
+    """To build the cache key of a call, raises TypeError if an argument is not hashable"""
+    key = args
+    if kwargs:
+        key += (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+    if typed:
+        key += tuple(type(arg) for arg in args) + tuple(type(value) for value in kwargs.values())
+    hash(key)
+    return key
+
+
+def _call_through(cache: LRUCache, func: Callable, args: tuple, kwargs: dict, typed: bool) -> Any:
+    """To call func through the cache, calls with unhashable arguments are not cached"""
+    try:
+        key = make_key(args, kwargs, typed)
+    except TypeError:
+        cache.count_uncacheable()
+        return func(*args, **kwargs)
+
+    value = cache.get(key)
+    if value is _MISSING:
+        value = func(*args, **kwargs)
+        cache.put(key, value)
+    return value
+
+
+def memoize(func: Optional[Callable] = None, *, maxsize: int = DEFAULT_MAXSIZE, ttl: Optional[float] = None, \
+    typed: bool = False):
+    """Decorate a function with this annotation to memoize (cache) its results in a bounded LRU cache.
+
+    Calls with unhashable arguments are computed without being cached.
+    The decorated function has cache_info() and cache_clear(), like functools.lru_cache.
+
+    Examples: ::
+
+        @memoize
+        def f(x): ...
+
+        @memoize(maxsize=256, ttl=60.0)
+        def g(x): ...
+
+        g.cache_info() # -> CacheInfo(hits=..., misses=..., evictions=..., ...)"""
+    def decorate(func: Callable):
+        cache = LRUCache(maxsize, ttl)
+
+        def func_wrapper(*args, **kwargs):
+            return _call_through(cache, func, args, kwargs, typed)
+        func_wrapper.cache = cache
+        func_wrapper.cache_info = cache.info
+        func_wrapper.cache_clear = cache.clear
+        return update_wrapper(func_wrapper, func)
+
+    if func is not None:
+        return decorate(func)
+    return decorate
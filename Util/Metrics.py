@@ -0,0 +1,269 @@
+"""A small registry of counters and latency histograms, readable in-process and dumpable as JSON or Prometheus text.
+
+Metrics are disabled by default. Instrumented code checks `METRICS.enabled` (one attribute read) before
+doing any work, so a disabled registry costs next to nothing on the hot paths:
+
+    _CONVERSION_SECONDS = METRICS.histogram('time_conversion_seconds', 'Latency of time conversions', kind='scalar')
+
+    def get_time_in_second(self, t_in_measure):
+        if not METRICS.enabled:
+            return self._convert(t_in_measure)
+        started = perf_counter()
+        ...
+        _CONVERSION_SECONDS.observe(perf_counter() - started)
+
+Less frequent code (the phases of a score construction) can use `with METRICS.time(...)`, which gives a shared
+no-op context manager while the registry is disabled.
+
+The registry is enabled at startup when the environment variable RYTHM_GAME_METRICS is set to 1,
+or with METRICS.enable().
+"""
+
+from bisect import bisect_left
+from contextlib import nullcontext
+import json
+import os
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+"""The upper bounds (in seconds) of the buckets of a latency histogram, from a microsecond to five seconds"""
+
+METRICS_VARIABLE = 'RYTHM_GAME_METRICS'
+"""The environment variable which enables the default registry at startup"""
+
+Labels = Tuple[Tuple[str, str], ...]
+"""The labels of a metric, sorted by name"""
+
+_NO_TIMER = nullcontext()
+
+
+class Counter():
+    """A value which only goes up"""
+
+    __slots__ = ('name', 'labels', '_value', '_lock')
+
+    # ----------- Constructor ------------
+    def __init__(self, name: str, labels: Labels) -> None:
+        self.name = name
+        self.labels = labels
+        self._value = 0
+        self._lock = Lock()
+
+
+    # ------------- Methods --------------
+    def inc(self, amount: float = 1) -> None:
+        """To add amount to the counter"""
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = 0
+
+
+
+class Histogram():
+    """A distribution of observed values (latencies in seconds) over fixed buckets, with their count and sum"""
+
+    __slots__ = ('name', 'labels', 'buckets', '_counts', '_sum', '_count', '_lock')
+
+    # ----------- Constructor ------------
+    def __init__(self, name: str, labels: Labels, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        if list(buckets) != sorted(buckets) or len(buckets) == 0:
+            raise ValueError('the buckets of a histogram must be ascending and not empty')
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = Lock()
+
+
+    # ------------- Methods --------------
+    def observe(self, value: float) -> None:
+        """To count one observed value"""
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> "_Timer":
+        """To observe the duration of a with block"""
+        return _Timer(self)
+
+    def get(self) -> Dict[str, Any]:
+        """To get the count, the sum and the cumulative count of every bucket (the last one is +Inf)"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return {'count': count, 'sum': total, 'buckets': list(zip(list(self.buckets) + [float('inf')], cumulative))}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+
+
+class _Timer():
+    """Context manager observing the duration of its block into a histogram"""
+
+    __slots__ = ('_histogram', '_started')
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(perf_counter() - self._started)
+
+
+
+class MetricsRegistry():
+    """The counters and histograms of a process, by name and labels"""
+
+    # ------------- Fields ---------------
+    enabled: bool
+    """Whether the instrumented code records anything, checked by that code before measuring"""
+
+    _metrics: Dict[Tuple[str, Labels], Any]
+    """Every metric, by name and labels, in registration order"""
+
+    _helps: Dict[str, str]
+    """The description of every metric name"""
+
+    _lock: Lock
+
+
+    # ----------- Constructor ------------
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metrics = {}
+        self._helps = {}
+        self._lock = Lock()
+
+
+    # ------------- Methods --------------
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def counter(self, name: str, help: str = '', **labels: str) -> Counter:
+        """To get the counter of a name and labels, created on its first use"""
+        return self._get_or_create(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS, \
+        **labels: str) -> Histogram:
+        """To get the histogram of a name and labels, created on its first use"""
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def time(self, name: str, help: str = '', **labels: str):
+        """To observe the duration of a with block into a histogram, does nothing while disabled"""
+        if not self.enabled:
+            return _NO_TIMER
+        return self.histogram(name, help, **labels).time()
+
+    def get(self, name: str, **labels: str) -> Optional[Any]:
+        """To read the value of a metric (see Counter.get and Histogram.get), None if it does not exist"""
+        metric = self._metrics.get((name, _to_labels(labels)))
+        return None if metric is None else metric.get()
+
+    def reset(self) -> None:
+        """To set every metric back to zero, the metrics stay registered"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """To get every metric as plain data: {name: {'type', 'help', 'values': [{'labels', 'value'}]}}"""
+        snapshot = {}
+        for (name, labels), metric in list(self._metrics.items()):
+            entry = snapshot.setdefault(name, {'type': 'counter' if isinstance(metric, Counter) else 'histogram', \
+                'help': self._helps.get(name, ''), 'values': []})
+            entry['values'].append({'labels': dict(labels), 'value': metric.get()})
+        return snapshot
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        """To dump every metric as JSON (see snapshot), the +Inf bucket bound is written as "+Inf" """
+        snapshot = self.snapshot()
+        for entry in snapshot.values():
+            if entry['type'] == 'histogram':
+                for value in entry['values']:
+                    value['value']['buckets'] = [[_format_bound(bound), count] \
+                        for bound, count in value['value']['buckets']]
+        return json.dumps(snapshot, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """To dump every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, entry in self.snapshot().items():
+            if entry['help']:
+                lines.append(f'# HELP {name} {entry["help"]}')
+            lines.append(f'# TYPE {name} {entry["type"]}')
+            for value in entry['values']:
+                labels = value['labels']
+                if entry['type'] == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_number(value["value"])}')
+                    continue
+                for bound, count in value['value']['buckets']:
+                    lines.append(f'{name}_bucket{_format_labels(dict(labels, le=_format_bound(bound)))} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(value["value"]["sum"])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value["value"]["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def _get_or_create(self, kind: type, name: str, help: str, labels: Dict[str, str], *arguments: Any):
+        key = (name, _to_labels(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = kind(name, key[1], *arguments)
+                    self._metrics[key] = metric
+                    if help or name not in self._helps:
+                        self._helps[name] = help
+        if not isinstance(metric, kind):
+            raise ValueError(f'metric {name} is already registered as a {type(metric).__name__}')
+        return metric
+
+
+
+def _to_labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (key + '="' + str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"' \
+        for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get(METRICS_VARIABLE, '0') == '1')
+"""The registry of the process, used by the instrumented parts of the game"""
@@ -5,22 +5,66 @@
 
 """A collection of utility functions for modifying the behavior of functions and methods."""
 
-from functools import lru_cache
+from enum import Enum
+import os
+import warnings
 from typing import Any, Callable, Iterable, Set, TypeVar
 from DataStructure.util.UtilityClass import meter
+from Util.ContractCompiler import CONTRACT_SPEC_ATTRIBUTE, compile_validator, describe
+# memoize is bounded and instrumented, see Util.Memoize
+from Util.Memoize import memoize
 
 TypeValidator = Callable[[Any], bool]
 """Represents a function that validates a given type is of a certain type by returning a boolean."""
 
 
-def memoize(func: Callable):
-    """Decorate a function with this annotation to memoize (cache) arguments without bound.
+class ValidationMode(Enum):
+    """How much checking type_contract does, chosen once at startup.
 
-    Note: all arguments in a decorated function must be hashable."""
-    @lru_cache(maxsize=None)
-    def func_wrapper(*args, **kwargs):
-        return func(*args, **kwargs)
-    return func_wrapper
+    FULL checks every value completely, SAMPLED only checks SAMPLE_SIZE items of large containers
+    (see Util.ContractCompiler), OFF returns immediately."""
+    FULL = 'full'
+    SAMPLED = 'sampled'
+    OFF = 'off'
+
+
+VALIDATION_MODE_VARIABLE = 'RYTHM_GAME_CONTRACTS'
+"""The environment variable holding the validation mode used from startup (full, sampled or off)"""
+
+
+
+def read_validation_mode() -> ValidationMode:
+    """To get the validation mode chosen by the environment variable, full when it is not set.
+    An unknown value falls back to full with a warning, instead of failing every import of this module."""
+    value = os.environ.get(VALIDATION_MODE_VARIABLE, 'full')
+    try:
+        return ValidationMode(value.strip().lower())
+    except ValueError:
+        allowed = ', '.join(mode.value for mode in ValidationMode)
+        warnings.warn(f'{VALIDATION_MODE_VARIABLE}={value!r} is not one of {allowed}, full validation is used', \
+            RuntimeWarning, stacklevel=2)
+        return ValidationMode.FULL
+
+
+_validation_mode: ValidationMode = read_validation_mode()
+
+_COMPILED_ATTRIBUTE = '__compiled_contract__'
+"""The attribute under which a validator keeps its compiled check, as (mode, check)"""
+
+
+def set_validation_mode(mode: ValidationMode) -> None:
+    """Select how type_contract checks values. Meant to be called once at startup.
+
+    Examples: ::
+
+        set_validation_mode(ValidationMode.OFF) # -> type_contract costs a single comparison"""
+    global _validation_mode
+    _validation_mode = ValidationMode(mode)
+
+
+def get_validation_mode() -> ValidationMode:
+    """Returns the validation mode in use."""
+    return _validation_mode
 
 
 T = TypeVar("T")
@@ -46,18 +90,44 @@ def type_contract(value: Any, type_validator: TypeValidator) -> None:
         type_contract("hello", lambda x: isinstance(x, int)) # -> throws TypeError
         type_contract(4, bool) # -> BAD, improper use
     """
-    if not is_function(type_validator):
-        raise TypeError(
-            f"type_contract received an invalid type validator. It cannot be called.")
-
-    is_valid = type_validator(value)
+    mode = _validation_mode
+    if mode is ValidationMode.OFF:
+        return
+
+    # The validator is checked and compiled on its first use, the compiled check is kept on the validator
+    compiled = getattr(type_validator, _COMPILED_ATTRIBUTE, None)
+    if compiled is not None and compiled[0] is mode:
+        check = compiled[1]
+    else:
+        check = _compile_contract(type_validator, mode)
+
+    is_valid = check(value)
+    if is_valid is True:
+        return
     if not is_bool(is_valid):
         raise TypeError(
             f"type_contract received an invalid type validator. It does not return a boolean.")
 
-    if not is_valid:
+    raise TypeError(
+        f"Value {value} does not pass {getattr(type_validator, '__name__', type_validator)} type validation.")
+
+
+def _compile_contract(type_validator: TypeValidator, mode: ValidationMode) -> TypeValidator:
+    """Returns the check used by type_contract for a validator: its compiled check if the validator
+    was built by this module, else the validator itself."""
+    if not is_function(type_validator):
         raise TypeError(
-            f"Value {value} does not pass {type_validator.__name__} type validation.")
+            f"type_contract received an invalid type validator. It cannot be called.")
+
+    if getattr(type_validator, CONTRACT_SPEC_ATTRIBUTE, None) is None:
+        return type_validator
+
+    check = compile_validator(type_validator, sampled=mode is ValidationMode.SAMPLED)
+    try:
+        setattr(type_validator, _COMPILED_ATTRIBUTE, (mode, check))
+    except AttributeError:
+        pass
+    return check
 
 
 def is_int(maybe_int: Any) -> bool:
@@ -145,7 +215,7 @@ def is_instance_of(t: type) -> TypeValidator:
     def instance_checker(maybe_instance: Any) -> bool:
         """A type validator for an instance of a class."""
         return isinstance(maybe_instance, t)
-    return instance_checker
+    return describe(instance_checker, 'instance', t)
 
 
 def is_one_of(*type_validators: TypeValidator) -> TypeValidator:
@@ -161,7 +231,7 @@ def is_one_of(*type_validators: TypeValidator) -> TypeValidator:
 
     def one_of_checker(maybe_value: Any) -> bool:
         return any(type_validator(maybe_value) for type_validator in type_validators)
-    return one_of_checker
+    return describe(one_of_checker, 'one_of', *type_validators)
 
 
 def is_optional(type_validator: TypeValidator) -> TypeValidator:
@@ -177,7 +247,7 @@ def is_optional(type_validator: TypeValidator) -> TypeValidator:
 
     def optional_checker(maybe_optional: Any) -> bool:
         return maybe_optional is None or type_validator(maybe_optional)
-    return optional_checker
+    return describe(optional_checker, 'optional', type_validator)
 
 
 def is_list_of(item_type_validator: TypeValidator) -> TypeValidator:
@@ -192,7 +262,7 @@ def is_list_of(item_type_validator: TypeValidator) -> TypeValidator:
 
     def list_checker(maybe_list: Any) -> bool:
         return isinstance(maybe_list, list) and all(item_type_validator(item) for item in maybe_list)
-    return list_checker
+    return describe(list_checker, 'list', item_type_validator)
 
 
 def is_set_of(item_type_validator: TypeValidator) -> TypeValidator:
@@ -207,7 +277,7 @@ def is_set_of(item_type_validator: TypeValidator) -> TypeValidator:
 
     def set_checker(maybe_set: Any) -> bool:
         return isinstance(maybe_set, set) and all(item_type_validator(item) for item in maybe_set)
-    return set_checker
+    return describe(set_checker, 'set', item_type_validator)
 
 
 def is_tuple_of(*type_validators: TypeValidator) -> TypeValidator:
@@ -230,7 +300,7 @@ def is_tuple_of(*type_validators: TypeValidator) -> TypeValidator:
         if len(maybe_tuple) != len(type_validators):
             return False
         return all(item_validator(item) for item_validator, item in zip(type_validators, maybe_tuple))
-    return tuple_checker
+    return describe(tuple_checker, 'tuple', *type_validators)
 
 
 def is_iterable_of(item_type_validator: TypeValidator) -> TypeValidator:
@@ -245,7 +315,7 @@ def is_iterable_of(item_type_validator: TypeValidator) -> TypeValidator:
 
     def iterable_checker(maybe_iterable: Any) -> bool:
         return isinstance(maybe_iterable, Iterable) and all(item_type_validator(item) for item in maybe_iterable)
-    return iterable_checker
+    return describe(iterable_checker, 'iterable', item_type_validator)
 
 
 def is_dict_of(key_type_validator: TypeValidator, value_type_validator: TypeValidator) -> TypeValidator:
@@ -263,7 +333,7 @@ def is_dict_of(key_type_validator: TypeValidator, value_type_validator: TypeVali
 
     def dict_checker(maybe_dict: Any) -> bool:
         return isinstance(maybe_dict, dict) and all(key_type_validator(key) and value_type_validator(value) for key, value in maybe_dict.items())
-    return dict_checker
+    return describe(dict_checker, 'dict', key_type_validator, value_type_validator)
 
 
 def is_meter(num_beat_type_validator: TypeValidator, beat_unit_type_validator: TypeValidator) -> TypeValidator:
@@ -272,6 +342,16 @@ def is_meter(num_beat_type_validator: TypeValidator, beat_unit_type_validator: T
 
     def meter_checker(maybe_meter: Any) -> bool:
         return isinstance(maybe_meter, meter)
-    return meter_checker
+    return describe(meter_checker, 'instance', meter)
+
+
+# The built-in validators are inlined by the compiled checks
+describe(is_int, 'int')
+describe(is_float, 'float')
+describe(is_str, 'str')
+describe(is_bool, 'bool')
+describe(is_none, 'none')
+describe(is_any, 'any')
+describe(is_function, 'function')
     
 